@@ -0,0 +1 @@
+"""Benchmarks des endpoints sur jeu de données synthétique (`python -m benchmarks.endpoints`)."""
@@ -0,0 +1,311 @@
+"""Micro-benchmarks des endpoints chauds, application chargée en processus.
+
+Une base est générée (`scripts/generate_dataset.py`, graine fixe, dans un
+sous-processus) puis `src.api.main:app` est démarrée avec son lifespan
+derrière un transport ASGI httpx : pas de réseau, requêtes séquentielles. Pour chaque endpoint :
+latences p50 / p95 / p99, requêtes SQL par appel (`track_queries`) et pic
+mémoire Python d'un appel (`tracemalloc`, passe séparée pour ne pas fausser
+les latences). Le résultat est écrit en JSON pour comparer deux commits :
+
+    uv run python -m benchmarks.endpoints --scale 10 --output before.json
+    uv run python -m benchmarks.endpoints --scale 10 --output after.json \\
+        --baseline before.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+
+_ROOT = Path(__file__).resolve().parents[1]
+
+# Volumes par défaut du générateur, multipliés par `--scale`
+_DEFAULTS = {
+    "users": 1_000, "follows": 20_000, "workouts": 5_000,
+    "sets": 100_000, "likes": 30_000, "comments": 10_000,
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = "GET"
+    json: Optional[dict[str, Any]] = None
+    page: int = 1  # pages de feed parcourues (curseur) avant la mesure
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Percentile au rang le plus proche sur des valeurs triées."""
+    index = max(0, min(len(samples) - 1, round(q / 100 * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(scale: float, seed: int) -> dict[str, Any]:
+    """Génère la base de `DATABASE_URL` si elle est vide ; retourne sa description."""
+    from sqlmodel import Session, func, select
+
+    from src.api.db import get_engine, init_db
+    from src.api.models import User
+    from src.api.seeds import seed_exercises
+
+    init_db()
+    with Session(get_engine()) as session:
+        populated = session.exec(select(func.count()).select_from(User)).one() > 0
+    size = {name: round(value * scale) for name, value in _DEFAULTS.items()}
+    if not populated:
+        # Catalogue réel : le générateur de programmes s'appuie sur les groupes musculaires
+        seed_exercises()
+        # Le générateur importe `api.*` : processus séparé de l'application (`src.api.*`)
+        options = [f"--{name}={value}" for name, value in size.items()]
+        subprocess.run(
+            [sys.executable, str(_ROOT / "scripts" / "generate_dataset.py"),
+             f"--seed={seed}", f"--until={date.today()}", *options],
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(
+                filter(None, [str(_ROOT / "src"), os.getenv("PYTHONPATH")])
+            )},
+            check=True,
+        )
+    return {"scale": scale, "seed": seed, "generated": not populated, **size}
+
+
+def scenarios() -> list[Scenario]:
+    """Endpoints mesurés, paramétrés sur les comptes les plus chargés de la base."""
+    from sqlmodel import Session, func, select
+
+    from src.api.db import get_engine
+    from src.api.models import FeedEntry, Follower, User, Workout
+
+    with Session(get_engine()) as session:
+        # Lecteur à la timeline la plus longue (pages profondes du feed)
+        reader = session.exec(
+            select(FeedEntry.user_id)
+            .group_by(FeedEntry.user_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+        popular = session.exec(
+            select(Follower.followed_id)
+            .group_by(Follower.followed_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+        active = session.exec(
+            select(Workout.user_id).group_by(Workout.user_id).order_by(func.count().desc()).limit(1)
+        ).first()
+        username = session.exec(select(User.username).where(User.id == popular)).first()
+
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    day_ms = int(timedelta(days=1).total_seconds() * 1000)
+    items = [
+        Scenario("feed_page_1", f"/feed?user_id={reader}&limit=20"),
+        Scenario("feed_page_50", f"/feed?user_id={reader}&limit=20", page=50),
+    ]
+    for board, periods in (
+        ("volume", ("week", "month", "all")),
+        ("sessions", ("week", "month", "all")),
+        ("likes", ("all",)),
+        ("followers", ("all",)),
+    ):
+        for period in periods:
+            suffix = f"period={period}&" if board in {"volume", "sessions"} else ""
+            items.append(Scenario(
+                f"leaderboard_{board}_{period}",
+                f"/leaderboard/{board}?{suffix}current_user_id={reader}",
+            ))
+    items += [
+        Scenario("explore", f"/explore?current_user_id={reader}"),
+        Scenario("explore_trending", "/explore/trending"),
+        Scenario("explore_suggested", f"/explore/suggested-users?current_user_id={reader}"),
+        Scenario("search", f"/explore/search?q={(username or 'synth')[:7]}"),
+        Scenario("profile", f"/profile/{popular}?current_user_id={reader}"),
+        Scenario("profile_posts", f"/profile/{popular}/posts"),
+        Scenario("stats", f"/users/{active}/stats"),
+        Scenario("stats_summary", f"/users/{active}/stats/summary"),
+        Scenario("notifications", f"/notifications/{reader}"),
+        Scenario("sync_pull_7d", f"/sync/pull?since={now_ms - 7 * day_ms}"),
+        Scenario("sync_pull_90d", f"/sync/pull?since={now_ms - 90 * day_ms}"),
+        Scenario(
+            "program_generate",
+            "/programs/generate",
+            method="POST",
+            json={"user_id": active, "frequency": 4, "duration_weeks": 8},
+        ),
+        Scenario("exercises", "/exercises"),
+    ]
+    return items
+
+
+async def feed_cursor(client, path: str, page: int) -> tuple[Optional[str], int]:
+    """Curseur de la page `page` du feed, ou de la dernière page si le feed est plus court."""
+    cursor: Optional[str] = None
+    for reached in range(1, page):
+        response = await client.get(path if cursor is None else f"{path}&cursor={cursor}")
+        response.raise_for_status()
+        next_cursor = response.json()["next_cursor"]
+        if next_cursor is None:
+            return cursor, reached
+        cursor = next_cursor
+    return cursor, page
+
+
+async def measure(client, scenario: Scenario, requests: int, memory_requests: int) -> dict:
+    from src.api.query_stats import track_queries
+
+    async def call() -> int:
+        response = await client.request(scenario.method, scenario.path, json=scenario.json)
+        response.raise_for_status()
+        return len(response.content)
+
+    await call()  # chauffe : caches, plans de requêtes, pools
+    latencies: list[float] = []
+    queries: list[int] = []
+    for _ in range(requests):
+        with track_queries() as stats:
+            start = time.perf_counter()
+            size = await call()
+            latencies.append(time.perf_counter() - start)
+        queries.append(stats.count)
+
+    peaks: list[int] = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_requests):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "queries": max(queries),
+        "peak_kib": round(max(peaks, default=0) / 1024, 1),
+        "response_bytes": size,
+    }
+
+
+async def run(requests: int, memory_requests: int, only: Optional[set[str]]) -> dict[str, dict]:
+    import httpx
+
+    from src.api.main import app
+
+    results: dict[str, dict] = {}
+    async with app.router.lifespan_context(app):
+        # Une erreur 500 devient une réponse : l'endpoint est noté en échec, la suite continue
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in scenarios():
+                if only and scenario.name not in only:
+                    continue
+                if scenario.page > 1:
+                    cursor, scenario.page = await feed_cursor(client, scenario.path, scenario.page)
+                    if cursor is not None:
+                        scenario.path += f"&cursor={cursor}"
+                try:
+                    result = await measure(client, scenario, requests, memory_requests)
+                except httpx.HTTPStatusError as exc:
+                    results[scenario.name] = {
+                        "method": scenario.method,
+                        "path": scenario.path,
+                        "error": exc.response.status_code,
+                    }
+                    print(f"{scenario.name:>26}  HTTP {exc.response.status_code}")
+                    continue
+                result["page"] = scenario.page
+                results[scenario.name] = result
+                print(
+                    f"{scenario.name:>26}  p50 {result['p50_ms']:8.2f} ms  "
+                    f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                    f"{result['queries']:3d} q  {result['peak_kib']:9.1f} KiB"
+                )
+    return results
+
+
+def compare(results: dict[str, dict], baseline_path: Path) -> None:
+    """Écarts de p95, requêtes et mémoire par rapport à un run précédent."""
+    baseline = json.loads(baseline_path.read_text())["results"]
+    print(f"\nvs {baseline_path} :")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or "error" in before or "error" in result:
+            continue
+        change = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(
+            f"{name:>26}  p95 {before['p95_ms']:8.2f} -> {result['p95_ms']:8.2f} ms "
+            f"({change:+6.1f} %)  queries {before['queries']} -> {result['queries']}  "
+            f"peak {before['peak_kib']} -> {result['peak_kib']} KiB"
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="base SQLite générée si vide (temporaire par défaut)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplie la taille par défaut du générateur (1 000 utilisateurs)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=50, help="appels mesurés par endpoint")
+    parser.add_argument("--memory-requests", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="noms des scénarios à lancer")
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="JSON d'un run précédent à comparer")
+    args = parser.parse_args(argv)
+
+    database = args.database or tempfile.mktemp(prefix="bench-", suffix=".db")
+    # Base à définir avant le premier `get_engine()`
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(database).resolve()}"
+
+    start = time.perf_counter()
+    dataset = prepare_database(args.scale, args.seed)
+    print(f"Dataset ready in {time.perf_counter() - start:.1f}s ({database})")
+    results = asyncio.run(run(args.requests, args.memory_requests, set(args.only or ())))
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "dataset": dataset,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Rejoue des traces de trafic (`TRAFFIC_LOG`) contre une instance locale.
+
+Les requêtes partent au rythme enregistré, accéléré `--speedup` fois
+(`--speedup 0` : aussi vite que possible), jusqu'à `--concurrency` en vol.
+Seules les lectures (GET / HEAD) sont rejouées par défaut ; avec
+`--include-writes`, les corps sont reconstitués depuis leur forme
+enregistrée (valeurs factices). Les traces dont un paramètre de chemin a été
+masqué à l'enregistrement sont ignorées.
+
+    uv run python -m benchmarks.replay traffic.jsonl --base-url http://127.0.0.1:8000 \\
+        --speedup 10 --output replay.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+from .endpoints import percentile
+
+MASK = "***"  # valeur des paramètres masqués par `api.traffic`
+_READS = {"GET", "HEAD"}
+_PLACEHOLDER = re.compile(r"\{(\w+)(?::\w+)?\}")
+_SAMPLES: dict[str, Any] = {"str": "replay", "int": 0, "float": 0.0, "bool": False, "null": None}
+
+
+@dataclass
+class Replayed:
+    offset: float  # secondes depuis la première trace (rythme enregistré)
+    method: str
+    route: str
+    url: str
+    json: Any = None
+
+
+def sample_body(shape: Any) -> Any:
+    """Document JSON factice ayant la forme enregistrée."""
+    if isinstance(shape, dict):
+        return {key: sample_body(item) for key, item in shape.items()}
+    if isinstance(shape, list):
+        return [sample_body(item) for item in shape]
+    return _SAMPLES.get(shape)
+
+
+def to_request(trace: dict[str, Any], origin: datetime, include_writes: bool) -> Optional[Replayed]:
+    """Requête à rejouer pour une trace, ou `None` si elle doit être ignorée."""
+    method = trace["method"]
+    if method not in _READS and not include_writes:
+        return None
+    route = trace.get("route") or trace.get("path")
+    if route is None:
+        return None
+    params = trace.get("path_params") or {}
+    if MASK in params.values():
+        return None
+    try:
+        path = _PLACEHOLDER.sub(lambda match: str(params[match.group(1)]), route)
+    except KeyError:
+        return None
+    query = {key: value for key, value in (trace.get("query") or {}).items() if value != MASK}
+    url = str(httpx.URL(path, params=query))
+    offset = (datetime.fromisoformat(trace["at"]) - origin).total_seconds()
+    body = sample_body(trace["body"]) if method not in _READS and trace.get("body") else None
+    return Replayed(offset, method, route, url, body)
+
+
+def load(paths: Iterable[Path], include_writes: bool, limit: Optional[int]) -> list[Replayed]:
+    traces = []
+    for path in paths:
+        with path.open(encoding="utf-8") as lines:
+            traces.extend(json.loads(line) for line in lines if line.strip())
+    traces.sort(key=lambda trace: trace["at"])
+    if not traces:
+        return []
+    origin = datetime.fromisoformat(traces[0]["at"])
+    requests = [to_request(trace, origin, include_writes) for trace in traces]
+    return [request for request in requests if request is not None][:limit]
+
+
+def _latencies(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+async def replay(
+    requests: list[Replayed],
+    base_url: str,
+    speedup: float,
+    concurrency: int,
+    request_timeout: float,
+) -> dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    by_route: dict[str, list[float]] = {}
+    statuses: Counter[str] = Counter()
+    lags: list[float] = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # Délai par requête porté par `asyncio.timeout`, pas par le client httpx
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def one(request: Replayed) -> None:
+            sent = time.perf_counter()
+            try:
+                async with asyncio.timeout(request_timeout):
+                    response = await client.request(
+                        request.method, request.url, json=request.json
+                    )
+                status = str(response.status_code)
+            except (httpx.HTTPError, TimeoutError) as exc:
+                status = type(exc).__name__
+            finally:
+                semaphore.release()
+            elapsed = time.perf_counter() - sent
+            latencies.append(elapsed)
+            by_route.setdefault(f"{request.method} {request.route}", []).append(elapsed)
+            statuses[status] += 1
+
+        in_flight: set[asyncio.Task] = set()
+        for request in requests:
+            due = start + (request.offset / speedup if speedup else 0.0)
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            await semaphore.acquire()
+            # Retard sur le rythme visé : l'instance ne suit plus (`--concurrency` atteint)
+            lags.append(max(0.0, loop.time() - due))
+            task = asyncio.create_task(one(request))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight)
+        duration = loop.time() - start
+
+    # Erreurs serveur et échecs de transport ; les 4xx (ids absents de la base) sont à part
+    errors = sum(count for status, count in statuses.items() if status[0] not in "1234")
+    return {
+        "requests": len(requests),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(requests) / duration, 1) if duration else None,
+        "errors": errors,
+        "statuses": dict(statuses),
+        "max_lag_ms": round(max(lags, default=0.0) * 1000, 3),
+        "latency": _latencies(latencies),
+        "routes": {
+            route: {"count": len(samples), **_latencies(samples)}
+            for route, samples in sorted(by_route.items(), key=lambda item: -len(item[1]))
+        },
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", nargs="+", type=Path, help="fichiers JSONL de TRAFFIC_LOG")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speedup", type=float, default=1.0,
+                        help="accélération du rythme enregistré (0 : sans attente)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="délai maximal d'une requête (s)")
+    parser.add_argument("--include-writes", action="store_true")
+    parser.add_argument("--limit", type=int, help="nombre maximal de requêtes rejouées")
+    parser.add_argument("--output", type=Path, help="rapport JSON")
+    args = parser.parse_args(argv)
+
+    requests = load(args.traces, args.include_writes, args.limit)
+    if not requests:
+        raise SystemExit("Aucune trace à rejouer.")
+    report = asyncio.run(
+        replay(requests, args.base_url, args.speedup, args.concurrency, args.timeout)
+    )
+    latency = report["latency"]
+    print(
+        f"{report['requests']} requests in {report['duration_s']:.1f}s "
+        f"({report['throughput_rps']} req/s), {report['errors']} errors, "
+        f"max lag {report['max_lag_ms']:.0f} ms"
+    )
+    print(
+        f"latency p50 {latency['p50_ms']} ms  p95 {latency['p95_ms']} ms  "
+        f"p99 {latency['p99_ms']} ms"
+    )
+    for route, stats in report["routes"].items():
+        print(f"{stats['count']:>7}  p95 {stats['p95_ms']:8.2f} ms  {route}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
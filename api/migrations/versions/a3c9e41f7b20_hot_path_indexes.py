@@ -0,0 +1,101 @@
+"""hot path indexes
+
+Index composites des requêtes chaudes (profil, timeline, notifications,
+détail de séance) et index uniques sur les paires like / follow, jusque-là
+protégées seulement par une vérification avant insertion. Les doublons
+existants sont supprimés avant la création des index uniques, puis les
+compteurs et classements qui les comptaient sont recalculés (comme
+`db._ensure_unique_pairs`).
+
+Revision ID: a3c9e41f7b20
+Revises: d785ffa705c2
+Create Date: 2026-10-17 10:12:31.408215
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlmodel import Session
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e41f7b20'
+down_revision: Union[str, Sequence[str], None] = 'd785ffa705c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nom, table, colonnes, unique)
+INDEXES = (
+    ('ix_share_owner_created', 'share', ['owner_id', 'created_at', 'share_id'], False),
+    ('ix_share_created', 'share', ['created_at', 'share_id'], False),
+    ('ux_like_share_user', 'like', ['share_id', 'user_id'], True),
+    ('ux_commentlike_comment_user', 'commentlike', ['comment_id', 'user_id'], True),
+    ('ux_follower_pair', 'follower', ['follower_id', 'followed_id'], True),
+    ('ix_notification_user_read_created', 'notification', ['user_id', 'read', 'created_at'], False),
+    ('ix_workoutexercise_workout_order', 'workoutexercise', ['workout_id', 'order_index'], False),
+    ('ix_set_exercise_order', 'set', ['workout_exercise_id', 'order'], False),
+)
+
+
+def _columns(inspector: sa.Inspector, table: str) -> set[str]:
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _recompute_derived(
+    bind: sa.Connection, inspector: sa.Inspector, deduplicated: set[str]
+) -> None:
+    """Recalcule ce qui comptait les doublons supprimés (tables absentes : rien à recalculer)."""
+    from api.services.counters import recompute_share_counters, recompute_user_stats
+    from api.services.leaderboard import rebuild_leaderboards
+    from api.services.trending import rebuild_trending
+
+    tables = set(inspector.get_table_names())
+    with Session(bind=bind) as session:
+        if 'like' in deduplicated and 'like_count' in _columns(inspector, 'share'):
+            recompute_share_counters(session)
+            if 'trendingscore' in tables:
+                rebuild_trending(session)
+        if deduplicated & {'like', 'follower'}:
+            if {'leaderboardscore', 'dailyvolume'} <= tables:
+                rebuild_leaderboards(session)
+            if 'userstats' in tables:
+                recompute_user_stats(session)
+        session.flush()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    deduplicated: set[str] = set()
+    for name, table, columns, unique in INDEXES:
+        # Le schéma de base précède certaines tables (créées par `init_db`)
+        if table not in tables or not set(columns) <= _columns(inspector, table):
+            continue
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            continue
+        if unique:
+            target = sa.table(table, sa.column('id'), *(sa.column(c) for c in columns))
+            keep = (
+                sa.select(sa.func.min(target.c.id))
+                .group_by(*(target.c[c] for c in columns))
+                .scalar_subquery()
+            )
+            if bind.execute(sa.delete(target).where(target.c.id.not_in(keep))).rowcount:
+                deduplicated.add(table)
+        op.create_index(name, table, columns, unique=unique)
+    if deduplicated:
+        _recompute_derived(bind, inspector, deduplicated)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    for name, table, _, _ in reversed(INDEXES):
+        if table in tables and name in {index['name'] for index in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,117 @@
+"""Compare les routes de lecture `async def` à leur équivalent synchrone.
+
+Mode `async` : les routes telles que livrées (aiosqlite, boucle d'événements).
+Mode `sync` : les mêmes handlers montés derrière un `def` qui occupe un thread
+du pool Starlette pendant toute la requête, comme avant le passage en async.
+Le pool de threads est volontairement réduit (`--threads`) pour rendre la
+saturation visible ; le pool de connexions est dimensionné sur la concurrence
+pour que seul le pool de threads limite le mode `sync`.
+
+Usage (depuis api/) : python -m scripts.bench_async --requests 400 --concurrency 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import tempfile
+import time
+
+# Base jetable, à définir avant d'importer l'application
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+
+import anyio.from_thread  # noqa: E402
+import anyio.to_thread  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.routing import APIRoute  # noqa: E402
+
+from src.api.main import app  # noqa: E402
+
+HOT_PATHS = (
+    "/feed?user_id=guest-user",
+    "/explore",
+    "/leaderboard/volume?current_user_id=guest-user",
+    "/leaderboard/likes",
+    "/profile/demo-user-1?current_user_id=guest-user",
+    "/notifications/guest-user",
+)
+
+
+def _blocking(endpoint):
+    """Version synchrone d'un handler async : un thread du pool est tenu jusqu'à la réponse."""
+
+    @functools.wraps(endpoint)
+    def handler(*args, **kwargs):
+        return anyio.from_thread.run(functools.partial(endpoint, *args, **kwargs))
+
+    return handler
+
+
+def sync_app() -> FastAPI:
+    """L'application avec chaque route `async def` repassée en `def` (pool de threads)."""
+    blocking = FastAPI(lifespan=app.router.lifespan_context)
+    for route in app.routes:
+        if isinstance(route, APIRoute) and asyncio.iscoroutinefunction(route.endpoint):
+            blocking.add_api_route(
+                route.path,
+                _blocking(route.endpoint),
+                methods=list(route.methods),
+                response_model=route.response_model,
+            )
+        else:
+            blocking.router.routes.append(route)
+    return blocking
+
+
+async def run(target: FastAPI, requests: int, concurrency: int) -> dict[str, float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(HOT_PATHS[i % len(HOT_PATHS)])
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main(requests: int, concurrency: int, threads: int) -> None:
+    os.environ.setdefault("DB_READ_POOL_SIZE", str(concurrency))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.post("/seed/demo")).raise_for_status()
+        blocking = sync_app()
+        for mode, target in (("sync", blocking), ("async", app)):
+            await run(target, len(HOT_PATHS), 1)  # chauffe des pools
+            result = await run(target, requests, concurrency)
+            print(
+                f"{mode:>5}: {result['rps']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=8, help="taille du pool de threads")
+    options = parser.parse_args()
+    asyncio.run(main(options.requests, options.concurrency, options.threads))
@@ -0,0 +1,396 @@
+"""Génère un jeu de données synthétique volumineux pour les tests de charge.
+
+Insertions en masse (`executemany` via SQLAlchemy Core, lots de `--batch-size`
+lignes, une transaction par famille de tables), index secondaires supprimés
+pendant le chargement puis recréés. Popularité en loi de puissance (Zipf) :
+quelques comptes concentrent follows, séances, likes et commentaires.
+Même `--seed` et même `--until` : même base, ligne pour ligne.
+
+Usage (~10 M de lignes) :
+    uv run python scripts/generate_dataset.py --reset --users 100000 \\
+        --follows 2000000 --workouts 500000 --sets 10000000 \\
+        --likes 3000000 --comments 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Optional
+from datetime import date, datetime, time as dt_time, timedelta
+
+from sqlalchemy import Table, func
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, SQLModel, select
+
+from api.db import get_engine, init_db
+from api.models import (
+    Comment, Exercise, Follower, Like, Set, Share, User, Workout, WorkoutExercise,
+)
+from api.services.counters import recompute_share_counters, recompute_user_stats
+from api.services.leaderboard import rebuild_leaderboards
+from api.services.timeline import rebuild_timelines
+from api.services.trending import rebuild_trending
+from api.services.volume import rebuild_daily_volume
+
+MUSCLE_GROUPS = (
+    "chest", "back", "shoulders", "biceps", "triceps", "quadriceps", "hamstrings",
+    "glutes", "calves", "core",
+)
+COMMENTS = ("Bien joué !", "Solide 💪", "Quelle séance", "Propre", "On lâche rien", "Top")
+
+
+@dataclass
+class DatasetSize:
+    users: int = 1_000
+    follows: int = 20_000
+    workouts: int = 5_000
+    exercises_per_workout: int = 5
+    sets: int = 100_000
+    share_ratio: float = 0.3  # part des séances partagées
+    likes: int = 30_000
+    comments: int = 10_000
+    exercises: int = 200  # catalogue créé si la table `exercise` est vide
+    days: int = 365  # étendue des dates, jusqu'à `until`
+    alpha: float = 1.1  # exposant de Zipf
+
+
+def _zipf(n: int, alpha: float) -> list[float]:
+    """Poids cumulés de Zipf pour `random.choices` (rang 0 = le plus populaire)."""
+    return list(itertools.accumulate(1 / (rank + 1) ** alpha for rank in range(n)))
+
+
+def _pairs(
+    rng: random.Random, target: int, left: int, right: int, right_weights: list[float],
+    left_order: Optional[list[int]] = None, distinct: bool = False,
+) -> list[tuple[int, int]]:
+    """`target` paires uniques, droite en loi de puissance.
+
+    Gauche uniforme, ou elle aussi en loi de puissance (mêmes poids, `left == right`)
+    si `left_order` (rang -> index, permutation indépendante de la droite) est fourni.
+    """
+    target = min(target, left * right - (min(left, right) if distinct else 0))
+    seen: set[int] = set()
+    pairs: list[tuple[int, int]] = []
+    while len(pairs) < target:
+        batch = target - len(pairs)
+        if left_order is None:
+            lefts = [rng.randrange(left) for _ in range(batch)]
+        else:
+            ranks = rng.choices(range(left), cum_weights=right_weights, k=batch)
+            lefts = [left_order[rank] for rank in ranks]
+        rights = rng.choices(range(right), cum_weights=right_weights, k=batch)
+        for a, b in zip(lefts, rights, strict=True):
+            key = a * right + b
+            if (distinct and a == b) or key in seen:
+                continue
+            seen.add(key)
+            pairs.append((a, b))
+    return pairs
+
+
+def _insert(connection: Connection, table: Table, rows: Iterable[dict], batch_size: int) -> int:
+    """`INSERT` par lots (`executemany`) ; retourne le nombre de lignes."""
+    total = 0
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        connection.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+
+class _Generator:
+    def __init__(self, size: DatasetSize, seed: int, until: date, batch_size: int) -> None:
+        self.size = size
+        self.rng = random.Random(seed)
+        self.until = datetime.combine(until, dt_time())
+        self.batch_size = batch_size
+        self.counts: dict[str, int] = {}
+        self.user_ids: list[str] = []
+        self.usernames: list[str] = []
+        # Partages : (share_id, date de création)
+        self.shares: list[tuple[str, datetime]] = []
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def moment(self) -> datetime:
+        return self.until - timedelta(seconds=self.rng.randrange(self.size.days * 86_400))
+
+    def insert(self, connection: Connection, model: type[SQLModel], rows: Iterable[dict]) -> None:
+        table = model.__table__
+        self.counts[table.name] = self.counts.get(table.name, 0) + _insert(
+            connection, table, rows, self.batch_size
+        )
+
+    def exercises(self, connection: Connection) -> list[str]:
+        existing = connection.execute(select(Exercise.id)).scalars().all()
+        if existing:
+            return sorted(existing)
+        rows = [
+            {
+                "id": self.uuid(),
+                "name": f"Exercice {index}",
+                "slug": f"synth-exercice-{index}",
+                "muscle_group": MUSCLE_GROUPS[index % len(MUSCLE_GROUPS)],
+            }
+            for index in range(self.size.exercises)
+        ]
+        self.insert(connection, Exercise, rows)
+        return [row["id"] for row in rows]
+
+    def users(self, connection: Connection) -> None:
+        rows = []
+        for index in range(self.size.users):
+            user_id = self.uuid()
+            username = f"synth_{index}"
+            self.user_ids.append(user_id)
+            self.usernames.append(username)
+            rows.append({
+                "id": user_id,
+                "username": username,
+                "email": f"{username}@synthetic.local",
+                "password_hash": "!",  # aucun mot de passe valide
+                "created_at": self.moment(),
+                "consent_to_public_share": True,
+            })
+        self.insert(connection, User, rows)
+
+    def follows(self, connection: Connection, weights: list[float]) -> None:
+        # Gros lecteurs (qui suivent beaucoup de comptes) distincts des comptes populaires
+        readers = list(range(self.size.users))
+        self.rng.shuffle(readers)
+        pairs = _pairs(
+            self.rng, self.size.follows, self.size.users, self.size.users, weights,
+            left_order=readers, distinct=True,
+        )
+        self.insert(connection, Follower, (
+            {
+                "id": self.uuid(),
+                "follower_id": self.user_ids[follower],
+                "followed_id": self.user_ids[followed],
+                "created_at": self.moment(),
+            }
+            for follower, followed in pairs
+        ))
+
+    def workouts(
+        self, connection: Connection, weights: list[float], exercise_ids: list[str]
+    ) -> None:
+        size = self.size
+        # Assiduité indépendante de la popularité : sinon le compte le plus suivi est
+        # aussi le plus actif et son fan-out domine la timeline
+        activity = list(range(size.users))
+        self.rng.shuffle(activity)
+        owners = [
+            activity[rank]
+            for rank in self.rng.choices(range(size.users), cum_weights=weights, k=size.workouts)
+        ]
+        total_exercises = size.workouts * size.exercises_per_workout
+        buffers: dict[type[SQLModel], list[dict]] = {
+            Workout: [], WorkoutExercise: [], Set: [], Share: [],
+        }
+
+        def flush(force: bool = False) -> None:
+            for model, rows in buffers.items():
+                if rows and (force or len(rows) >= self.batch_size):
+                    self.insert(connection, model, rows)
+                    rows.clear()
+
+        exercise_index = 0
+        for owner in owners:
+            workout_id = self.uuid()
+            started_at = self.moment()
+            ended_at = started_at + timedelta(minutes=self.rng.randrange(30, 120))
+            title = f"Séance {self.rng.choice(MUSCLE_GROUPS)}"
+            buffers[Workout].append({
+                "id": workout_id,
+                "user_id": self.user_ids[owner],
+                "title": title,
+                "status": "completed",
+                "started_at": started_at,
+                "ended_at": ended_at,
+                "created_at": started_at,
+                "updated_at": ended_at,
+            })
+            set_count = 0
+            for order_index in range(size.exercises_per_workout):
+                workout_exercise_id = self.uuid()
+                # Répartition exacte de `sets` sur toutes les lignes d'exercice
+                sets = (
+                    size.sets * (exercise_index + 1) // total_exercises
+                    - size.sets * exercise_index // total_exercises
+                )
+                exercise_index += 1
+                set_count += sets
+                buffers[WorkoutExercise].append({
+                    "id": workout_exercise_id,
+                    "workout_id": workout_id,
+                    "exercise_id": self.rng.choice(exercise_ids),
+                    "order_index": order_index,
+                    "planned_sets": sets,
+                })
+                weight = float(self.rng.randrange(10, 120, 5))
+                for order in range(sets):
+                    buffers[Set].append({
+                        "id": self.uuid(),
+                        "workout_exercise_id": workout_exercise_id,
+                        "order": order,
+                        "reps": self.rng.randrange(5, 13),
+                        "weight": weight,
+                        "completed": True,
+                        "done_at": ended_at,
+                        "created_at": started_at,
+                    })
+            if self.rng.random() < size.share_ratio:
+                share_id = self.uuid()
+                self.shares.append((share_id, ended_at))
+                buffers[Share].append({
+                    "share_id": share_id,
+                    "owner_id": self.user_ids[owner],
+                    "owner_username": self.usernames[owner],
+                    "workout_id": workout_id,
+                    "workout_title": title,
+                    "exercise_count": size.exercises_per_workout,
+                    "set_count": set_count,
+                    "created_at": ended_at,
+                })
+            flush()
+        flush(force=True)
+
+    def reactions(self, connection: Connection) -> None:
+        if not self.shares:
+            return
+        # Popularité des partages indépendante de celle de leur auteur
+        weights = _zipf(len(self.shares), self.size.alpha)
+        popularity = list(range(len(self.shares)))
+        self.rng.shuffle(popularity)
+
+        def liked_at(share: int) -> datetime:
+            created_at = self.shares[share][1]
+            return min(self.until, created_at + timedelta(minutes=self.rng.randrange(1, 4_320)))
+
+        pairs = _pairs(self.rng, self.size.likes, self.size.users, len(self.shares), weights)
+        self.insert(connection, Like, (
+            {
+                "id": self.uuid(),
+                "share_id": self.shares[popularity[share]][0],
+                "user_id": self.user_ids[user],
+                "created_at": liked_at(popularity[share]),
+            }
+            for user, share in pairs
+        ))
+        shares = self.rng.choices(
+            range(len(self.shares)), cum_weights=weights, k=self.size.comments
+        )
+        users = [self.rng.randrange(self.size.users) for _ in shares]
+        self.insert(connection, Comment, (
+            {
+                "id": self.uuid(),
+                "share_id": self.shares[popularity[share]][0],
+                "user_id": self.user_ids[user],
+                "username": self.usernames[user],
+                "content": self.rng.choice(COMMENTS),
+                "created_at": liked_at(popularity[share]),
+            }
+            for share, user in zip(shares, users, strict=True)
+        ))
+
+
+def _loaded_tables() -> list[Table]:
+    models = (Exercise, User, Follower, Workout, WorkoutExercise, Set, Share, Like, Comment)
+    return [model.__table__ for model in models]
+
+
+def generate(
+    size: DatasetSize,
+    seed: int = 42,
+    until: date | None = None,
+    batch_size: int = 10_000,
+    reset: bool = False,
+    projections: bool = True,
+) -> dict[str, int]:
+    """Remplit la base de `DATABASE_URL` ; retourne le nombre de lignes par table."""
+    engine = get_engine()
+    if reset:
+        SQLModel.metadata.drop_all(engine)
+    init_db()
+    with Session(engine) as session:
+        if session.exec(select(func.count()).select_from(User)).one():
+            raise SystemExit("La base contient déjà des utilisateurs : relancer avec --reset.")
+
+    generator = _Generator(size, seed, until or date.today(), batch_size)
+    weights = _zipf(size.users, size.alpha)
+    indexes = [index for table in _loaded_tables() for index in table.indexes]
+    with engine.begin() as connection:
+        # Index reconstruits en une passe après chargement, plutôt que ligne à ligne
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+        exercise_ids = generator.exercises(connection)
+        generator.users(connection)
+    with engine.begin() as connection:
+        generator.follows(connection, weights)
+    with engine.begin() as connection:
+        generator.workouts(connection, weights, exercise_ids)
+    with engine.begin() as connection:
+        generator.reactions(connection)
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection, checkfirst=True)
+
+    if projections:
+        with Session(engine) as session:
+            recompute_share_counters(session)
+            recompute_user_stats(session)
+            rebuild_timelines(session)
+            rebuild_daily_volume(session)
+            rebuild_leaderboards(session)
+            rebuild_trending(session)
+            session.commit()
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+    return generator.counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = DatasetSize()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--until", type=date.fromisoformat, default=date.today(),
+                        help="date de fin des données (AAAA-MM-JJ), aujourd'hui par défaut")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--reset", action="store_true", help="vide la base avant génération")
+    parser.add_argument("--skip-projections", action="store_true",
+                        help="ne reconstruit ni timelines, ni compteurs, ni classements")
+    args = parser.parse_args(argv)
+
+    size = DatasetSize(**{name: getattr(args, name) for name in vars(defaults)})
+    # Chargement en masse : durabilité relâchée (base jetable), cache de 256 Mo
+    os.environ.setdefault("SQLITE_SYNCHRONOUS", "OFF")
+    os.environ.setdefault("SQLITE_CACHE_SIZE", "-262144")
+    start = time.perf_counter()
+    counts = generate(
+        size,
+        seed=args.seed,
+        until=args.until,
+        batch_size=args.batch_size,
+        reset=args.reset,
+        projections=not args.skip_projections,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    for table, rows in counts.items():
+        print(f"{table:>16} {rows:>12,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from sqlmodel import Session, func, select
+
+from api.db import get_engine
+from api.models import LeaderboardScore
+from api.services.leaderboard import rebuild_leaderboards
+from api.services.volume import rebuild_daily_volume
+
+
+def rebuild() -> None:
+    """Recalcule l'agrégat quotidien de volume, les classements et les photos de rang manquantes."""
+    with Session(get_engine()) as session:
+        rebuild_daily_volume(session)
+        rebuild_leaderboards(session)
+        session.commit()
+        rows = session.exec(select(func.count()).select_from(LeaderboardScore)).one()
+    print(f"Leaderboards rebuilt ({rows} rows).")
+
+
+if __name__ == "__main__":
+    rebuild()
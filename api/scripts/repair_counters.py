@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.services.counters import recompute_share_counters, recompute_user_stats
+
+
+def repair_counters() -> None:
+    """Recalcule les compteurs des partages (likes, commentaires) puis ceux des utilisateurs."""
+    with Session(get_engine()) as session:
+        updated = recompute_share_counters(session)
+        users = recompute_user_stats(session)
+        session.commit()
+    print(f"Counters repaired on {updated} shares and {users} users.")
+
+
+if __name__ == "__main__":
+    repair_counters()
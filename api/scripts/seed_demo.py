@@ -7,6 +7,11 @@ from sqlalchemy import text
 from sqlmodel import Session, select
 from src.api.db import get_engine
 from src.api.models import User, Share, Follower, Workout, WorkoutExercise, Set, Exercise, Like, Notification, Comment
+from src.api.services.counters import recompute_share_counters, recompute_user_stats
+from src.api.services.leaderboard import rebuild_leaderboards
+from src.api.services.timeline import rebuild_timelines
+from src.api.services.trending import rebuild_trending
+from src.api.services.volume import rebuild_daily_volume
 
 
 def get_exercises_by_muscle(session: Session) -> dict:
@@ -519,6 +524,9 @@ def seed_demo_data():
                 session.add(Follower(follower_id=follower_id, followed_id=followed_id))
                 created_follows += 1
         
+        session.flush()
+        # Reconstruire les timelines du feed à partir des partages et follows
+        rebuild_timelines(session)
         session.commit()
         
         # Créer des likes sur les partages
@@ -607,6 +615,12 @@ def seed_demo_data():
                 session.add(comment)
                 created_comments += 1
         
+        session.flush()
+        recompute_share_counters(session)
+        recompute_user_stats(session)
+        rebuild_daily_volume(session)
+        rebuild_leaderboards(session)
+        rebuild_trending(session)
         session.commit()
         
         # Créer des notifications pour guest-user
@@ -0,0 +1,273 @@
+"""Cache en mémoire des modèles de lecture (LRU + TTL, invalidation par tags).
+
+Chaque `Cache` est borné (`max_entries`, éviction du moins récemment lu) et
+ses entrées expirent après `ttl` secondes. Une entrée porte des tags
+(`user:{id}`, `trending`, `exercises`…) : les écritures appellent
+`invalidate_on_commit(session, *tags)` et les entrées concernées quittent tous
+les caches au COMMIT de la transaction (rien n'est retiré si elle échoue).
+
+Un calcul commencé avant une invalidation de l'un de ses tags n'est pas mis
+en cache : il a pu lire l'état d'avant l'écriture. Les valeurs sont partagées
+entre requêtes et ne doivent pas être modifiées. `READ_CACHE=off` désactive
+la mise en cache. Succès, échecs et évictions sont exposés sur `/metrics`.
+Les autres processus (workers uvicorn) sont prévenus par `cache_sync`.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .metrics import Sample, register_collector
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_MISSING = object()
+_PENDING_TAGS = "cache_invalidations"  # clé de `Session.info`
+
+# Entrée : (valeur, échéance `time.monotonic()`, tags)
+_Entry = tuple[Any, float, tuple[str, ...]]
+
+
+def _enabled() -> bool:
+    return os.getenv("READ_CACHE", "on").strip().lower() not in {"0", "off", "false", "no"}
+
+
+class Cache:
+    """LRU borné à durée de vie, invalidable par tags ; sûr entre threads."""
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl: float = 60.0) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._by_tag: dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        # Génération courante, génération de la dernière invalidation de chaque tag et
+        # plancher en deçà duquel tout calcul est considéré périmé (`_invalidated` borné)
+        self.generation = 0
+        self._invalidated: dict[str, int] = {}
+        self._floor = 0
+        _CACHES.append(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(
+        self, key: Hashable, value: Any, tags: Iterable[str] = (), since: Optional[int] = None
+    ) -> bool:
+        """Stocke `value`, sauf si un de ses `tags` a été invalidé depuis `since`."""
+        tags = tuple(tags)
+        with self._lock:
+            if since is not None and (
+                since < self._floor
+                or any(self._invalidated.get(tag, -1) > since for tag in tags)
+            ):
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, *tags: str) -> int:
+        """Retire les entrées portant l'un des `tags`. Retourne leur nombre."""
+        with self._lock:
+            self.generation += 1
+            if len(self._invalidated) > 4 * self.max_entries:
+                self._invalidated.clear()
+                self._floor = self.generation
+            dropped = 0
+            for tag in tags:
+                self._invalidated[tag] = self.generation
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    dropped += 1
+            self.invalidations += dropped
+            return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._floor = self.generation
+            self._invalidated.clear()
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+_CACHES: list[Cache] = []
+# Structures en mémoire hors `Cache` (index d'autocomplétion…) : reçoivent les tags
+# invalidés, ou `None` quand tout est à recharger
+_LISTENERS: list[Callable[[Optional[tuple[str, ...]]], None]] = []
+
+
+def on_invalidate(listener: Callable[[Optional[tuple[str, ...]]], None]) -> None:
+    """Abonne `listener` aux invalidations (locales ou venues d'autres processus)."""
+    _LISTENERS.append(listener)
+
+
+def invalidate(*tags: str) -> None:
+    """Invalide immédiatement `tags` dans tous les caches."""
+    for cache in _CACHES:
+        cache.invalidate(*tags)
+    for listener in _LISTENERS:
+        listener(tags)
+
+
+def clear_caches() -> None:
+    """Vide tous les caches (changement de base, chargement en masse)."""
+    for cache in _CACHES:
+        cache.clear()
+    for listener in _LISTENERS:
+        listener(None)
+
+
+def invalidate_on_commit(session: Session, *tags: str) -> None:
+    """Programme l'invalidation de `tags` au COMMIT de la transaction de `session`."""
+    session.info.setdefault(_PENDING_TAGS, set()).update(tags)
+
+
+def pending_tags(session: Session) -> frozenset[str]:
+    """Tags que le prochain COMMIT de `session` invalidera."""
+    return frozenset(session.info.get(_PENDING_TAGS, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    # Un SAVEPOINT libéré (unité du writer) n'est pas encore visible des lecteurs
+    if session.in_nested_transaction():
+        return
+    tags = session.info.pop(_PENDING_TAGS, None)
+    if tags:
+        invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    # L'annulation d'un SAVEPOINT garde les tags des autres unités du lot (au pire, trop
+    # d'invalidations) ; celle de la transaction entière les abandonne
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_TAGS, None)
+
+
+def cached(
+    cache: Cache,
+    tags: Iterable[str] = (),
+    result_tags: Optional[Callable[[Any], Iterable[str]]] = None,
+    ignore: Iterable[str] = ("session",),
+) -> Callable[[F], F]:
+    """Met en cache le résultat d'une fonction (synchrone ou `async`) selon ses arguments.
+
+    `tags` sont des gabarits formatés avec les arguments (`"user:{user_id}"`),
+    `result_tags` calcule des tags supplémentaires depuis le résultat. Les
+    arguments de `ignore` (session…) ne font pas partie de la clé.
+    """
+    templates = tuple(tags)
+    ignored = frozenset(ignore)
+
+    def decorator(func: F) -> F:
+        signature = inspect.signature(func)
+
+        def key_and_tags(args: tuple, kwargs: dict) -> tuple[Hashable, list[str]]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: value for name, value in bound.arguments.items() if name not in ignored
+            }
+            key = (func.__qualname__, *arguments.values())
+            return key, [template.format(**arguments) for template in templates]
+
+        def store(key: Hashable, value: Any, static_tags: list[str], since: int) -> None:
+            extra = result_tags(value) if result_tags is not None else ()
+            cache.set(key, value, [*static_tags, *extra], since)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not _enabled():
+                    return await func(*args, **kwargs)
+                key, static_tags = key_and_tags(args, kwargs)
+                value = cache.get(key, _MISSING)
+                if value is _MISSING:
+                    since = cache.generation
+                    value = await func(*args, **kwargs)
+                    store(key, value, static_tags, since)
+                return value
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled():
+                return func(*args, **kwargs)
+            key, static_tags = key_and_tags(args, kwargs)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                since = cache.generation
+                value = func(*args, **kwargs)
+                store(key, value, static_tags, since)
+            return value
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _cache_samples() -> Iterable[Sample]:
+    for cache in _CACHES:
+        labels = {"cache": cache.name}
+        yield "cache_hits_total", labels, cache.hits
+        yield "cache_misses_total", labels, cache.misses
+        yield "cache_evictions_total", labels, cache.evictions
+        yield "cache_invalidations_total", labels, cache.invalidations
+        yield "cache_entries", labels, len(cache)
+
+
+register_collector(
+    _cache_samples,
+    {
+        "cache_hits_total": "counter",
+        "cache_misses_total": "counter",
+        "cache_evictions_total": "counter",
+        "cache_invalidations_total": "counter",
+        "cache_entries": "gauge",
+    },
+)
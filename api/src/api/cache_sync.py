@@ -0,0 +1,125 @@
+"""Invalidation des caches entre processus (plusieurs workers uvicorn).
+
+Les tags d'un COMMIT (`cache.invalidate_on_commit`) sont inscrits dans la
+table `cacheinvalidation` au sein de la même transaction : ils ne sont
+visibles des autres processus qu'avec les données qu'ils protègent. Chaque
+processus relit toutes les `CACHE_SYNC_INTERVAL_MS` (500 ms par défaut) les
+lignes au-delà de la dernière vue — un parcours de clé primaire — et invalide
+localement les tags émis par les autres : un cache est à jour au plus un
+intervalle après une écriture, quel que soit le worker qui l'a faite. La base
+partagée sert de canal, sans service externe. `CACHE_SYNC_INTERVAL_MS=0`
+désactive le mécanisme (processus unique).
+
+Les lignes plus anciennes que `_RETENTION` (bien au-delà du TTL des caches)
+sont purgées de temps en temps par la transaction qui en ajoute.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from .cache import invalidate, pending_tags
+from .db import get_read_engine
+from .models import CacheInvalidation
+
+# Identifiant de ce processus dans `CacheInvalidation.origin`
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_RETENTION = timedelta(hours=1)
+_PRUNE_EVERY = 1_000  # COMMIT porteurs de tags entre deux purges
+
+_commits = itertools.count(1)
+_SYNC: Optional[CacheSync] = None
+_SYNC_LOCK = threading.Lock()
+
+
+def _interval() -> float:
+    return max(0, int(os.getenv("CACHE_SYNC_INTERVAL_MS", "500"))) / 1000
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _record_tags(session: OrmSession) -> None:
+    if session.in_nested_transaction() or not _interval():
+        return
+    tags = pending_tags(session)
+    if not tags:
+        return
+    now = datetime.utcnow()
+    session.execute(
+        insert(CacheInvalidation),
+        [{"tag": tag, "origin": ORIGIN, "created_at": now} for tag in sorted(tags)],
+    )
+    if next(_commits) % _PRUNE_EVERY == 0:
+        session.execute(
+            delete(CacheInvalidation).where(CacheInvalidation.created_at < now - _RETENTION)
+        )
+
+
+class CacheSync:
+    """Thread de relecture des invalidations émises par les autres processus."""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._stopped = threading.Event()
+        # Les caches de ce processus sont vides au démarrage : l'historique est ignoré
+        with Session(get_read_engine()) as session:
+            self.last_id = session.exec(select(func.max(CacheInvalidation.id))).one() or 0
+        self._thread = threading.Thread(target=self._run, name="cache-sync", daemon=True)
+        self._thread.start()
+
+    def poll(self) -> int:
+        """Applique les invalidations reçues depuis le dernier passage. Retourne leur nombre."""
+        with Session(get_read_engine()) as session:
+            rows = session.exec(
+                select(CacheInvalidation.id, CacheInvalidation.tag, CacheInvalidation.origin)
+                .where(CacheInvalidation.id > self.last_id)
+                .order_by(CacheInvalidation.id)
+            ).all()
+        if not rows:
+            return 0
+        self.last_id = rows[-1][0]
+        tags = {tag for _, tag, origin in rows if origin != ORIGIN}
+        if tags:
+            invalidate(*tags)
+        return len(tags)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                self.poll()
+            except Exception:  # base momentanément indisponible : nouvel essai au tour suivant
+                continue
+
+
+def start_cache_sync() -> Optional[CacheSync]:
+    """Démarre la relecture des invalidations (démarrage de l'application)."""
+    global _SYNC
+    interval = _interval()
+    if not interval:
+        return None
+    with _SYNC_LOCK:
+        if _SYNC is None:
+            _SYNC = CacheSync(interval)
+        return _SYNC
+
+
+def stop_cache_sync() -> None:
+    """Arrête le thread de relecture (arrêt de l'app, changement de base)."""
+    global _SYNC
+    with _SYNC_LOCK:
+        sync, _SYNC = _SYNC, None
+    if sync is not None:
+        sync.stop()
@@ -1,19 +1,55 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from collections.abc import Iterator
+from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
+from urllib.parse import quote
 from typing import Optional
 
-from sqlalchemy import text
+from sqlalchemy import delete, event, func, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.engine import Engine
-from sqlalchemy.engine.url import make_url
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, select, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .metrics import watch_pool
+from .query_stats import instrument
+from .slow_queries import install as install_slow_query_log
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent  # api/
 DEFAULT_DB_PATH = BASE_DIR / "gorillax.db"
 
 _ENGINE: Optional[Engine] = None
+_WRITE_ENGINE: Optional[Engine] = None
+_READ_ENGINE: Optional[Engine] = None
+_ASYNC_ENGINE: Optional[AsyncEngine] = None
+# Fermetures d'engines async planifiées sur la boucle active (référence gardée jusqu'au bout)
+_DISPOSALS: set[asyncio.Task] = set()
+
+# Pilote asynchrone par moteur (asyncpg n'est requis que pour PostgreSQL)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# Profil SQLite appliqué à chaque connexion : pragma -> (variable d'environnement, défaut,
+# valeurs admises ; None = entier)
+SQLITE_PRAGMAS: dict[str, tuple[str, str, Optional[frozenset[str]]]] = {
+    "journal_mode": (
+        "SQLITE_JOURNAL_MODE",
+        "WAL",
+        frozenset({"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}),
+    ),
+    "synchronous": ("SQLITE_SYNCHRONOUS", "NORMAL", frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})),
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", "5000", None),
+    "cache_size": ("SQLITE_CACHE_SIZE", "-20000", None),  # négatif = KiB, soit ~20 Mo
+    "mmap_size": ("SQLITE_MMAP_SIZE", "268435456", None),  # 256 Mo
+    "temp_store": ("SQLITE_TEMP_STORE", "MEMORY", frozenset({"DEFAULT", "FILE", "MEMORY"})),
+    "foreign_keys": ("SQLITE_FOREIGN_KEYS", "ON", frozenset({"ON", "OFF"})),
+}
+
+
+_WRITE_PRAGMAS = frozenset({"journal_mode", "synchronous"})
 
 
 def _database_url() -> str:
@@ -23,31 +59,241 @@ def _database_url() -> str:
     return f"sqlite:///{DEFAULT_DB_PATH}"
 
 
+def _is_memory_sqlite(url: URL) -> bool:
+    database = url.database
+    return url.get_backend_name() == "sqlite" and (
+        not database
+        or database == ":memory:"
+        or database.startswith("file::memory:")
+        or url.query.get("mode") == "memory"
+    )
+
+
+def sqlite_pragmas() -> dict[str, str]:
+    """Pragmas configurés (variables d'environnement `SQLITE_*`, sinon profil par défaut)."""
+    pragmas = {}
+    for name, (env_var, default, allowed) in SQLITE_PRAGMAS.items():
+        value = os.getenv(env_var, default).strip().upper()
+        if allowed is None:
+            int(value)  # ValueError explicite si la valeur n'est pas un entier
+        elif value not in allowed:
+            raise ValueError(f"{env_var}={value!r} invalide, valeurs admises : {sorted(allowed)}")
+        pragmas[name] = value
+    return pragmas
+
+
+def _apply_sqlite_pragmas(engine: Engine, read_only: bool = False) -> None:
+    pragmas = sqlite_pragmas()
+    if read_only:
+        # Réglages d'écriture : sans objet (voire refusés) sur une connexion `mode=ro`
+        pragmas = {name: value for name, value in pragmas.items() if name not in _WRITE_PRAGMAS}
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
 def get_engine() -> Engine:
     global _ENGINE
     if _ENGINE is None:
         url = _database_url()
         parsed_url = make_url(url)
-        connect_args = (
-            {"check_same_thread": False}
-            if parsed_url.get_backend_name() == "sqlite"
-            else {}
-        )
+        is_sqlite = parsed_url.get_backend_name() == "sqlite"
+        connect_args = {"check_same_thread": False} if is_sqlite else {}
         _ENGINE = create_engine(url, echo=False, connect_args=connect_args)
+        instrument(_ENGINE)
+        install_slow_query_log(_ENGINE)
+        watch_pool(_ENGINE, "default")
+        if is_sqlite:
+            _apply_sqlite_pragmas(_ENGINE)
     return _ENGINE
 
 
+def get_write_engine() -> Engine:
+    """Engine du writer (`writer.py`) : une seule connexion, transactions `BEGIN IMMEDIATE`.
+
+    Le verrou d'écriture est pris dès le début de la transaction et les
+    SAVEPOINT fonctionnent (pysqlite laissé en autocommit, BEGIN émis ici).
+    Hors SQLite, c'est l'engine principal.
+    """
+    global _WRITE_ENGINE
+    if _WRITE_ENGINE is None:
+        url = _database_url()
+        if make_url(url).get_backend_name() != "sqlite":
+            return get_engine()
+        engine = create_engine(
+            url,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            pool_size=1,
+            max_overflow=0,
+        )
+        instrument(engine)
+        watch_pool(engine, "write")
+        install_slow_query_log(engine)
+        _apply_sqlite_pragmas(engine)
+
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record) -> None:
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(connection) -> None:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        _WRITE_ENGINE = engine
+    return _WRITE_ENGINE
+
+
+def _read_pool_size() -> int:
+    return max(1, int(os.getenv("DB_READ_POOL_SIZE", "8")))
+
+
+def get_read_engine() -> Engine:
+    """Engine des lectures : connexions SQLite `mode=ro`, pool dimensionné.
+
+    En WAL, les lecteurs ne bloquent pas l'écrivain (ni l'inverse) ; une
+    connexion en lecture seule garantit qu'un GET ne prend jamais le verrou
+    d'écriture. Hors SQLite fichier (PostgreSQL, `:memory:`), c'est l'engine
+    principal.
+    """
+    global _READ_ENGINE
+    if _READ_ENGINE is None:
+        parsed_url = make_url(_database_url())
+        if parsed_url.get_backend_name() != "sqlite" or _is_memory_sqlite(parsed_url):
+            return get_engine()
+        path = quote(str(Path(parsed_url.database).resolve()))
+        pool_size = _read_pool_size()
+        engine = create_engine(
+            f"sqlite:///file:{path}?mode=ro&uri=true",
+            echo=False,
+            connect_args={"check_same_thread": False},
+            pool_size=pool_size,
+            max_overflow=pool_size,
+        )
+        instrument(engine)
+        watch_pool(engine, "read")
+        install_slow_query_log(engine)
+        _apply_sqlite_pragmas(engine, read_only=True)
+        _READ_ENGINE = engine
+    return _READ_ENGINE
+
+
+def get_async_engine() -> AsyncEngine:
+    """Engine asynchrone des lectures (aiosqlite), sur la même base que `get_read_engine`.
+
+    Les routes `async def` qui l'utilisent attendent la base sur la boucle
+    d'événements au lieu d'occuper un thread du pool Starlette (40 par défaut).
+    Une base SQLite en mémoire est refusée : la connexion aiosqlite ouvrirait
+    une autre base, vide.
+    """
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is None:
+        url = get_read_engine().url
+        if _is_memory_sqlite(url):
+            raise ValueError(
+                "DATABASE_URL : base SQLite en mémoire non prise en charge par les routes async, "
+                "utiliser un fichier"
+            )
+        backend = url.get_backend_name()
+        url = url.set(drivername=_ASYNC_DRIVERS.get(backend, url.drivername))
+        if backend != "sqlite":
+            _ASYNC_ENGINE = create_async_engine(url, echo=False)
+            instrument(_ASYNC_ENGINE.sync_engine)
+            install_slow_query_log(_ASYNC_ENGINE.sync_engine)
+            watch_pool(_ASYNC_ENGINE.sync_engine, "async")
+            return _ASYNC_ENGINE
+        options = {}
+        read_only = url.query.get("mode") == "ro"
+        if read_only:
+            pool_size = _read_pool_size()
+            options = {"pool_size": pool_size, "max_overflow": pool_size}
+        engine = create_async_engine(
+            url, echo=False, connect_args={"check_same_thread": False}, **options
+        )
+        instrument(engine.sync_engine)
+        install_slow_query_log(engine.sync_engine)
+        watch_pool(engine.sync_engine, "async")
+        _apply_sqlite_pragmas(engine.sync_engine, read_only=read_only)
+        _ASYNC_ENGINE = engine
+    return _ASYNC_ENGINE
+
+
+async def close_async_engine() -> None:
+    """Ferme les connexions aiosqlite (arrêt de l'application)."""
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is not None:
+        await _ASYNC_ENGINE.dispose()
+        _ASYNC_ENGINE = None
+
+
+def _dispose_async_engine(engine: AsyncEngine) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(engine.dispose())
+    else:
+        # Appel depuis une boucle active : la fermeture des connexions y est planifiée
+        task = loop.create_task(engine.dispose())
+        _DISPOSALS.add(task)
+        task.add_done_callback(_DISPOSALS.discard)
+
+
 def reset_engine() -> None:
-    global _ENGINE
+    global _ENGINE, _WRITE_ENGINE, _READ_ENGINE, _ASYNC_ENGINE
+    from .cache import clear_caches
+    from .cache_sync import stop_cache_sync
+    from .services.trending import stop_trending_refresh
+    from .writer import stop_writer
+
+    stop_trending_refresh()
+    stop_writer()
+    stop_cache_sync()
+    # Les caches de lecture décrivent l'ancienne base
+    clear_caches()
+    if _ASYNC_ENGINE is not None:
+        _dispose_async_engine(_ASYNC_ENGINE)
+    _ASYNC_ENGINE = None
+    for engine in (_READ_ENGINE, _WRITE_ENGINE, _ENGINE):
+        if engine is not None:
+            engine.dispose()
     _ENGINE = None
+    _WRITE_ENGINE = None
+    _READ_ENGINE = None
+
+
+def sqlite_settings(engine: Engine) -> dict[str, str]:
+    """Valeurs effectivement actives sur une connexion (vide hors SQLite)."""
+    if engine.dialect.name != "sqlite":
+        return {}
+    with engine.connect() as connection:
+        return {
+            name: str(connection.exec_driver_sql(f"PRAGMA {name}").scalar())
+            for name in SQLITE_PRAGMAS
+        }
+
+
+def optimize_db() -> None:
+    """`PRAGMA optimize` à l'arrêt : met à jour les statistiques utiles au planificateur."""
+    engine = get_engine()
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
 
 
 def init_db() -> None:
     # Importer tous les modèles pour qu'ils soient ajoutés au metadata AVANT create_all
     from .models import (
-        User, Workout, Exercise, WorkoutExercise, Set, Program, ProgramSession,
+        User, UserStats, Workout, Exercise, WorkoutExercise, Set, Program, ProgramSession,
         ProgramSet, Share, Follower, Like, Comment, Notification, Story,
-        RefreshToken, SyncEvent
+        RefreshToken, SyncEvent, FeedEntry, LeaderboardScore,
+        LeaderboardSnapshot, DailyVolume, TrendingScore, CacheInvalidation
     )
     
     url = _database_url()
@@ -58,6 +304,15 @@ def init_db() -> None:
     SQLModel.metadata.create_all(engine)
     _ensure_slug_column(engine)
     _ensure_workout_exercise_columns(engine)
+    _ensure_share_counter_columns(engine)
+    _ensure_unique_pairs(engine)
+    _ensure_indexes(engine)
+    _ensure_feed_entries(engine)
+    _ensure_daily_volume(engine)
+    _ensure_leaderboards(engine)
+    _ensure_trending(engine)
+    _ensure_user_stats(engine)
+    _ensure_search_indexes(engine)
 
 
 def _ensure_slug_column(engine: Engine) -> None:
@@ -129,7 +384,176 @@ def _ensure_workout_exercise_columns(engine: Engine) -> None:
         connection.commit()
 
 
+def _ensure_share_counter_columns(engine: Engine) -> None:
+    from .services.counters import recompute_share_counters
+
+    with engine.connect() as connection:
+        result = connection.execute(text("PRAGMA table_info(share)"))
+        columns = {row[1] for row in result}
+        added = False
+        for column in ("like_count", "comment_count"):
+            if column not in columns:
+                connection.execute(
+                    text(f"ALTER TABLE share ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+                )
+                added = True
+        connection.commit()
+
+    if added:
+        with Session(engine) as session:
+            recompute_share_counters(session)
+            session.commit()
+
+
+def _ensure_unique_pairs(engine: Engine) -> None:
+    """Dédoublonne likes et follows d'une base existante avant leurs index uniques."""
+    from .models import CommentLike, Follower, Like, TrendingScore, UserStats
+    from .services.counters import recompute_share_counters, recompute_user_stats
+    from .services.leaderboard import rebuild_leaderboards
+    from .services.trending import rebuild_trending
+
+    pairs = (
+        (Like, "ux_like_share_user", (Like.share_id, Like.user_id)),
+        (CommentLike, "ux_commentlike_comment_user", (CommentLike.comment_id, CommentLike.user_id)),
+        (Follower, "ux_follower_pair", (Follower.follower_id, Follower.followed_id)),
+    )
+    inspector = inspect(engine)
+    removed: dict[type, int] = {}
+    with Session(engine) as session:
+        for model, index_name, columns in pairs:
+            existing = {index["name"] for index in inspector.get_indexes(model.__tablename__)}
+            if index_name in existing:
+                continue
+            # On garde une ligne par paire (la plus petite id), les doublons viennent
+            # d'anciennes courses entre la vérification et l'insertion
+            keep = select(func.min(model.id)).group_by(*columns).scalar_subquery()
+            result = session.execute(delete(model).where(model.id.not_in(keep)))
+            removed[model] = result.rowcount
+        if removed.get(Like):
+            recompute_share_counters(session)
+            if session.exec(select(TrendingScore.share_id).limit(1)).first() is not None:
+                rebuild_trending(session)
+        if removed.get(Like) or removed.get(Follower):
+            rebuild_leaderboards(session)
+            # Vide, la table est remplie plus loin par `_ensure_user_stats`
+            if session.exec(select(UserStats.user_id).limit(1)).first() is not None:
+                recompute_user_stats(session)
+        session.commit()
+
+
+def _ensure_indexes(engine: Engine) -> None:
+    """Crée les index déclarés sur les modèles mais absents d'une base existante."""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _ensure_feed_entries(engine: Engine) -> None:
+    """Construit les timelines d'une base existante (table feedentry vide)."""
+    from .models import FeedEntry, Share
+    from .services.timeline import rebuild_timelines
+
+    with Session(engine) as session:
+        if session.exec(select(FeedEntry.share_id).limit(1)).first() is not None:
+            return
+        if session.exec(select(Share.share_id).limit(1)).first() is None:
+            return
+        rebuild_timelines(session)
+        session.commit()
+
+
+def _ensure_daily_volume(engine: Engine) -> None:
+    """Agrège les séances terminées d'une base existante (table dailyvolume vide)."""
+    from .models import DailyVolume, Workout
+    from .services.leaderboard import rebuild_leaderboards
+    from .services.volume import rebuild_daily_volume
+
+    with Session(engine) as session:
+        if session.exec(select(DailyVolume.user_id).limit(1)).first() is not None:
+            return
+        completed = select(Workout.id).where(Workout.status == "completed").limit(1)
+        if session.exec(completed).first() is None:
+            return
+        rebuild_daily_volume(session)
+        # Le classement volume se lit dans le nouvel agrégat
+        rebuild_leaderboards(session)
+        session.commit()
+
+
+def _ensure_leaderboards(engine: Engine) -> None:
+    """Matérialise les classements d'une base existante (table leaderboardscore vide)."""
+    from .models import Follower, LeaderboardScore, Share
+    from .services.leaderboard import rebuild_leaderboards
+
+    with Session(engine) as session:
+        if session.exec(select(LeaderboardScore.user_id).limit(1)).first() is not None:
+            return
+        has_shares = session.exec(select(Share.share_id).limit(1)).first() is not None
+        has_follows = session.exec(select(Follower.id).limit(1)).first() is not None
+        if not (has_shares or has_follows):
+            return
+        rebuild_leaderboards(session)
+        session.commit()
+
+
+def _ensure_trending(engine: Engine) -> None:
+    """Classe les partages récents d'une base existante (table trendingscore vide)."""
+    from .models import Share, TrendingScore
+    from .services.trending import rebuild_trending
+
+    with Session(engine) as session:
+        if session.exec(select(TrendingScore.share_id).limit(1)).first() is not None:
+            return
+        if session.exec(select(Share.share_id).limit(1)).first() is None:
+            return
+        rebuild_trending(session)
+        session.commit()
+
+
+def _ensure_user_stats(engine: Engine) -> None:
+    """Calcule les compteurs des utilisateurs d'une base existante (table userstats vide)."""
+    from .models import User, UserStats
+    from .services.counters import recompute_user_stats
+
+    with Session(engine) as session:
+        if session.exec(select(UserStats.user_id).limit(1)).first() is not None:
+            return
+        if session.exec(select(User.id).limit(1)).first() is None:
+            return
+        recompute_user_stats(session)
+        session.commit()
+
+
+def _ensure_search_indexes(engine: Engine) -> None:
+    """Index plein texte FTS5 de `/explore/search` (SQLite uniquement)."""
+    from .services.search import ensure_search_indexes
+
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        ensure_search_indexes(connection)
+
+
+def insert_for(session: Session, model):
+    """`INSERT` du dialecte courant, pour profiter de `ON CONFLICT` (SQLite / PostgreSQL)."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
 def get_session() -> Iterator[Session]:
     engine = get_engine()
     with Session(engine) as session:
         yield session
+
+
+def get_read_session() -> Iterator[Session]:
+    """Session en lecture seule pour les routes GET (toute écriture y échoue)."""
+    with Session(get_read_engine()) as session:
+        yield session
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """Session asynchrone en lecture pour les routes `async def`."""
+    async with AsyncSession(get_async_engine()) as session:
+        yield session
@@ -4,10 +4,16 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .db import init_db
+from .cache_sync import start_cache_sync, stop_cache_sync
+from .db import close_async_engine, init_db, optimize_db
+from .metrics import MetricsMiddleware
+from .query_stats import QueryStatsMiddleware
+from .traffic import TrafficRecorderMiddleware
+from .writer import stop_writer
 from .routes import exercises
 from .routes import feed
 from .routes import health
+from .routes import metrics
 from .routes import programs
 from .routes import stories
 from .routes import users_stats
@@ -24,6 +30,8 @@ from .routes import users
 from .routes import seed
 from .seeds import seed_exercises
 from .services.exercise_loader import import_exercises_from_url
+from .services.follow_graph import FOLLOW_GRAPH
+from .services.trending import start_trending_refresh, stop_trending_refresh
 from sqlmodel import Session, select, func
 from .db import get_engine
 from .models import Exercise
@@ -55,9 +63,24 @@ async def lifespan(app: FastAPI):
                 inserted = seed_exercises(force=False)
                 if inserted > 0:
                     print(f"📦 {inserted} exercices par défaut chargés")
+        
+        # Graphe des abonnements des suggestions, ensuite tenu à jour par les invalidations
+        FOLLOW_GRAPH.refresh(session)
+    
+    # Invalidations de cache émises par les autres workers
+    start_cache_sync()
+    # Reconstruction périodique du classement tendance
+    start_trending_refresh()
     
     yield
 
+    stop_trending_refresh()
+    stop_cache_sync()
+    # Vider la file d'écriture puis mettre à jour les statistiques du planificateur SQLite
+    await close_async_engine()
+    stop_writer()
+    optimize_db()
+
 
 app = FastAPI(title="Gorillax API", version="0.1.0", lifespan=lifespan)
 
@@ -70,7 +93,17 @@ app.add_middleware(
     allow_headers=["*"],  # Autorise tous les headers
 )
 
+# Nombre et durée des requêtes SQL par requête HTTP (en-têtes X-DB-* si DB_QUERY_STATS=on)
+app.add_middleware(QueryStatsMiddleware)
+
+# Compteurs, latences et tailles de réponse par route, exposés sur GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Traces de trafic rejouables (TRAFFIC_LOG=traffic.jsonl, benchmarks/replay.py)
+app.add_middleware(TrafficRecorderMiddleware)
+
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(exercises.router)
 app.include_router(share.router)
 app.include_router(feed.router)
@@ -0,0 +1,207 @@
+"""Métriques Prometheus (format texte) sans dépendance externe.
+
+`MetricsMiddleware` compte les requêtes par route (gabarit de chemin, pas
+l'URL brute), leur latence et la taille des réponses ; `GET /metrics` les
+expose avec l'état des pools SQLAlchemy (`watch_pool`) et les compteurs
+fournis par `register_collector` (caches…).
+
+Coût minimal sur le chemin chaud : le middleware s'exécute sur la boucle
+d'événements (un seul thread), les mises à jour sont de simples opérations
+sur des dicts, sans verrou. Les compteurs de checkout de pool, incrémentés
+depuis plusieurs threads, sont de simples entiers protégés par un verrou.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Ligne de métrique : (nom, labels, valeur)
+Sample = tuple[str, dict[str, str], float]
+
+
+class Histogram:
+    """Histogramme cumulatif à la Prometheus (compteurs par borne, somme, total)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: dict[str, str]) -> Iterable[Sample]:
+        cumulative = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts, strict=True):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            yield f"{name}_bucket", {**labels, "le": le}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class Registry:
+    """État des métriques HTTP d'un processus."""
+
+    def __init__(self) -> None:
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.sizes: dict[tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = (method, route, str(status))
+        self.requests[key] = self.requests.get(key, 0) + 1
+        route_key = (method, route)
+        latency = self.latency.get(route_key)
+        if latency is None:
+            latency = self.latency[route_key] = Histogram(LATENCY_BUCKETS)
+            self.sizes[route_key] = Histogram(SIZE_BUCKETS)
+        latency.observe(seconds)
+        self.sizes[route_key].observe(size)
+
+    def samples(self) -> Iterable[Sample]:
+        for (method, route, status), count in self.requests.items():
+            labels = {"method": method, "route": route, "status": status}
+            yield "http_requests_total", labels, count
+        for (method, route), histogram in self.latency.items():
+            yield from histogram.samples(
+                "http_request_duration_seconds", {"method": method, "route": route}
+            )
+        for (method, route), histogram in self.sizes.items():
+            yield from histogram.samples(
+                "http_response_size_bytes", {"method": method, "route": route}
+            )
+        yield "http_requests_in_flight", {}, self.in_flight
+
+
+REGISTRY = Registry()
+
+_METRIC_TYPES = {
+    "http_requests_total": "counter",
+    "http_request_duration_seconds": "histogram",
+    "http_response_size_bytes": "histogram",
+    "http_requests_in_flight": "gauge",
+    "db_pool_checkouts_total": "counter",
+    "db_pool_size": "gauge",
+    "db_pool_checked_out": "gauge",
+    "db_pool_overflow": "gauge",
+}
+
+_POOLS: dict[str, Engine] = {}
+_CHECKOUTS: dict[str, int] = {}
+_CHECKOUTS_LOCK = threading.Lock()
+_COLLECTORS: list[Callable[[], Iterable[Sample]]] = []
+
+
+def watch_pool(engine: Engine, name: str) -> None:
+    """Expose l'état du pool de `engine` sous le label `pool=name`."""
+    with _CHECKOUTS_LOCK:
+        _CHECKOUTS[name] = 0
+    _POOLS[name] = engine
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        with _CHECKOUTS_LOCK:
+            _CHECKOUTS[name] += 1
+
+
+def _pool_samples() -> Iterable[Sample]:
+    for name, engine in _POOLS.items():
+        labels = {"pool": name}
+        yield "db_pool_checkouts_total", labels, _CHECKOUTS[name]
+        pool = engine.pool
+        # Seuls les QueuePool (SQLite fichier, PostgreSQL) exposent taille et débordement
+        if isinstance(pool, QueuePool):
+            yield "db_pool_size", labels, pool.size()
+            yield "db_pool_checked_out", labels, pool.checkedout()
+            # `overflow()` est négatif tant que le pool n'est pas plein
+            yield "db_pool_overflow", labels, max(0, pool.overflow())
+
+
+def register_collector(
+    collector: Callable[[], Iterable[Sample]], types: Optional[dict[str, str]] = None
+) -> None:
+    """Ajoute une source de métriques lue à chaque scrape (ex. compteurs de cache)."""
+    _COLLECTORS.append(collector)
+    _METRIC_TYPES.update(types or {})
+
+
+def _format(value: float) -> str:
+    if isinstance(value, int) or value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> str:
+    """Toutes les métriques au format texte Prometheus 0.0.4 (regroupées par famille)."""
+    families: dict[str, list[str]] = {}
+    sources = [REGISTRY.samples(), _pool_samples(), *(collector() for collector in _COLLECTORS)]
+    for name, labels, value in itertools.chain.from_iterable(sources):
+        family = name.removesuffix("_bucket").removesuffix("_sum").removesuffix("_count")
+        if family not in _METRIC_TYPES:
+            family = name
+        lines = families.get(family)
+        if lines is None:
+            lines = families[family] = [f"# TYPE {family} {_METRIC_TYPES.get(family, 'untyped')}"]
+        if labels:
+            rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            lines.append(f"{name}{{{rendered}}} {_format(value)}")
+        else:
+            lines.append(f"{name} {_format(value)}")
+    return "".join(line + "\n" for lines in families.values() for line in lines)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI alimentant `REGISTRY`."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        REGISTRY.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            REGISTRY.in_flight -= 1
+            # Gabarit de la route (`/profile/{user_id}`) pour borner la cardinalité
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REGISTRY.observe(
+                scope["method"], route, status, time.perf_counter() - start, size
+            )
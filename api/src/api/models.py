@@ -1,8 +1,9 @@
 """Database models for the Fitness App."""
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -22,6 +23,15 @@ class User(SQLModel, table=True):
     objective: Optional[str] = Field(default=None)
 
 
+class UserStats(SQLModel, table=True):
+    """Compteurs dénormalisés d'un utilisateur, mis à jour dans la transaction de l'écriture."""
+    user_id: str = Field(primary_key=True)
+    posts_count: int = Field(default=0)
+    followers_count: int = Field(default=0)
+    following_count: int = Field(default=0)
+    likes_received: int = Field(default=0)
+
+
 class Workout(SQLModel, table=True):
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     user_id: str = Field(index=True)
@@ -47,6 +57,8 @@ class Exercise(SQLModel, table=True):
 
 
 class WorkoutExercise(SQLModel, table=True):
+    __table_args__ = (Index("ix_workoutexercise_workout_order", "workout_id", "order_index"),)
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     workout_id: str = Field(index=True)
     exercise_id: str
@@ -56,6 +68,8 @@ class WorkoutExercise(SQLModel, table=True):
 
 
 class Set(SQLModel, table=True):
+    __table_args__ = (Index("ix_set_exercise_order", "workout_exercise_id", "order"),)
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     workout_exercise_id: str = Field(index=True)
     order: int = Field(default=0)
@@ -109,6 +123,11 @@ class ProgramSet(SQLModel, table=True):
 
 class Share(SQLModel, table=True):
     """Partage d'une séance."""
+    __table_args__ = (
+        Index("ix_share_owner_created", "owner_id", "created_at", "share_id"),
+        Index("ix_share_created", "created_at", "share_id"),
+    )
+
     share_id: str = Field(default_factory=generate_uuid, primary_key=True)
     owner_id: str = Field(index=True)
     owner_username: str
@@ -116,11 +135,73 @@ class Share(SQLModel, table=True):
     workout_title: str
     exercise_count: int = Field(default=0)
     set_count: int = Field(default=0)
+    # Compteurs dénormalisés, mis à jour dans la transaction du like / commentaire
+    like_count: int = Field(default=0)
+    comment_count: int = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class FeedEntry(SQLModel, table=True):
+    """Entrée de la timeline d'un utilisateur (fan-out à l'écriture des partages)."""
+    __table_args__ = (Index("ix_feedentry_user_owner", "user_id", "owner_id"),)
+
+    user_id: str = Field(primary_key=True)
+    created_at: datetime = Field(primary_key=True)
+    share_id: str = Field(primary_key=True, index=True)
+    owner_id: str
+
+
+class LeaderboardScore(SQLModel, table=True):
+    """Score matérialisé d'un utilisateur pour un classement et une période."""
+    __table_args__ = (
+        Index("ix_leaderboardscore_rank", "board", "period_key", "score", "user_id"),
+    )
+
+    board: str = Field(primary_key=True)  # 'volume', 'sessions', 'likes', 'followers'
+    period_key: str = Field(primary_key=True)  # '2026-10-12' (lundi), '2026-10', 'all'
+    user_id: str = Field(primary_key=True)
+    score: int = Field(default=0)
+
+
+class DailyVolume(SQLModel, table=True):
+    """Agrégat quotidien des séances terminées d'un utilisateur."""
+    user_id: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    volume: float = Field(default=0)  # Somme reps × poids (kg)
+    sessions: int = Field(default=0)
+    best_lift: float = Field(default=0)
+
+
+class TrendingScore(SQLModel, table=True):
+    """Score « tendance » d'un partage récent (projection de `services.trending`)."""
+    __table_args__ = (Index("ix_trendingscore_rank", "score", "share_id"),)
+
+    share_id: str = Field(primary_key=True)
+    score: float = Field(default=0.0)
+    created_at: datetime = Field(index=True)  # date du partage, pour sortir de la fenêtre
+
+
+class CacheInvalidation(SQLModel, table=True):
+    """Tag de cache invalidé par un COMMIT, relu par les autres processus (`cache_sync`)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tag: str
+    origin: str  # processus émetteur, qui n'a pas à relire ses propres invalidations
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class LeaderboardSnapshot(SQLModel, table=True):
+    """Rang figé d'un utilisateur, référence pour la colonne `change` du classement."""
+    board: str = Field(primary_key=True)
+    period: str = Field(primary_key=True)  # 'week', 'month', 'all'
+    period_key: str = Field(primary_key=True)  # période de référence (précédente, ou semaine pour 'all')
+    user_id: str = Field(primary_key=True)
+    rank: int
+
+
 class Like(SQLModel, table=True):
     """Like sur un partage."""
+    __table_args__ = (Index("ux_like_share_user", "share_id", "user_id", unique=True),)
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     share_id: str = Field(index=True)
     user_id: str = Field(index=True)
@@ -129,6 +210,8 @@ class Like(SQLModel, table=True):
 
 class Comment(SQLModel, table=True):
     """Commentaire sur un partage."""
+    __table_args__ = (Index("ix_comment_share_created", "share_id", "created_at", "id"),)
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     share_id: str = Field(index=True)
     user_id: str = Field(index=True)
@@ -139,6 +222,10 @@ class Comment(SQLModel, table=True):
 
 class CommentLike(SQLModel, table=True):
     """Like sur un commentaire."""
+    __table_args__ = (
+        Index("ux_commentlike_comment_user", "comment_id", "user_id", unique=True),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     comment_id: str = Field(index=True)
     user_id: str = Field(index=True)
@@ -147,6 +234,8 @@ class CommentLike(SQLModel, table=True):
 
 class Follower(SQLModel, table=True):
     """Relation de suivi entre utilisateurs."""
+    __table_args__ = (Index("ux_follower_pair", "follower_id", "followed_id", unique=True),)
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     follower_id: str = Field(index=True)
     followed_id: str = Field(index=True)
@@ -155,6 +244,11 @@ class Follower(SQLModel, table=True):
 
 class Notification(SQLModel, table=True):
     """Notification utilisateur."""
+    __table_args__ = (
+        Index("ix_notification_user_created", "user_id", "created_at", "id"),
+        Index("ix_notification_user_read_created", "user_id", "read", "created_at"),
+    )
+
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     user_id: str = Field(index=True)
     type: str  # 'like', 'comment', 'follow', 'mention'
@@ -0,0 +1,152 @@
+"""Compteur de requêtes SQL par requête HTTP et détection des N+1.
+
+Chaque engine est instrumenté (`instrument`) : les événements
+`before/after_cursor_execute` alimentent les `QueryStats` de la requête HTTP
+en cours, portées par une contextvar (suivie dans le pool de threads, les
+greenlets aiosqlite et le writer). Une même instruction exécutée au moins
+`DB_N_PLUS_ONE_THRESHOLD` fois dans une requête est signalée comme N+1.
+
+`DB_QUERY_STATS=on` (dev) ajoute `X-DB-Queries` / `X-DB-Time` (ms) aux
+réponses et journalise les N+1 détectés.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Paramètres liés (psycopg, asyncpg, text()), listes `IN (?, ?, …)`, littéraux numériques
+_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+_CURRENT: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _enabled() -> bool:
+    return os.getenv("DB_QUERY_STATS", "off").strip().lower() in {"1", "on", "true", "yes"}
+
+
+def _n_plus_one_threshold() -> int:
+    return max(2, int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5")))
+
+
+def fingerprint(statement: str) -> str:
+    """Forme normalisée d'une instruction : mêmes requêtes aux paramètres près."""
+    statement = _PARAMETER.sub("?", statement)
+    statement = _IN_LIST.sub("(?)", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+@dataclass
+class QueryStats:
+    """Requêtes exécutées dans un périmètre (requête HTTP, test…)."""
+
+    count: int = 0
+    duration: float = 0.0  # secondes
+    statements: Counter[str] = field(default_factory=Counter)
+    parent: Optional[QueryStats] = None
+    scope: Optional[Scope] = None  # requête HTTP d'origine (middleware)
+
+    def record(self, statement: str, duration: float) -> None:
+        key = fingerprint(statement)
+        stats: Optional[QueryStats] = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            stats.statements[key] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: Optional[int] = None) -> dict[str, int]:
+        """Instructions répétées au moins `threshold` fois (N+1 probables)."""
+        threshold = threshold or _n_plus_one_threshold()
+        return {sql: n for sql, n in self.statements.most_common() if n >= threshold}
+
+
+def current_route() -> Optional[str]:
+    """Route de la requête HTTP en cours (`GET /profile/{user_id}`), si connue."""
+    stats = _CURRENT.get()
+    while stats is not None and stats.scope is None:
+        stats = stats.parent
+    if stats is None or stats.scope is None:
+        return None
+    scope = stats.scope
+    # `scope["route"]` est renseigné par le routeur une fois la route trouvée
+    path = getattr(scope.get("route"), "path", scope["path"])
+    return f"{scope['method']} {path}"
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Compte les requêtes du bloc ; les périmètres englobants les voient aussi."""
+    stats = QueryStats(parent=_CURRENT.get())
+    token = _CURRENT.set(stats)
+    try:
+        yield stats
+    finally:
+        _CURRENT.reset(token)
+
+
+def instrument(engine: Engine) -> None:
+    """Branche le comptage sur un engine (pour un `AsyncEngine` : son `sync_engine`)."""
+
+    # Début porté par le contexte d'exécution : une requête en échec n'a pas
+    # d'`after_cursor_execute` et ne laisse rien derrière elle sur la connexion
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _CURRENT.get() is not None and context is not None:
+            context._query_stats_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        stats = _CURRENT.get()
+        start = getattr(context, "_query_stats_start", None)
+        if stats is not None and start is not None:
+            stats.record(statement, time.perf_counter() - start)
+
+
+class QueryStatsMiddleware:
+    """Middleware ASGI : un périmètre `track_queries` par requête HTTP."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        enabled = _enabled()
+        with track_queries() as stats:
+            stats.scope = scope
+
+            async def send_with_stats(message: Message) -> None:
+                if enabled and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.count)
+                    headers["X-DB-Time"] = f"{stats.duration * 1000:.2f}"
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        if enabled:
+            for statement, count in stats.repeated().items():
+                logger.warning(
+                    "N+1 probable sur %s %s : %d x %s",
+                    scope["method"], scope["path"], count, statement,
+                )
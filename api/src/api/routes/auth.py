@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.responses import Response
 from sqlmodel import Session, select
 
+from ..cache import invalidate_on_commit
 from ..db import get_session
 from ..models import User, RefreshToken
 from ..schemas import LoginRequest, RegisterRequest, TokenPair, MeResponse
@@ -55,6 +56,7 @@ def register(payload: RegisterRequest, session: Session = Depends(get_session))
     access = create_access_token(user.id)
     refresh_token, exp = create_refresh_token(user.id)
     session.add(RefreshToken(token=refresh_token, user_id=user.id, expires_at=exp))
+    invalidate_on_commit(session, "users", f"user:{user.id}")
     session.commit()
     return TokenPair(access_token=access, refresh_token=refresh_token)
 
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Body, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlmodel import select
 
-from ..db import get_session
+from ..cache import Cache, cached, invalidate_on_commit
+from ..db import get_read_session, get_session
 from ..models import Exercise
 from ..schemas import (
     ExerciseCreate,
@@ -13,6 +14,9 @@ from ..services.exercise_loader import import_exercises_from_url
 
 router = APIRouter(prefix="/exercises", tags=["exercises"])
 
+# Catalogue servi depuis la mémoire jusqu'à la prochaine écriture d'exercice
+_CATALOG = Cache("exercises", max_entries=1, ttl=300)
+
 
 class ImportExercisesRequest(BaseModel):
     url: str
@@ -20,7 +24,12 @@ class ImportExercisesRequest(BaseModel):
 
 
 @router.get("", response_model=list[ExerciseRead], summary="List exercises")
-def list_exercises(session=Depends(get_session)) -> list[ExerciseRead]:
+def list_exercises(session=Depends(get_read_session)) -> list[ExerciseRead]:
+    return _catalog(session)
+
+
+@cached(_CATALOG, tags=("exercises",))
+def _catalog(session) -> list[ExerciseRead]:
     statement = select(Exercise)
     results = session.exec(statement).all()
     return [ExerciseRead.model_validate(result) for result in results]
@@ -31,7 +40,7 @@ def list_exercises(session=Depends(get_session)) -> list[ExerciseRead]:
     response_model=ExerciseRead,
     summary="Get exercise by id",
 )
-def get_exercise(exercise_id: str, session=Depends(get_session)) -> ExerciseRead:
+def get_exercise(exercise_id: str, session=Depends(get_read_session)) -> ExerciseRead:
     exercise = session.get(Exercise, exercise_id)
     if exercise is None:
         raise HTTPException(
@@ -68,6 +77,7 @@ def create_exercise(
         source_value=payload.source_value,
     )
     session.add(exercise)
+    invalidate_on_commit(session, "exercises")
     session.commit()
     session.refresh(exercise)
     return ExerciseRead.model_validate(exercise)
@@ -97,6 +107,7 @@ def create_exercises_bulk(
             )
         )
     session.add_all(exercises)
+    invalidate_on_commit(session, "exercises")
     session.commit()
     refreshed: list[ExerciseRead] = []
     for exercise in exercises:
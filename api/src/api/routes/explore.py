@@ -1,14 +1,24 @@
 """API endpoints pour la découverte (Explore)."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
-from typing import Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Literal, Optional
 
-from ..db import get_session
-from ..models import User, Share, Like, Follower
+from ..cache import Cache, cached
+from ..db import get_async_session
+from ..models import User, Share, TrendingScore, UserStats
+from ..services.autocomplete import AUTOCOMPLETE
+from ..services.follow_graph import FOLLOW_GRAPH
+from ..services.search import search_shares, search_users
+from ..services.trending import window_start
 
 router = APIRouter(prefix="/explore", tags=["explore"])
 
+# Servis depuis la mémoire entre deux écritures (invalidation par tags, cf. `cache`)
+_TRENDING = Cache("explore_trending", max_entries=64, ttl=60)
+_SUGGESTED = Cache("explore_suggested_users", max_entries=4096, ttl=120)
+
 
 class TrendingPost(BaseModel):
     share_id: str
@@ -29,6 +39,7 @@ class SuggestedUser(BaseModel):
     objective: Optional[str]
     followers_count: int
     posts_count: int
+    mutual_count: int = 0  # abonnements du lecteur qui suivent ce compte
 
 
 class ExploreResponse(BaseModel):
@@ -36,233 +47,213 @@ class ExploreResponse(BaseModel):
     suggested_users: list[SuggestedUser]
 
 
+class AutocompleteItem(BaseModel):
+    type: Literal["user", "exercise"]
+    id: str
+    label: str  # nom d'utilisateur ou nom de l'exercice
+    slug: Optional[str] = None
+
+
 class SearchResult(BaseModel):
     users: list[SuggestedUser]
     posts: list[TrendingPost]
+    users_next_cursor: Optional[str] = None
+    posts_next_cursor: Optional[str] = None
 
 
 @router.get("/trending", response_model=list[TrendingPost])
-def get_trending_posts(
+async def get_trending_posts(
     limit: int = Query(20, ge=1, le=50),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> list[TrendingPost]:
-    """Récupérer les posts les plus populaires (par likes)."""
-    
-    # Optimisation: récupérer les shares récents et compter les likes en une requête
-    # Récupérer plus de shares pour avoir un bon échantillon
-    shares = session.exec(
+    """Récupérer les posts tendance (likes et commentaires pondérés par la fraîcheur)."""
+    return await _trending_posts(limit, session)
+
+
+# Chaque écriture qui change un score (partage, like, commentaire, job) émet `trending`
+@cached(_TRENDING, tags=("trending",))
+async def _trending_posts(limit: int, session: AsyncSession) -> list[TrendingPost]:
+    """Les `limit` meilleurs scores de la fenêtre (projection `services.trending`)."""
+    shares = (await session.exec(
         select(Share)
-        .order_by(Share.created_at.desc())
-        .limit(limit * 3)
-    ).all()
-    
-    if not shares:
-        return []
-    
-    # Compter les likes pour tous les shares en une seule requête
-    share_ids = [share.share_id for share in shares]
-    likes_counts = session.exec(
-        select(Like.share_id, func.count(Like.id).label('count'))
-        .where(Like.share_id.in_(share_ids))
-        .group_by(Like.share_id)
-    ).all()
-    likes_map = {row[0]: row[1] for row in likes_counts}
-    
-    # Construire la liste avec les counts
-    posts_with_likes = []
-    for share in shares:
-        posts_with_likes.append({
-            "share": share,
-            "like_count": likes_map.get(share.share_id, 0),
-        })
-    
-    # Trier par likes (décroissant) puis par date
-    posts_with_likes.sort(key=lambda x: (-x["like_count"], -x["share"].created_at.timestamp()))
+        .join(TrendingScore, TrendingScore.share_id == Share.share_id)
+        .where(TrendingScore.created_at >= window_start())
+        .order_by(TrendingScore.score.desc(), TrendingScore.share_id.desc())
+        .limit(limit)
+    )).all()
     
     return [
         TrendingPost(
-            share_id=p["share"].share_id,
-            owner_id=p["share"].owner_id,
-            owner_username=p["share"].owner_username,
-            workout_title=p["share"].workout_title,
-            exercise_count=p["share"].exercise_count,
-            set_count=p["share"].set_count,
-            like_count=p["like_count"],
-            created_at=p["share"].created_at.isoformat(),
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            owner_username=share.owner_username,
+            workout_title=share.workout_title,
+            exercise_count=share.exercise_count,
+            set_count=share.set_count,
+            like_count=share.like_count,
+            created_at=share.created_at.isoformat(),
         )
-        for p in posts_with_likes[:limit]
+        for share in shares
     ]
 
 
 @router.get("/suggested-users", response_model=list[SuggestedUser])
-def get_suggested_users(
+async def get_suggested_users(
     current_user_id: Optional[str] = None,
     limit: int = Query(10, ge=1, le=30),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> list[SuggestedUser]:
     """Récupérer des suggestions d'utilisateurs à suivre."""
+    return await _suggested_users(current_user_id, limit, session)
+
+
+# Tout suivi peut changer le classement (abonnements communs, followers des candidats)
+@cached(
+    _SUGGESTED,
+    tags=("users", "follows"),
+    result_tags=lambda users: [f"user:{user.id}" for user in users],
+)
+async def _suggested_users(
+    current_user_id: Optional[str], limit: int, session: AsyncSession
+) -> list[SuggestedUser]:
+    """Amis d'amis classés par abonnements communs puis followers (`services.follow_graph`)."""
+    if FOLLOW_GRAPH.needs_refresh:
+        await session.run_sync(FOLLOW_GRAPH.refresh)
+    ranked = FOLLOW_GRAPH.suggest(current_user_id, limit)
+    # Utilisateur et nombre de posts (compteur dénormalisé) en une lecture
+    with_posts = select(User, UserStats.posts_count).outerjoin(
+        UserStats, UserStats.user_id == User.id
+    )
+    users = {
+        user.id: (user, posts_count)
+        for user, posts_count in (await session.exec(
+            with_posts.where(User.id.in_([user_id for user_id, _, _ in ranked]))
+        )).all()
+    } if ranked else {}
     
-    # Récupérer les IDs des utilisateurs déjà suivis
-    following_ids = set()
-    if current_user_id:
-        following = session.exec(
-            select(Follower.followed_id).where(Follower.follower_id == current_user_id)
-        ).all()
-        following_ids = set(following)
-        following_ids.add(current_user_id)  # Exclure soi-même
-    
-    # Optimisation: filtrer en SQL au lieu de charger tous les users
-    users_query = select(User)
-    if following_ids:
-        users_query = users_query.where(~User.id.in_(following_ids))
-    
-    # Limiter le nombre d'users récupérés
-    users = session.exec(users_query.limit(limit * 3)).all()
-    
-    if not users:
-        return []
-    
-    # Récupérer les counts pour tous les users en une seule requête groupée
-    user_ids = [user.id for user in users]
-    
-    # Compter followers pour tous les users
-    followers_counts = session.exec(
-        select(Follower.followed_id, func.count(Follower.id).label('count'))
-        .where(Follower.followed_id.in_(user_ids))
-        .group_by(Follower.followed_id)
-    ).all()
-    followers_map = {row[0]: row[1] for row in followers_counts}
-    
-    # Compter posts pour tous les users
-    posts_counts = session.exec(
-        select(Share.owner_id, func.count(Share.share_id).label('count'))
-        .where(Share.owner_id.in_(user_ids))
-        .group_by(Share.owner_id)
-    ).all()
-    posts_map = {row[0]: row[1] for row in posts_counts}
+    # Démarrage à froid (peu d'abonnements en base) : compléter avec d'autres comptes
+    missing = limit - len(users)
+    if missing > 0:
+        excluded = set(users)
+        if current_user_id:
+            excluded |= FOLLOW_GRAPH.following(current_user_id) | {current_user_id}
+        if excluded:
+            with_posts = with_posts.where(~User.id.in_(excluded))
+        for user, posts_count in (await session.exec(with_posts.limit(missing))).all():
+            users[user.id] = (user, posts_count)
+            ranked.append((user.id, 0, FOLLOW_GRAPH.followers_count(user.id)))
     
-    # Construire la liste avec les counts
     suggested = []
-    for user in users:
+    for user_id, mutual_count, followers_count in ranked:
+        if user_id not in users:  # supprimé depuis le chargement du graphe
+            continue
+        user, posts_count = users[user_id]
         suggested.append(SuggestedUser(
             id=user.id,
             username=user.username,
             avatar_url=user.avatar_url,
             bio=user.bio,
             objective=user.objective,
-            followers_count=followers_map.get(user.id, 0),
-            posts_count=posts_map.get(user.id, 0),
+            followers_count=followers_count,
+            posts_count=posts_count or 0,
+            mutual_count=mutual_count,
         ))
     
-    # Trier par nombre de followers (les plus populaires en premier)
-    suggested.sort(key=lambda x: -x.followers_count)
-    
-    return suggested[:limit]
+    return suggested
+
+
+async def _user_stats(session: AsyncSession, user_ids: list[str]) -> dict[str, UserStats]:
+    """Compteurs dénormalisés (`UserStats`) des utilisateurs, en une lecture par clé primaire."""
+    stats = (await session.exec(select(UserStats).where(UserStats.user_id.in_(user_ids)))).all()
+    return {row.user_id: row for row in stats}
 
 
 @router.get("/search", response_model=SearchResult)
-def search(
+async def search(
     q: str = Query(..., min_length=1),
     limit: int = Query(20, ge=1, le=50),
-    session: Session = Depends(get_session)
+    scope: Literal["all", "users", "posts"] = "all",
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ) -> SearchResult:
-    """Rechercher des utilisateurs et des posts."""
+    """Rechercher des utilisateurs et des posts (plein texte, classés par pertinence)."""
     
-    query = q.lower().strip()
-    search_pattern = f"%{query}%"
+    # Le curseur d'une liste ne vaut que pour elle : pagination par `scope`
+    if cursor and scope == "all":
+        raise HTTPException(status_code=400, detail="cursor_requires_scope")
     
-    # Optimisation: Rechercher des utilisateurs directement en SQL avec filtres
-    from sqlalchemy import or_
+    users, users_next_cursor = [], None
+    if scope in ("all", "users"):
+        users, users_next_cursor = await search_users(session, q, limit, cursor)
     
-    users_query = select(User).where(
-        or_(
-            User.username.ilike(search_pattern),
-            User.bio.ilike(search_pattern) if User.bio else False
+    # Compteurs de tous les users en une lecture
+    stats = await _user_stats(session, [user.id for user in users]) if users else {}
+    empty = UserStats()
+    matching_users = [
+        SuggestedUser(
+            id=user.id,
+            username=user.username,
+            avatar_url=user.avatar_url,
+            bio=user.bio,
+            objective=user.objective,
+            followers_count=stats.get(user.id, empty).followers_count,
+            posts_count=stats.get(user.id, empty).posts_count,
         )
-    ).limit(limit)
-    
-    users = session.exec(users_query).all()
-    
-    # Récupérer les counts pour tous les users en une seule requête
-    user_ids = [user.id for user in users]
-    matching_users = []
+        for user in users
+    ]
     
-    if user_ids:
-        # Compter followers et posts pour tous les users en une fois
-        followers_counts = session.exec(
-            select(Follower.followed_id, func.count(Follower.id).label('count'))
-            .where(Follower.followed_id.in_(user_ids))
-            .group_by(Follower.followed_id)
-        ).all()
-        followers_map = {row[0]: row[1] for row in followers_counts}
-        
-        posts_counts = session.exec(
-            select(Share.owner_id, func.count(Share.share_id).label('count'))
-            .where(Share.owner_id.in_(user_ids))
-            .group_by(Share.owner_id)
-        ).all()
-        posts_map = {row[0]: row[1] for row in posts_counts}
-        
-        for user in users:
-            matching_users.append(SuggestedUser(
-                id=user.id,
-                username=user.username,
-                avatar_url=user.avatar_url,
-                bio=user.bio,
-                objective=user.objective,
-                followers_count=followers_map.get(user.id, 0),
-                posts_count=posts_map.get(user.id, 0),
-            ))
+    shares, posts_next_cursor = [], None
+    if scope in ("all", "posts"):
+        shares, posts_next_cursor = await search_shares(session, q, limit, cursor)
     
-    # Optimisation: Rechercher des posts directement en SQL avec filtres
-    shares_query = select(Share).where(
-        or_(
-            Share.workout_title.ilike(search_pattern),
-            Share.owner_username.ilike(search_pattern)
+    matching_posts = [
+        TrendingPost(
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            owner_username=share.owner_username,
+            workout_title=share.workout_title,
+            exercise_count=share.exercise_count,
+            set_count=share.set_count,
+            like_count=share.like_count,
+            created_at=share.created_at.isoformat(),
         )
-    ).limit(limit)
-    
-    shares = session.exec(shares_query).all()
-    
-    # Récupérer les counts de likes pour tous les shares en une seule requête
-    share_ids = [share.share_id for share in shares]
-    matching_posts = []
-    
-    if share_ids:
-        likes_counts = session.exec(
-            select(Like.share_id, func.count(Like.id).label('count'))
-            .where(Like.share_id.in_(share_ids))
-            .group_by(Like.share_id)
-        ).all()
-        likes_map = {row[0]: row[1] for row in likes_counts}
-        
-        for share in shares:
-            matching_posts.append(TrendingPost(
-                share_id=share.share_id,
-                owner_id=share.owner_id,
-                owner_username=share.owner_username,
-                workout_title=share.workout_title,
-                exercise_count=share.exercise_count,
-                set_count=share.set_count,
-                like_count=likes_map.get(share.share_id, 0),
-                created_at=share.created_at.isoformat(),
-            ))
+        for share in shares
+    ]
     
     return SearchResult(
-        users=matching_users[:limit],
-        posts=matching_posts[:limit],
+        users=matching_users,
+        posts=matching_posts,
+        users_next_cursor=users_next_cursor,
+        posts_next_cursor=posts_next_cursor,
     )
 
 
+@router.get("/autocomplete", response_model=list[AutocompleteItem])
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: Optional[Literal["user", "exercise"]] = Query(None, alias="type"),
+    limit: int = Query(8, ge=1, le=20),
+    session: AsyncSession = Depends(get_async_session)
+) -> list[AutocompleteItem]:
+    """Suggestions au fil de la frappe (mentions `@`, choix d'exercice), par préfixe."""
+    # Sans écriture depuis le dernier appel, la réponse ne touche pas la base
+    if AUTOCOMPLETE.needs_refresh:
+        await session.run_sync(AUTOCOMPLETE.refresh)
+    return [
+        AutocompleteItem(type=item_type, id=item_id, label=label, slug=slug)
+        for item_type, item_id, label, slug in AUTOCOMPLETE.complete(q, limit, kind)
+    ]
+
+
 @router.get("", response_model=ExploreResponse)
-def get_explore(
+async def get_explore(
     current_user_id: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> ExploreResponse:
     """Page Explore complète avec trending et suggestions."""
     
-    trending = get_trending_posts(limit=12, session=session)
-    suggested = get_suggested_users(current_user_id=current_user_id, limit=5, session=session)
+    trending = await get_trending_posts(limit=12, session=session)
+    suggested = await get_suggested_users(current_user_id=current_user_id, limit=5, session=session)
     
     return ExploreResponse(
         trending_posts=trending,
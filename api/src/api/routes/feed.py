@@ -1,95 +1,127 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
-from sqlalchemy import func
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ..db import get_session
-from ..models import Follower, Share, User, Comment, Like
+from ..cache import invalidate_on_commit
+from ..db import get_async_session
+from ..models import FeedEntry, Follower, Share, User, Comment
 from ..schemas import FeedResponse, FeedItem, FollowRequest
+from ..services.counters import adjust_follow_counters
+from ..services.leaderboard import record_follow
+from ..services.timeline import backfill_timeline, prune_timeline
+from ..utils.pagination import keyset_before, paginate
+from ..utils.queries import latest_per_group
+from ..writer import run_write
 
 router = APIRouter(prefix="/feed", tags=["feed"])
 
+COMMENT_PREVIEW_COUNT = 2
+
 
 @router.post("/follow/{followed_id}", status_code=status.HTTP_204_NO_CONTENT)
-def follow_user(followed_id: str, payload: FollowRequest, session: Session = Depends(get_session)) -> Response:
+def follow_user(followed_id: str, payload: FollowRequest) -> Response:
     if payload.follower_id == followed_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cannot_follow_self")
 
-    follower = session.get(User, payload.follower_id)
-    followed = session.get(User, followed_id)
-    if follower is None or followed is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user_not_found")
-
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == payload.follower_id)
-        .where(Follower.followed_id == followed_id)
-    ).first()
-    if existing is None:
-        session.add(Follower(follower_id=payload.follower_id, followed_id=followed_id))
-        session.commit()
+    def write(session: Session) -> None:
+        follower = session.get(User, payload.follower_id)
+        followed = session.get(User, followed_id)
+        if follower is None or followed is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user_not_found")
+
+        existing = session.exec(
+            select(Follower)
+            .where(Follower.follower_id == payload.follower_id)
+            .where(Follower.followed_id == followed_id)
+        ).first()
+        if existing is None:
+            session.add(Follower(follower_id=payload.follower_id, followed_id=followed_id))
+            backfill_timeline(session, payload.follower_id, followed_id)
+            record_follow(session, followed_id, 1)
+            adjust_follow_counters(session, payload.follower_id, followed_id, 1)
+            invalidate_on_commit(
+                session,
+                "follows",
+                f"user:{followed_id}",
+                f"user:{payload.follower_id}",
+                f"following:{payload.follower_id}",  # graphe des suggestions
+            )
+
+    run_write(write)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.delete("/follow/{followed_id}", status_code=status.HTTP_204_NO_CONTENT)
-def unfollow_user(followed_id: str, payload: FollowRequest, session: Session = Depends(get_session)) -> Response:
-    statement = (
-        select(Follower)
-        .where(Follower.follower_id == payload.follower_id)
-        .where(Follower.followed_id == followed_id)
-    )
-    existing = session.exec(statement).first()
-    if existing is not None:
-        session.delete(existing)
-        session.commit()
+def unfollow_user(followed_id: str, payload: FollowRequest) -> Response:
+    def write(session: Session) -> None:
+        existing = session.exec(
+            select(Follower)
+            .where(Follower.follower_id == payload.follower_id)
+            .where(Follower.followed_id == followed_id)
+        ).first()
+        if existing is not None:
+            session.delete(existing)
+            prune_timeline(session, payload.follower_id, followed_id)
+            record_follow(session, followed_id, -1)
+            adjust_follow_counters(session, payload.follower_id, followed_id, -1)
+            invalidate_on_commit(
+                session,
+                "follows",
+                f"user:{followed_id}",
+                f"user:{payload.follower_id}",
+                f"following:{payload.follower_id}",  # graphe des suggestions
+            )
+
+    run_write(write)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("", response_model=FeedResponse)
-def get_feed(
+async def get_feed(
     user_id: str,
     limit: int = Query(10, ge=1, le=50),
     cursor: Optional[str] = Query(None),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> FeedResponse:
-    # Mode démo: créer l'utilisateur s'il n'existe pas
-    user = session.get(User, user_id)
-    if user is None:
-        # Créer un utilisateur temporaire pour le feed
-        user = User(
-            id=user_id,
-            username=f"User_{user_id[:8]}",
-            email=f"{user_id}@temp.local",
-            password_hash="temp_not_for_login",
-            consent_to_public_share=True,
-        )
-        session.add(user)
-        session.commit()
-
-    # Affiche les partages publics de tous les utilisateurs (simplifié pour le mode démo)
-    statement = select(Share)
-    parsed_cursor: Optional[datetime] = None
+    # Mode démo: créer l'utilisateur s'il n'existe pas (écriture via le writer)
+    if await session.get(User, user_id) is None:
+        def create_demo_user(write_session: Session) -> None:
+            if write_session.get(User, user_id) is None:
+                # Créer un utilisateur temporaire pour le feed
+                write_session.add(User(
+                    id=user_id,
+                    username=f"User_{user_id[:8]}",
+                    email=f"{user_id}@temp.local",
+                    password_hash="temp_not_for_login",
+                    consent_to_public_share=True,
+                ))
+                invalidate_on_commit(write_session, "users", f"user:{user_id}")
+
+        await run_in_threadpool(run_write, create_demo_user)
+
+    # Timeline de l'utilisateur : ses partages et ceux des comptes qu'il suit
+    statement = (
+        select(Share)
+        .join(FeedEntry, FeedEntry.share_id == Share.share_id)
+        .where(FeedEntry.user_id == user_id)
+    )
     if cursor:
-        try:
-            parsed_cursor = datetime.fromisoformat(cursor)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid cursor format. Expected ISO 8601 datetime string."
-            )
-        statement = statement.where(Share.created_at <= parsed_cursor)
-    statement = statement.order_by(Share.created_at.desc()).limit(limit + 1)
-
-    shares = session.exec(statement).all()
-    next_cursor = None
-    if len(shares) > limit:
-        next_cursor = shares[-1].created_at
-        shares = shares[:limit]
+        statement = statement.where(keyset_before(FeedEntry.created_at, FeedEntry.share_id, cursor))
+    statement = statement.order_by(
+        FeedEntry.created_at.desc(), FeedEntry.share_id.desc()
+    ).limit(limit + 1)
+
+    shares, next_cursor = paginate(
+        (await session.exec(statement)).all(),
+        limit,
+        key=lambda share: (share.created_at, share.share_id),
+    )
 
     # Optimisation: récupérer tous les share_ids pour faire des requêtes groupées
     share_ids = [share.share_id for share in shares]
@@ -97,37 +129,22 @@ def get_feed(
     if not share_ids:
         return FeedResponse(items=[], next_cursor=None)
     
-    # Récupérer tous les commentaires en une seule requête (limité à 2 par share)
-    # Pour chaque share, on veut les 2 derniers commentaires
-    all_comments = session.exec(
-        select(Comment)
-        .where(Comment.share_id.in_(share_ids))
-        .order_by(Comment.share_id, Comment.created_at.desc())
-    ).all()
+    # Les 2 derniers commentaires de chaque share, limités côté SQL
+    preview_comments = (await session.exec(
+        latest_per_group(
+            session,
+            Comment,
+            Comment.share_id,
+            [Comment.created_at, Comment.id],
+            share_ids,
+            n=COMMENT_PREVIEW_COUNT,
+        )
+    )).all()
     
-    # Grouper les commentaires par share_id et prendre les 2 premiers de chaque
     comments_by_share: dict[str, list[Comment]] = {}
-    for comment in all_comments:
-        if comment.share_id not in comments_by_share:
-            comments_by_share[comment.share_id] = []
-        if len(comments_by_share[comment.share_id]) < 2:
-            comments_by_share[comment.share_id].append(comment)
+    for comment in preview_comments:
+        comments_by_share.setdefault(comment.share_id, []).append(comment)
     
-    # Compter les commentaires et likes en une seule requête par type
-    comment_counts = session.exec(
-        select(Comment.share_id, func.count(Comment.id).label('count'))
-        .where(Comment.share_id.in_(share_ids))
-        .group_by(Comment.share_id)
-    ).all()
-    comment_count_map = {row[0]: row[1] for row in comment_counts}
-    
-    like_counts = session.exec(
-        select(Like.share_id, func.count(Like.id).label('count'))
-        .where(Like.share_id.in_(share_ids))
-        .group_by(Like.share_id)
-    ).all()
-    like_count_map = {row[0]: row[1] for row in like_counts}
-
     items = []
     for share in shares:
         
@@ -140,8 +157,8 @@ def get_feed(
             'exercise_count': share.exercise_count,
             'set_count': share.set_count,
             'created_at': share.created_at,
-            'like_count': like_count_map.get(share.share_id, 0),
-            'comment_count': comment_count_map.get(share.share_id, 0),
+            'like_count': share.like_count,
+            'comment_count': share.comment_count,
             'comments': [
                 {
                     'id': c.id,
@@ -152,5 +169,4 @@ def get_feed(
             ],
         })
 
-    cursor_value = next_cursor.isoformat() if next_cursor else None
-    return FeedResponse(items=items, next_cursor=cursor_value)
+    return FeedResponse(items=items, next_cursor=next_cursor)
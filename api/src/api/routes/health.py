@@ -1,8 +1,20 @@
 from fastapi import APIRouter
 
+from ..db import get_engine, sqlite_settings
+
 router = APIRouter(prefix="/health", tags=["health"])
 
 
 @router.get("", summary="Health check")
 async def get_health() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/db", summary="Database health and active SQLite settings")
+def get_db_health() -> dict:
+    engine = get_engine()
+    return {
+        "status": "ok",
+        "backend": engine.dialect.name,
+        "settings": sqlite_settings(engine),
+    }
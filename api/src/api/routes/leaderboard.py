@@ -1,12 +1,13 @@
 """API endpoints pour les classements."""
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
-from datetime import datetime, timezone, timedelta
 
-from ..db import get_session
-from ..models import User, Share, Like, Follower, Workout, Set
+from ..db import get_async_session
+from ..models import LeaderboardScore, User
+from ..services.leaderboard import period_keys, previous_ranks, rank_of
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
@@ -17,7 +18,7 @@ class LeaderboardEntry(BaseModel):
     username: str
     avatar_url: Optional[str]
     score: int
-    change: int  # Changement par rapport à la semaine dernière
+    change: int  # Places gagnées depuis la période de référence (> 0 = progression)
 
 
 class LeaderboardResponse(BaseModel):
@@ -27,235 +28,88 @@ class LeaderboardResponse(BaseModel):
     my_rank: Optional[int]
 
 
-@router.get("/volume", response_model=LeaderboardResponse)
-def get_volume_leaderboard(
-    period: str = Query("week", regex="^(week|month|all)$"),
-    current_user_id: Optional[str] = None,
-    limit: int = Query(20, ge=1, le=100),
-    session: Session = Depends(get_session)
+async def _leaderboard(
+    session: AsyncSession,
+    board: str,
+    period: str,
+    current_user_id: Optional[str],
+    limit: int,
 ) -> LeaderboardResponse:
-    """Classement par volume total (kg × reps)."""
-    
-    # Calculer la date de début selon la période
-    now = datetime.now(timezone.utc)
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:
-        start_date = None
+    """Lit le classement matérialisé : une requête `ORDER BY score DESC LIMIT n`."""
+    period_key = period_keys()[period]
+    rows = (await session.exec(
+        select(LeaderboardScore.user_id, LeaderboardScore.score, User.username, User.avatar_url)
+        .join(User, User.id == LeaderboardScore.user_id)
+        .where(LeaderboardScore.board == board)
+        .where(LeaderboardScore.period_key == period_key)
+        .where(LeaderboardScore.score > 0)
+        .order_by(LeaderboardScore.score.desc(), LeaderboardScore.user_id.desc())
+        .limit(limit)
+    )).all()
+
+    previous = await session.run_sync(previous_ranks, board, period, [row[0] for row in rows])
     
-    # Pour l'instant, on utilise les données de Share comme proxy
-    # (le volume réel nécessiterait de joindre les sets)
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        # Compter le nombre de sets partagés comme proxy du volume
-        shares_query = select(Share).where(Share.owner_id == user.id)
-        if start_date:
-            shares_query = shares_query.where(Share.created_at >= start_date)
-        shares = session.exec(shares_query).all()
-        
-        # Calculer un score basé sur les séances partagées
-        score = sum(s.set_count * 50 for s in shares)  # Approximation: 50kg moyenne par set
-        
-        if score > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": score,
-            })
-    
-    # Trier par score décroissant
-    entries.sort(key=lambda x: -x["score"])
-    
-    # Ajouter les rangs
     result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
+    for i, (user_id, score, username, avatar_url) in enumerate(rows):
         rank = i + 1
         result_entries.append(LeaderboardEntry(
             rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,  # TODO: calculer le changement
+            user_id=user_id,
+            username=username,
+            avatar_url=avatar_url,
+            score=score,
+            change=previous[user_id] - rank if user_id in previous else 0,
         ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
+
+    my_rank = None
+    if current_user_id:
+        my_rank = await session.run_sync(rank_of, board, period_key, current_user_id)
     
     return LeaderboardResponse(
-        type="volume",
+        type=board,
         period=period,
         entries=result_entries,
         my_rank=my_rank,
     )
 
 
+@router.get("/volume", response_model=LeaderboardResponse)
+async def get_volume_leaderboard(
+    period: str = Query("week", regex="^(week|month|all)$"),
+    current_user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+) -> LeaderboardResponse:
+    """Classement par volume total (kg × reps), semaine / mois calendaire ou global."""
+    return await _leaderboard(session, "volume", period, current_user_id, limit)
+
+
 @router.get("/sessions", response_model=LeaderboardResponse)
-def get_sessions_leaderboard(
+async def get_sessions_leaderboard(
     period: str = Query("week", regex="^(week|month|all)$"),
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de séances."""
-    
-    now = datetime.now(timezone.utc)
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:
-        start_date = None
-    
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        shares_query = select(func.count()).select_from(Share).where(Share.owner_id == user.id)
-        if start_date:
-            shares_query = shares_query.where(Share.created_at >= start_date)
-        count = session.exec(shares_query).one()
-        
-        if count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="sessions",
-        period=period,
-        entries=result_entries,
-        my_rank=my_rank,
-    )
+    return await _leaderboard(session, "sessions", period, current_user_id, limit)
 
 
 @router.get("/likes", response_model=LeaderboardResponse)
-def get_likes_leaderboard(
+async def get_likes_leaderboard(
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de likes reçus."""
-    
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        # Compter les likes sur les posts de l'utilisateur
-        shares = session.exec(select(Share.share_id).where(Share.owner_id == user.id)).all()
-        if shares:
-            likes_count = session.exec(
-                select(func.count()).select_from(Like).where(Like.share_id.in_(shares))
-            ).one()
-        else:
-            likes_count = 0
-        
-        if likes_count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": likes_count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="likes",
-        period="all",
-        entries=result_entries,
-        my_rank=my_rank,
-    )
+    return await _leaderboard(session, "likes", "all", current_user_id, limit)
 
 
 @router.get("/followers", response_model=LeaderboardResponse)
-def get_followers_leaderboard(
+async def get_followers_leaderboard(
     current_user_id: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> LeaderboardResponse:
     """Classement par nombre de followers."""
-    
-    users = session.exec(select(User)).all()
-    
-    entries = []
-    for user in users:
-        followers_count = session.exec(
-            select(func.count()).select_from(Follower).where(Follower.followed_id == user.id)
-        ).one()
-        
-        if followers_count > 0:
-            entries.append({
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": user.avatar_url,
-                "score": followers_count,
-            })
-    
-    entries.sort(key=lambda x: -x["score"])
-    
-    result_entries = []
-    my_rank = None
-    for i, entry in enumerate(entries[:limit]):
-        rank = i + 1
-        result_entries.append(LeaderboardEntry(
-            rank=rank,
-            user_id=entry["user_id"],
-            username=entry["username"],
-            avatar_url=entry["avatar_url"],
-            score=entry["score"],
-            change=0,
-        ))
-        if current_user_id and entry["user_id"] == current_user_id:
-            my_rank = rank
-    
-    return LeaderboardResponse(
-        type="followers",
-        period="all",
-        entries=result_entries,
-        my_rank=my_rank,
-    )
-
-
-
-
+    return await _leaderboard(session, "followers", "all", current_user_id, limit)
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import Response
 from pydantic import BaseModel
 from sqlmodel import Session, select, func
 from typing import Optional
 
-from ..db import get_session
-from ..models import Like, Share, User, Comment, Notification, CommentLike
+from ..cache import invalidate_on_commit
+from ..db import get_session, insert_for
+from ..models import Like, Share, User, Comment, CommentLike, generate_uuid
+from ..services.counters import adjust_share_counters, adjust_user_stats
+from ..services.leaderboard import record_like
+from ..services.trending import score_shares
+from ..utils.pagination import keyset_before, paginate
+from ..writer import run_write
+from .notifications import create_notification
 
 router = APIRouter(prefix="/likes", tags=["likes"])
 
@@ -35,62 +44,69 @@ class CommentResponse(BaseModel):
 class CommentsListResponse(BaseModel):
     comments: list[CommentResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 
 # ==================== LIKES ====================
 
 @router.post("/{share_id}", response_model=LikeResponse)
-def toggle_like(share_id: str, payload: LikeRequest, session: Session = Depends(get_session)) -> LikeResponse:
+def toggle_like(share_id: str, payload: LikeRequest) -> LikeResponse:
     """Toggle like sur un partage (like si pas liké, unlike si déjà liké)"""
-    
-    # Vérifier que le share existe
-    share = session.exec(select(Share).where(Share.share_id == share_id)).first()
-    if not share:
-        raise HTTPException(status_code=404, detail="share_not_found")
-    
-    # Vérifier que l'utilisateur existe
-    user = session.get(User, payload.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="user_not_found")
-    
-    # Chercher si déjà liké
-    existing_like = session.exec(
-        select(Like)
-        .where(Like.share_id == share_id)
-        .where(Like.user_id == payload.user_id)
-    ).first()
-    
-    if existing_like:
-        # Unlike
-        session.delete(existing_like)
-        session.commit()
-        liked = False
-    else:
-        # Like
-        new_like = Like(user_id=payload.user_id, share_id=share_id)
-        session.add(new_like)
-        session.commit()
-        liked = True
+
+    def write(session: Session) -> LikeResponse:
+        # Vérifier que le share existe
+        share = session.exec(select(Share).where(Share.share_id == share_id)).first()
+        if not share:
+            raise HTTPException(status_code=404, detail="share_not_found")
         
-        # Créer une notification si ce n'est pas son propre post
-        if share.owner_id != payload.user_id:
-            notification = Notification(
-                user_id=share.owner_id,
-                type="like",
-                actor_id=payload.user_id,
-                actor_username=user.username,
-                reference_id=share_id,
-                message=f"{user.username} a aimé ta séance",
-            )
-            session.add(notification)
-            session.commit()
-    
-    # Compter le nombre total de likes
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
-    
-    return LikeResponse(liked=liked, like_count=like_count)
+        # Vérifier que l'utilisateur existe
+        user = session.get(User, payload.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="user_not_found")
+        
+        # Chercher si déjà liké
+        existing_like = session.exec(
+            select(Like)
+            .where(Like.share_id == share_id)
+            .where(Like.user_id == payload.user_id)
+        ).first()
+        
+        if existing_like:
+            # Unlike
+            session.delete(existing_like)
+            adjust_share_counters(session, share_id, likes=-1)
+            record_like(session, share.owner_id, -1)
+            adjust_user_stats(session, share.owner_id, likes=-1)
+            liked = False
+        else:
+            # Like
+            session.add(Like(user_id=payload.user_id, share_id=share_id))
+            adjust_share_counters(session, share_id, likes=1)
+            record_like(session, share.owner_id, 1)
+            adjust_user_stats(session, share.owner_id, likes=1)
+            liked = True
+            
+            # Créer une notification si ce n'est pas son propre post
+            if share.owner_id != payload.user_id:
+                create_notification(
+                    session,
+                    user_id=share.owner_id,
+                    type="like",
+                    actor_id=payload.user_id,
+                    actor_username=user.username,
+                    reference_id=share_id,
+                    message=f"{user.username} a aimé ta séance",
+                )
+        
+        # Classement des tendances et total de likes du profil de l'auteur
+        score_shares(session, share_id)
+        invalidate_on_commit(session, f"user:{share.owner_id}")
+        
+        # Compteur dénormalisé, relu après la mise à jour
+        like_count = session.exec(select(Share.like_count).where(Share.share_id == share_id)).one()
+        return LikeResponse(liked=liked, like_count=like_count)
+
+    return run_write(write)
 
 
 @router.get("/{share_id}/status")
@@ -103,94 +119,101 @@ def get_like_status(share_id: str, user_id: str, session: Session = Depends(get_
         .where(Like.user_id == user_id)
     ).first()
     
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
+    like_count = session.exec(select(Share.like_count).where(Share.share_id == share_id)).first()
     
-    return LikeResponse(liked=existing_like is not None, like_count=like_count)
+    return LikeResponse(liked=existing_like is not None, like_count=like_count or 0)
 
 
 @router.get("/{share_id}/count")
 def get_like_count(share_id: str, session: Session = Depends(get_session)) -> dict:
     """Récupère le nombre de likes d'un partage"""
     
-    like_count = session.exec(
-        select(func.count()).select_from(Like).where(Like.share_id == share_id)
-    ).one()
+    like_count = session.exec(select(Share.like_count).where(Share.share_id == share_id)).first()
     
-    return {"share_id": share_id, "like_count": like_count}
+    return {"share_id": share_id, "like_count": like_count or 0}
 
 
 # ==================== COMMENTS ====================
 
 @router.post("/{share_id}/comments", response_model=CommentResponse)
-def add_comment(share_id: str, payload: CommentRequest, session: Session = Depends(get_session)) -> CommentResponse:
+def add_comment(share_id: str, payload: CommentRequest) -> CommentResponse:
     """Ajouter un commentaire sur un partage"""
     
-    # Vérifier que le share existe
-    share = session.exec(select(Share).where(Share.share_id == share_id)).first()
-    if not share:
-        raise HTTPException(status_code=404, detail="share_not_found")
-    
-    # Vérifier que l'utilisateur existe
-    user = session.get(User, payload.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="user_not_found")
-    
     # Valider le contenu
     content = payload.content.strip()
     if not content:
         raise HTTPException(status_code=400, detail="empty_comment")
     if len(content) > 500:
         raise HTTPException(status_code=400, detail="comment_too_long")
-    
-    # Créer le commentaire
-    comment = Comment(
-        user_id=payload.user_id,
-        username=user.username,
-        share_id=share_id,
-        content=content,
-    )
-    session.add(comment)
-    session.commit()
-    session.refresh(comment)
-    
-    # Créer une notification si ce n'est pas son propre post
-    if share.owner_id != payload.user_id:
-        notification = Notification(
-            user_id=share.owner_id,
-            type="comment",
-            actor_id=payload.user_id,
-            actor_username=user.username,
-            reference_id=share_id,
-            message=f"{user.username} a commenté ta séance: \"{content[:50]}{'...' if len(content) > 50 else ''}\"",
+
+    def write(session: Session) -> CommentResponse:
+        # Vérifier que le share existe
+        share = session.exec(select(Share).where(Share.share_id == share_id)).first()
+        if not share:
+            raise HTTPException(status_code=404, detail="share_not_found")
+        
+        # Vérifier que l'utilisateur existe
+        user = session.get(User, payload.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="user_not_found")
+        
+        # Créer le commentaire
+        comment = Comment(
+            user_id=payload.user_id,
+            username=user.username,
+            share_id=share_id,
+            content=content,
         )
-        session.add(notification)
-        session.commit()
-    
-    return CommentResponse(
-        id=comment.id,
-        user_id=comment.user_id,
-        username=comment.username,
-        content=comment.content,
-        created_at=comment.created_at.isoformat(),
-    )
+        session.add(comment)
+        adjust_share_counters(session, share_id, comments=1)
+        score_shares(session, share_id)
+        
+        # Créer une notification si ce n'est pas son propre post
+        if share.owner_id != payload.user_id:
+            excerpt = f"{content[:50]}{'...' if len(content) > 50 else ''}"
+            create_notification(
+                session,
+                user_id=share.owner_id,
+                type="comment",
+                actor_id=payload.user_id,
+                actor_username=user.username,
+                reference_id=share_id,
+                message=f"{user.username} a commenté ta séance: \"{excerpt}\"",
+            )
+        session.flush()
+        
+        return CommentResponse(
+            id=comment.id,
+            user_id=comment.user_id,
+            username=comment.username,
+            content=comment.content,
+            created_at=comment.created_at.isoformat(),
+        )
+
+    return run_write(write)
 
 
 @router.get("/{share_id}/comments", response_model=CommentsListResponse)
-def get_comments(share_id: str, limit: int = 20, session: Session = Depends(get_session)) -> CommentsListResponse:
-    """Récupérer les commentaires d'un partage"""
+def get_comments(
+    share_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> CommentsListResponse:
+    """Récupérer les commentaires d'un partage (pagination par curseur)"""
+    
+    statement = select(Comment).where(Comment.share_id == share_id)
+    if cursor:
+        statement = statement.where(keyset_before(Comment.created_at, Comment.id, cursor))
+    comments, next_cursor = paginate(
+        session.exec(
+            statement.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1)
+        ).all(),
+        limit,
+        key=lambda comment: (comment.created_at, comment.id),
+    )
     
-    comments = session.exec(
-        select(Comment)
-        .where(Comment.share_id == share_id)
-        .order_by(Comment.created_at.desc())
-        .limit(limit)
-    ).all()
-    
-    total = session.exec(
-        select(func.count()).select_from(Comment).where(Comment.share_id == share_id)
-    ).one()
+    total = session.exec(select(Share.comment_count).where(Share.share_id == share_id)).first() or 0
     
     return CommentsListResponse(
         comments=[
@@ -204,23 +227,27 @@ def get_comments(share_id: str, limit: int = 20, session: Session = Depends(get_
             for c in comments
         ],
         total=total,
+        next_cursor=next_cursor,
     )
 
 
 @router.delete("/{share_id}/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comment(share_id: str, comment_id: str, user_id: str, session: Session = Depends(get_session)) -> Response:
+def delete_comment(share_id: str, comment_id: str, user_id: str) -> Response:
     """Supprimer un commentaire (seulement par son auteur)"""
-    
-    comment = session.get(Comment, comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="comment_not_found")
-    
-    if comment.user_id != user_id:
-        raise HTTPException(status_code=403, detail="not_authorized")
-    
-    session.delete(comment)
-    session.commit()
-    
+
+    def write(session: Session) -> None:
+        comment = session.get(Comment, comment_id)
+        if not comment:
+            raise HTTPException(status_code=404, detail="comment_not_found")
+
+        if comment.user_id != user_id:
+            raise HTTPException(status_code=403, detail="not_authorized")
+
+        session.delete(comment)
+        adjust_share_counters(session, comment.share_id, comments=-1)
+        score_shares(session, comment.share_id)
+
+    run_write(write)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -232,39 +259,50 @@ class CommentLikeResponse(BaseModel):
 
 
 @router.post("/comment/{comment_id}/like", response_model=CommentLikeResponse)
-def toggle_comment_like(comment_id: str, payload: LikeRequest, session: Session = Depends(get_session)) -> CommentLikeResponse:
+def toggle_comment_like(comment_id: str, payload: LikeRequest) -> CommentLikeResponse:
     """Toggle like sur un commentaire"""
-    
-    # Vérifier que le commentaire existe
-    comment = session.get(Comment, comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="comment_not_found")
-    
-    # Chercher un like existant
-    existing_like = session.exec(
-        select(CommentLike)
-        .where(CommentLike.comment_id == comment_id)
-        .where(CommentLike.user_id == payload.user_id)
-    ).first()
-    
-    if existing_like:
-        # Unlike
-        session.delete(existing_like)
-        session.commit()
-        liked = False
-    else:
-        # Like
-        new_like = CommentLike(comment_id=comment_id, user_id=payload.user_id)
-        session.add(new_like)
-        session.commit()
-        liked = True
-    
-    # Compter les likes
-    like_count = session.exec(
-        select(func.count()).select_from(CommentLike).where(CommentLike.comment_id == comment_id)
-    ).one()
-    
-    return CommentLikeResponse(liked=liked, like_count=like_count)
+
+    def write(session: Session) -> CommentLikeResponse:
+        # Vérifier que le commentaire existe
+        comment = session.get(Comment, comment_id)
+        if not comment:
+            raise HTTPException(status_code=404, detail="comment_not_found")
+
+        # Chercher un like existant
+        existing_like = session.exec(
+            select(CommentLike)
+            .where(CommentLike.comment_id == comment_id)
+            .where(CommentLike.user_id == payload.user_id)
+        ).first()
+
+        if existing_like:
+            # Unlike
+            session.delete(existing_like)
+            liked = False
+        else:
+            # Like ; un double clic concurrent bute sur l'index unique et ne fait rien
+            session.execute(
+                insert_for(session, CommentLike)
+                .values(
+                    id=generate_uuid(),
+                    comment_id=comment_id,
+                    user_id=payload.user_id,
+                    created_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing(index_elements=["comment_id", "user_id"])
+            )
+            liked = True
+        session.flush()
+
+        # Compter les likes
+        like_count = session.exec(
+            select(func.count())
+            .select_from(CommentLike)
+            .where(CommentLike.comment_id == comment_id)
+        ).one()
+        return CommentLikeResponse(liked=liked, like_count=like_count)
+
+    return run_write(write)
 
 
 @router.get("/comment/{comment_id}/like", response_model=CommentLikeResponse)
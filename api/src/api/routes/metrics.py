@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..metrics import render
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Prometheus metrics")
+async def get_metrics() -> PlainTextResponse:
+    # `async` : lu sur la boucle d'événements, comme le middleware qui écrit les compteurs
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
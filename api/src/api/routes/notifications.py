@@ -2,10 +2,13 @@
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 
-from ..db import get_session
+from ..db import get_async_session
 from ..models import Notification, User, Share, Like, Comment, Follower
+from ..utils.pagination import keyset_before, paginate
+from ..writer import run_write
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -24,6 +27,7 @@ class NotificationResponse(BaseModel):
 class NotificationListResponse(BaseModel):
     notifications: list[NotificationResponse]
     unread_count: int
+    next_cursor: Optional[str] = None
 
 
 def create_notification(
@@ -35,7 +39,7 @@ def create_notification(
     message: str,
     reference_id: Optional[str] = None
 ) -> Notification:
-    """Créer une nouvelle notification."""
+    """Créer une nouvelle notification (commit à la charge de l'appelant, cf. `writer.run_write`)."""
     notification = Notification(
         user_id=user_id,
         type=type,
@@ -46,25 +50,29 @@ def create_notification(
         read=False,
     )
     session.add(notification)
-    session.commit()
-    session.refresh(notification)
+    session.flush()
     return notification
 
 
 @router.get("/{user_id}", response_model=NotificationListResponse)
-def get_notifications(
+async def get_notifications(
     user_id: str,
     limit: int = Query(50, ge=1, le=100),
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = Query(None),
+    session: AsyncSession = Depends(get_async_session)
 ) -> NotificationListResponse:
-    """Récupérer les notifications d'un utilisateur."""
+    """Récupérer les notifications d'un utilisateur (pagination par curseur)."""
     
-    notifications = session.exec(
-        select(Notification)
-        .where(Notification.user_id == user_id)
-        .order_by(Notification.created_at.desc())
-        .limit(limit)
-    ).all()
+    statement = select(Notification).where(Notification.user_id == user_id)
+    if cursor:
+        statement = statement.where(keyset_before(Notification.created_at, Notification.id, cursor))
+    notifications, next_cursor = paginate(
+        (await session.exec(
+            statement.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
+        )).all(),
+        limit,
+        key=lambda notification: (notification.created_at, notification.id),
+    )
     
     unread_count = len([n for n in notifications if not n.read])
     
@@ -83,63 +91,59 @@ def get_notifications(
             for n in notifications
         ],
         unread_count=unread_count,
+        next_cursor=next_cursor,
     )
 
 
 @router.post("/{user_id}/read-all")
-def mark_all_read(
-    user_id: str,
-    session: Session = Depends(get_session)
-) -> dict:
+def mark_all_read(user_id: str) -> dict:
     """Marquer toutes les notifications comme lues."""
-    
-    notifications = session.exec(
-        select(Notification)
-        .where(Notification.user_id == user_id)
-        .where(Notification.read == False)
-    ).all()
-    
-    for n in notifications:
-        n.read = True
-        session.add(n)
-    
-    session.commit()
-    
-    return {"marked_read": len(notifications)}
+
+    def write(session: Session) -> int:
+        notifications = session.exec(
+            select(Notification)
+            .where(Notification.user_id == user_id)
+            .where(Notification.read == False)
+        ).all()
+
+        for n in notifications:
+            n.read = True
+            session.add(n)
+        return len(notifications)
+
+    return {"marked_read": run_write(write)}
 
 
 @router.post("/{notification_id}/read")
-def mark_read(
-    notification_id: str,
-    session: Session = Depends(get_session)
-) -> dict:
+def mark_read(notification_id: str) -> dict:
     """Marquer une notification comme lue."""
-    
-    notification = session.get(Notification, notification_id)
-    if notification:
+
+    def write(session: Session) -> bool:
+        notification = session.get(Notification, notification_id)
+        if notification is None:
+            return False
         notification.read = True
         session.add(notification)
-        session.commit()
+        return True
+
+    if run_write(write):
         return {"success": True}
-    
+
     return {"success": False, "error": "Notification not found"}
 
 
 @router.delete("/{notification_id}")
-def delete_notification(
-    notification_id: str,
-    session: Session = Depends(get_session)
-) -> dict:
+def delete_notification(notification_id: str) -> dict:
     """Supprimer une notification."""
-    
-    notification = session.get(Notification, notification_id)
-    if notification:
-        session.delete(notification)
-        session.commit()
-        return {"success": True}
-    
-    return {"success": False, "error": "Notification not found"}
-
 
+    def write(session: Session) -> bool:
+        notification = session.get(Notification, notification_id)
+        if notification is None:
+            return False
+        session.delete(notification)
+        return True
 
+    if run_write(write):
+        return {"success": True}
 
+    return {"success": False, "error": "Notification not found"}
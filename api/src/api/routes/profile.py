@@ -1,16 +1,28 @@
 """API endpoints pour les profils utilisateurs."""
 import base64
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from sqlmodel import Session, select, func
+from sqlalchemy import and_
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 
-from ..db import get_session
-from ..models import User, Share, Follower, Like, Notification
+from ..cache import Cache, cached, invalidate_on_commit
+from ..db import get_async_session, get_read_session, get_session
+from ..models import User, Share, Follower, UserStats
+from ..services.counters import adjust_follow_counters
+from ..services.leaderboard import record_follow
+from ..services.timeline import backfill_timeline, prune_timeline
+from ..utils.pagination import keyset_before, paginate
+from ..writer import run_write
+from .notifications import create_notification
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 
+# Profils servis depuis la mémoire jusqu'à la prochaine écriture sur `user:{id}`
+_PROFILES = Cache("profiles", max_entries=4096, ttl=60)
+
 
 class ProfileResponse(BaseModel):
     id: str
@@ -38,69 +50,55 @@ class ProfileUpdateRequest(BaseModel):
 class UserPostsResponse(BaseModel):
     posts: list[dict]
     total: int
+    next_cursor: Optional[str] = None
 
 
-@router.get("/{user_id}", response_model=ProfileResponse)
-def get_profile(
-    user_id: str,
-    current_user_id: Optional[str] = None,
-    session: Session = Depends(get_session)
+@cached(_PROFILES, tags=("user:{user_id}",))
+def _build_profile(
+    session: Session, user_id: str, current_user_id: Optional[str]
 ) -> ProfileResponse:
-    """Récupérer le profil complet d'un utilisateur."""
-    
-    user = session.get(User, user_id)
-    if not user:
+    # Une seule lecture : utilisateur, compteurs dénormalisés et suivi par le lecteur
+    # (sans lecteur, `follower_id IS NULL` ne trouve rien)
+    row = session.exec(
+        select(User, UserStats, Follower.id)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .outerjoin(
+            Follower,
+            and_(Follower.followed_id == User.id, Follower.follower_id == current_user_id),
+        )
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="user_not_found")
-    
-    # Compter les posts (shares)
-    posts_count = session.exec(
-        select(func.count()).select_from(Share).where(Share.owner_id == user_id)
-    ).one()
-    
-    # Compter les followers
-    followers_count = session.exec(
-        select(func.count()).select_from(Follower).where(Follower.followed_id == user_id)
-    ).one()
-    
-    # Compter les following
-    following_count = session.exec(
-        select(func.count()).select_from(Follower).where(Follower.follower_id == user_id)
-    ).one()
-    
-    # Compter les likes reçus sur tous ses posts
-    user_shares = session.exec(select(Share.share_id).where(Share.owner_id == user_id)).all()
-    total_likes = 0
-    if user_shares:
-        total_likes = session.exec(
-            select(func.count()).select_from(Like).where(Like.share_id.in_(user_shares))
-        ).one()
-    
-    # Vérifier si l'utilisateur courant suit ce profil
-    is_following = False
-    if current_user_id and current_user_id != user_id:
-        follow = session.exec(
-            select(Follower)
-            .where(Follower.follower_id == current_user_id)
-            .where(Follower.followed_id == user_id)
-        ).first()
-        is_following = follow is not None
-    
+    user, stats, follow_id = row
+    stats = stats or UserStats(user_id=user_id)
+
     return ProfileResponse(
         id=user.id,
         username=user.username,
         avatar_url=user.avatar_url,
         bio=user.bio,
         objective=user.objective,
-        posts_count=posts_count,
-        followers_count=followers_count,
-        following_count=following_count,
-        total_likes=total_likes,
-        is_following=is_following,
+        posts_count=stats.posts_count,
+        followers_count=stats.followers_count,
+        following_count=stats.following_count,
+        total_likes=stats.likes_received,
+        is_following=follow_id is not None,
         is_own_profile=current_user_id == user_id,
         created_at=user.created_at.isoformat(),
     )
 
 
+@router.get("/{user_id}", response_model=ProfileResponse)
+async def get_profile(
+    user_id: str,
+    current_user_id: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
+) -> ProfileResponse:
+    """Récupérer le profil complet d'un utilisateur."""
+    return await session.run_sync(_build_profile, user_id, current_user_id)
+
+
 @router.put("/{user_id}", response_model=ProfileResponse)
 def update_profile(
     user_id: str,
@@ -123,86 +121,92 @@ def update_profile(
         user.objective = payload.objective
     
     session.add(user)
+    invalidate_on_commit(session, f"user:{user_id}")
     session.commit()
     session.refresh(user)
     
     # Retourner le profil mis à jour
-    return get_profile(user_id, user_id, session)
+    return _build_profile(session, user_id, user_id)
 
 
 @router.get("/{user_id}/posts", response_model=UserPostsResponse)
 def get_user_posts(
     user_id: str,
-    limit: int = 20,
-    session: Session = Depends(get_session)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_read_session)
 ) -> UserPostsResponse:
-    """Récupérer les posts d'un utilisateur."""
+    """Récupérer les posts d'un utilisateur (pagination par curseur)."""
     
-    user = session.get(User, user_id)
-    if not user:
+    # Existence et total en une lecture : le compteur dénormalisé remplace le COUNT(*)
+    owner = session.exec(
+        select(User.id, UserStats.posts_count)
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if owner is None:
         raise HTTPException(status_code=404, detail="user_not_found")
-    
-    shares = session.exec(
-        select(Share)
-        .where(Share.owner_id == user_id)
-        .order_by(Share.created_at.desc())
-        .limit(limit)
-    ).all()
-    
-    total = session.exec(
-        select(func.count()).select_from(Share).where(Share.owner_id == user_id)
-    ).one()
+    total = owner.posts_count or 0
+    
+    statement = select(Share).where(Share.owner_id == user_id)
+    if cursor:
+        statement = statement.where(keyset_before(Share.created_at, Share.share_id, cursor))
+    shares, next_cursor = paginate(
+        session.exec(
+            statement.order_by(Share.created_at.desc(), Share.share_id.desc()).limit(limit + 1)
+        ).all(),
+        limit,
+        key=lambda share: (share.created_at, share.share_id),
+    )
     
     posts = []
     for share in shares:
-        # Compter les likes pour ce post
-        like_count = session.exec(
-            select(func.count()).select_from(Like).where(Like.share_id == share.share_id)
-        ).one()
-        
         posts.append({
             "share_id": share.share_id,
             "workout_title": share.workout_title,
             "exercise_count": share.exercise_count,
             "set_count": share.set_count,
-            "like_count": like_count,
+            "like_count": share.like_count,
             "created_at": share.created_at.isoformat(),
         })
     
-    return UserPostsResponse(posts=posts, total=total)
+    return UserPostsResponse(posts=posts, total=total, next_cursor=next_cursor)
 
 
 @router.post("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
-def follow_user(
-    user_id: str,
-    follower_id: str,
-    session: Session = Depends(get_session)
-):
+def follow_user(user_id: str, follower_id: str):
     """Suivre un utilisateur."""
     
     if follower_id == user_id:
         raise HTTPException(status_code=400, detail="cannot_follow_self")
-    
-    # Vérifier que les deux utilisateurs existent
-    user = session.get(User, user_id)
-    follower = session.get(User, follower_id)
-    if not user or not follower:
-        raise HTTPException(status_code=404, detail="user_not_found")
-    
-    # Vérifier si déjà suivi
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == follower_id)
-        .where(Follower.followed_id == user_id)
-    ).first()
-    
-    if not existing:
-        follow = Follower(follower_id=follower_id, followed_id=user_id)
-        session.add(follow)
-        session.commit()
+
+    def write(session: Session) -> None:
+        # Vérifier que les deux utilisateurs existent
+        user = session.get(User, user_id)
+        follower = session.get(User, follower_id)
+        if not user or not follower:
+            raise HTTPException(status_code=404, detail="user_not_found")
+        
+        # Vérifier si déjà suivi
+        existing = session.exec(
+            select(Follower)
+            .where(Follower.follower_id == follower_id)
+            .where(Follower.followed_id == user_id)
+        ).first()
+        if existing:
+            return
+        
+        session.add(Follower(follower_id=follower_id, followed_id=user_id))
+        backfill_timeline(session, follower_id, user_id)
+        record_follow(session, user_id, 1)
+        adjust_follow_counters(session, follower_id, user_id, 1)
+        invalidate_on_commit(
+            session, "follows", f"user:{user_id}", f"user:{follower_id}", f"following:{follower_id}"
+        )
         
         # Créer une notification pour le suivi
-        notification = Notification(
+        create_notification(
+            session,
             user_id=user_id,
             type="follow",
             actor_id=follower_id,
@@ -210,34 +214,41 @@ def follow_user(
             reference_id=None,
             message=f"{follower.username} a commencé à te suivre",
         )
-        session.add(notification)
-        session.commit()
+
+    run_write(write)
 
 
 @router.delete("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
-def unfollow_user(
-    user_id: str,
-    follower_id: str,
-    session: Session = Depends(get_session)
-):
+def unfollow_user(user_id: str, follower_id: str):
     """Ne plus suivre un utilisateur."""
-    
-    existing = session.exec(
-        select(Follower)
-        .where(Follower.follower_id == follower_id)
-        .where(Follower.followed_id == user_id)
-    ).first()
-    
-    if existing:
-        session.delete(existing)
-        session.commit()
+
+    def write(session: Session) -> None:
+        existing = session.exec(
+            select(Follower)
+            .where(Follower.follower_id == follower_id)
+            .where(Follower.followed_id == user_id)
+        ).first()
+        if existing:
+            session.delete(existing)
+            prune_timeline(session, follower_id, user_id)
+            record_follow(session, user_id, -1)
+            adjust_follow_counters(session, follower_id, user_id, -1)
+            invalidate_on_commit(
+                session,
+                "follows",
+                f"user:{user_id}",
+                f"user:{follower_id}",
+                f"following:{follower_id}",
+            )
+
+    run_write(write)
 
 
 @router.get("/{user_id}/followers")
 def get_followers(
     user_id: str,
     limit: int = 50,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ) -> dict:
     """Liste des followers d'un utilisateur."""
     
@@ -265,7 +276,7 @@ def get_followers(
 def get_following(
     user_id: str,
     limit: int = 50,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ) -> dict:
     """Liste des utilisateurs suivis."""
     
@@ -341,6 +352,7 @@ def upload_avatar(
     # Mettre à jour l'utilisateur
     user.avatar_url = avatar_url
     session.add(user)
+    invalidate_on_commit(session, f"user:{user_id}")
     session.commit()
     
     return AvatarUploadResponse(avatar_url=avatar_url, success=True)
@@ -359,5 +371,6 @@ def delete_avatar(
     
     user.avatar_url = None
     session.add(user)
+    invalidate_on_commit(session, f"user:{user_id}")
     session.commit()
 
@@ -6,11 +6,17 @@ from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter
 from sqlmodel import Session, select
 
+from src.api.cache import clear_caches
 from src.api.db import get_engine
 from src.api.models import (
     User, Share, Follower, Workout, WorkoutExercise, 
     Set, Exercise, Like, Notification, Comment
 )
+from src.api.services.counters import recompute_share_counters, recompute_user_stats
+from src.api.services.leaderboard import rebuild_leaderboards
+from src.api.services.timeline import rebuild_timelines
+from src.api.services.trending import rebuild_trending
+from src.api.services.volume import rebuild_daily_volume
 
 router = APIRouter(prefix="/seed", tags=["seed"])
 
@@ -292,6 +298,8 @@ def seed_demo_data():
                 session.add(Follower(follower_id=follower_id, followed_id=followed_id))
                 created_follows += 1
         
+        session.flush()
+        rebuild_timelines(session)
         session.commit()
         
         # Likes
@@ -355,6 +363,12 @@ def seed_demo_data():
                 session.add(comment)
                 created_comments += 1
         
+        session.flush()
+        recompute_share_counters(session)
+        recompute_user_stats(session)
+        rebuild_daily_volume(session)
+        rebuild_leaderboards(session)
+        rebuild_trending(session)
         session.commit()
         
         # Notifications
@@ -382,6 +396,8 @@ def seed_demo_data():
             created_notifications += 1
         
         session.commit()
+        # Chargement en masse : plus rien de ce qui est en cache n'est sûr
+        clear_caches()
         
         return {
             "status": "success",
@@ -3,13 +3,18 @@ from __future__ import annotations
 import uuid
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, HTTPException, status
 from sqlmodel import Session, select
 
-from ..db import get_session
+from ..cache import invalidate_on_commit
 from ..models import Exercise, Share, User, Workout, WorkoutExercise, Set
 from ..utils.slug import make_exercise_slug
 from ..schemas import ShareRequest, ShareResponse
+from ..services.counters import adjust_user_stats
+from ..services.leaderboard import record_share
+from ..services.timeline import fan_out_share
+from ..services.trending import score_shares
+from ..writer import run_write
 
 router = APIRouter(prefix="/share", tags=["share"])
 
@@ -89,63 +94,69 @@ def _fetch_workout_snapshot(session: Session, workout_id: str) -> dict:
 def share_workout(
     workout_id: str,  # Changé en str pour supporter les UUIDs
     payload: ShareRequest,
-    session: Session = Depends(get_session),
 ) -> ShareResponse:
-    # Créer l'utilisateur s'il n'existe pas (mode démo)
-    user = session.get(User, payload.user_id)
-    if user is None:
-        user = User(
-            id=payload.user_id,
-            username=f"User_{payload.user_id[:8]}",
-            email=f"{payload.user_id}@temp.local",
-            password_hash="temp_not_for_login",
-            consent_to_public_share=True,
+
+    def write(session: Session) -> ShareResponse:
+        # Créer l'utilisateur s'il n'existe pas (mode démo), dans la même transaction
+        user = session.get(User, payload.user_id)
+        if user is None:
+            user = User(
+                id=payload.user_id,
+                username=f"User_{payload.user_id[:8]}",
+                email=f"{payload.user_id}@temp.local",
+                password_hash="temp_not_for_login",
+                consent_to_public_share=True,
+            )
+            session.add(user)
+            invalidate_on_commit(session, "users", f"user:{user.id}")
+
+        # Récupérer le workout
+        workout = session.get(Workout, workout_id)
+
+        if workout is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="workout_not_found")
+
+        # Permettre le partage même des brouillons en mode démo
+        # (commenté la vérification du status)
+        # if workout.status != "completed":
+        #     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="workout_not_completed")
+
+        # Compter les exercices et sets
+        workout_exercises = session.exec(
+            select(WorkoutExercise).where(WorkoutExercise.workout_id == workout_id)
+        ).all()
+
+        exercise_count = len(workout_exercises)
+        set_count = 0
+        for we in workout_exercises:
+            sets = session.exec(select(Set).where(Set.workout_exercise_id == we.id)).all()
+            set_count += len(sets)
+
+        share = Share(
+            share_id=_generate_share_id(),
+            owner_id=user.id,
+            owner_username=user.username,
+            workout_id=workout_id,
+            workout_title=workout.title,
+            exercise_count=exercise_count,
+            set_count=set_count,
+            created_at=datetime.now(timezone.utc),
+        )
+        session.add(share)
+        fan_out_share(session, share)
+        record_share(session, share)
+        adjust_user_stats(session, user.id, posts=1)
+        score_shares(session, share.share_id)
+        invalidate_on_commit(session, f"user:{user.id}")
+
+        return ShareResponse(
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+            owner_username=share.owner_username,
+            workout_title=share.workout_title,
+            exercise_count=share.exercise_count,
+            set_count=share.set_count,
+            created_at=share.created_at,
         )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
 
-    # Récupérer le workout
-    workout = session.get(Workout, workout_id)
-    
-    if workout is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="workout_not_found")
-    
-    # Permettre le partage même des brouillons en mode démo
-    # (commenté la vérification du status)
-    # if workout.status != "completed":
-    #     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="workout_not_completed")
-
-    # Compter les exercices et sets
-    workout_exercises = session.exec(
-        select(WorkoutExercise).where(WorkoutExercise.workout_id == workout_id)
-    ).all()
-    
-    exercise_count = len(workout_exercises)
-    set_count = 0
-    for we in workout_exercises:
-        sets = session.exec(select(Set).where(Set.workout_exercise_id == we.id)).all()
-        set_count += len(sets)
-
-    share = Share(
-        share_id=_generate_share_id(),
-        owner_id=user.id,
-        owner_username=user.username,
-        workout_id=workout_id,
-        workout_title=workout.title,
-        exercise_count=exercise_count,
-        set_count=set_count,
-        created_at=datetime.now(timezone.utc),
-    )
-    session.add(share)
-    session.commit()
-
-    return ShareResponse(
-        share_id=share.share_id,
-        owner_id=share.owner_id,
-        owner_username=share.owner_username,
-        workout_title=share.workout_title,
-        exercise_count=share.exercise_count,
-        set_count=share.set_count,
-        created_at=share.created_at,
-    )
+    return run_write(write)
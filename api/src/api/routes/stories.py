@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import Session, select
 
-from ..db import get_session
+from ..db import get_read_session
 from ..models import Story
 from ..schemas import StoryRead
 
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/stories", tags=["stories"])
 
 
 @router.get("", response_model=list[StoryRead])
-def list_stories(limit: int = Query(10, ge=1, le=50), session: Session = Depends(get_session)) -> list[StoryRead]:
+def list_stories(limit: int = Query(10, ge=1, le=50), session: Session = Depends(get_read_session)) -> list[StoryRead]:
   # Retourne toutes les stories (pas d'expiration pour l'instant)
   statement = select(Story).order_by(Story.created_at.desc()).limit(limit)
   stories = session.exec(statement).all()
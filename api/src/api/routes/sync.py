@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -7,6 +7,8 @@ from sqlmodel import Session, select
 from ..db import get_session
 from ..models import SyncEvent, Workout
 from ..schemas import SyncPullResponse, SyncPushRequest, SyncPushResponse
+from ..services.volume import refresh_daily_volume, workout_day
+from ..writer import run_write
 
 router = APIRouter(prefix="/sync", tags=["sync"])
 
@@ -34,12 +36,11 @@ def _get_workout_for_payload(session: Session, payload: dict) -> Workout:
     raise HTTPException(status_code=404, detail="Workout not found for mutation")
 
 
-@router.post("/push", response_model=SyncPushResponse, status_code=status.HTTP_200_OK)
-def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_session)) -> SyncPushResponse:
-    if not payload.mutations:
-        return SyncPushResponse(processed=0, server_time=datetime.now(timezone.utc), results=[])
-
+def _apply_mutations(session: Session, payload: SyncPushRequest) -> list[dict]:
+    """Unité d'écriture : applique toutes les mutations du lot (tout ou rien)."""
     results = []
+    # Journées dont le volume doit être recalculé (séance terminée ou supprimée)
+    touched_days: set[tuple[str, date]] = set()
 
     for mutation in payload.mutations:
         created_at = _ms_to_datetime(mutation.created_at, datetime.now(timezone.utc))
@@ -60,20 +61,27 @@ def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_sess
             )
             session.add(workout)
             session.flush()
+            if workout.status == "completed":
+                touched_days.add((workout.user_id, workout_day(workout)))
             if workout.id is not None:
                 results.append({"queue_id": mutation.queue_id, "server_id": workout.id})
         elif action == "update-title":
             workout = _get_workout_for_payload(session, payload_data)
             workout.title = payload_data.get("title", workout.title)
             workout.updated_at = _ms_to_datetime(payload_data.get("updated_at"), created_at)
+            if workout.status == "completed" and workout.deleted_at is None:
+                touched_days.add((workout.user_id, workout_day(workout)))
         elif action == "complete-workout":
             workout = _get_workout_for_payload(session, payload_data)
             workout.status = "completed"
             workout.updated_at = _ms_to_datetime(payload_data.get("updated_at"), created_at)
+            touched_days.add((workout.user_id, workout_day(workout)))
         elif action == "delete-workout":
             workout = _get_workout_for_payload(session, payload_data)
             workout.deleted_at = _ms_to_datetime(payload_data.get("deleted_at"), created_at)
             workout.updated_at = _ms_to_datetime(payload_data.get("updated_at"), created_at)
+            if workout.status == "completed":
+                touched_days.add((workout.user_id, workout_day(workout)))
         else:
             event = SyncEvent(action=mutation.action, payload=payload_data, created_at=created_at)
             session.add(event)
@@ -81,7 +89,19 @@ def push_mutations(payload: SyncPushRequest, session: Session = Depends(get_sess
             if event.id is not None:
                 results.append({"queue_id": mutation.queue_id, "server_id": event.id})
 
-    session.commit()
+    if touched_days:
+        session.flush()
+        for user_id, day in touched_days:
+            refresh_daily_volume(session, user_id, day)
+    return results
+
+
+@router.post("/push", response_model=SyncPushResponse, status_code=status.HTTP_200_OK)
+def push_mutations(payload: SyncPushRequest) -> SyncPushResponse:
+    if not payload.mutations:
+        return SyncPushResponse(processed=0, server_time=datetime.now(timezone.utc), results=[])
+
+    results = run_write(lambda session: _apply_mutations(session, payload))
     server_time = datetime.now(timezone.utc)
     return SyncPushResponse(processed=len(payload.mutations), server_time=server_time, results=results)
 
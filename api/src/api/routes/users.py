@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlmodel import select
 
+from ..cache import invalidate_on_commit
 from ..db import get_session
 from ..models import User
 from ..schemas import UserProfileCreate, UserProfileRead
@@ -47,6 +48,7 @@ def upsert_profile(payload: UserProfileCreate, session=Depends(get_session)) ->
             _ensure_unique_username(session, payload.username, exclude_id=user.id)
         user.username = payload.username
         user.consent_to_public_share = payload.consent_to_public_share
+    invalidate_on_commit(session, "users", f"user:{user.id}")
     session.commit()
     session.refresh(user)
     return UserProfileRead.model_validate(user)
@@ -80,6 +82,7 @@ def update_profile(user_id: str, payload: UpdateProfileRequest, session=Depends(
     if payload.objective is not None:
         user.objective = payload.objective
     
+    invalidate_on_commit(session, f"user:{user_id}")
     session.commit()
     session.refresh(user)
     return UserProfileRead.model_validate(user)
@@ -1,11 +1,11 @@
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlmodel import Session, func, select
 from typing import Optional
 
-from ..db import get_session
-from ..models import User, Share
+from ..db import get_read_session
+from ..models import DailyVolume, User
 
 
 router = APIRouter(prefix="/users", tags=["users-stats"])
@@ -40,31 +40,13 @@ class UserStatsResponse(BaseModel):
     goal_progress_percent: float  # % de l'objectif atteint
 
 
-def _calculate_volume_and_best(shares: list[Share]) -> tuple[float, float]:
-    """Calcule le volume total et la meilleure charge d'une liste de shares."""
-    volume = 0.0
-    best_lift = 0.0
-    
-    for share in shares:
-        for ex in share.snapshot.get("exercises", []):
-            for s in ex.get("sets", []):
-                reps = s.get("reps") or 0
-                weight = s.get("weight") or 0
-                
-                if isinstance(reps, str):
-                    try:
-                        reps = int(reps.split("x")[-1])
-                    except Exception:
-                        reps = 0
-                try:
-                    w = float(weight)
-                except Exception:
-                    w = 0
-                    
-                volume += reps * w
-                best_lift = max(best_lift, w)
-    
-    return volume, best_lift
+def _daily_rows(session: Session, user_id: str, since: date) -> list[DailyVolume]:
+    """Agrégats quotidiens de l'utilisateur depuis `since` (quelques lignes)."""
+    return session.exec(
+        select(DailyVolume)
+        .where(DailyVolume.user_id == user_id)
+        .where(DailyVolume.day >= since)
+    ).all()
 
 
 def _get_week_bounds(offset_weeks: int = 0) -> tuple[datetime, datetime]:
@@ -84,31 +66,33 @@ def _get_week_bounds(offset_weeks: int = 0) -> tuple[datetime, datetime]:
 
 
 @router.get("/{user_id}/stats", response_model=UserStatsResponse)
-def get_user_stats(user_id: str, session: Session = Depends(get_session)) -> UserStatsResponse:
+def get_user_stats(user_id: str, session: Session = Depends(get_read_session)) -> UserStatsResponse:
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
 
-    # Récupérer toutes les shares de l'utilisateur
-    all_shares = session.exec(
-        select(Share).where(Share.owner_id == user_id).order_by(Share.created_at.desc())
-    ).all()
+    # Stats globales : une agrégation sur les lignes quotidiennes
+    total_sessions, total_volume, best_lift = session.exec(
+        select(
+            func.coalesce(func.sum(DailyVolume.sessions), 0),
+            func.coalesce(func.sum(DailyVolume.volume), 0),
+            func.coalesce(func.max(DailyVolume.best_lift), 0),
+        ).where(DailyVolume.user_id == user_id)
+    ).one()
     
-    # Stats globales
-    total_sessions = len(all_shares)
-    total_volume, best_lift = _calculate_volume_and_best(all_shares)
+    this_week_start, _ = _get_week_bounds(0)
+    last_week_start, _ = _get_week_bounds(1)
+    rows = _daily_rows(session, user_id, last_week_start.date())
     
     # Cette semaine
-    this_week_start, this_week_end = _get_week_bounds(0)
-    this_week_shares = [s for s in all_shares if this_week_start <= s.created_at < this_week_end]
-    sessions_this_week = len(this_week_shares)
-    volume_this_week, _ = _calculate_volume_and_best(this_week_shares)
+    this_week_rows = [row for row in rows if row.day >= this_week_start.date()]
+    sessions_this_week = sum(row.sessions for row in this_week_rows)
+    volume_this_week = sum(row.volume for row in this_week_rows)
     
     # Semaine dernière
-    last_week_start, last_week_end = _get_week_bounds(1)
-    last_week_shares = [s for s in all_shares if last_week_start <= s.created_at < last_week_end]
-    sessions_last_week = len(last_week_shares)
-    volume_last_week, _ = _calculate_volume_and_best(last_week_shares)
+    last_week_rows = [row for row in rows if row.day < this_week_start.date()]
+    sessions_last_week = sum(row.sessions for row in last_week_rows)
+    volume_last_week = sum(row.volume for row in last_week_rows)
     
     # Calcul de la progression
     volume_change_percent = None
@@ -121,10 +105,7 @@ def get_user_stats(user_id: str, session: Session = Depends(get_session)) -> Use
     
     # Calculer le streak (jours consécutifs avec séance cette semaine)
     # Simplifié : on compte juste les jours uniques d'entraînement cette semaine
-    workout_days = set()
-    for share in this_week_shares:
-        workout_days.add(share.created_at.date())
-    current_streak = len(workout_days)
+    current_streak = len(this_week_rows)
     
     # Objectif par défaut : 3 séances/semaine
     weekly_goal = 3
@@ -150,25 +131,23 @@ def get_user_stats(user_id: str, session: Session = Depends(get_session)) -> Use
 
 # Endpoint simplifié pour récupérer rapidement les stats (sans auth)
 @router.get("/{user_id}/stats/summary")
-def get_user_stats_summary(user_id: str, session: Session = Depends(get_session)) -> dict:
+def get_user_stats_summary(user_id: str, session: Session = Depends(get_read_session)) -> dict:
     """Version légère des stats pour affichage rapide."""
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
 
-    all_shares = session.exec(
-        select(Share).where(Share.owner_id == user_id)
-    ).all()
-    
     this_week_start, _ = _get_week_bounds(0)
-    this_week_shares = [s for s in all_shares if s.created_at >= this_week_start]
-    
-    volume_this_week, _ = _calculate_volume_and_best(this_week_shares)
+    this_week_rows = _daily_rows(session, user_id, this_week_start.date())
+    sessions_this_week = sum(row.sessions for row in this_week_rows)
+    total_sessions = session.exec(
+        select(func.coalesce(func.sum(DailyVolume.sessions), 0)).where(DailyVolume.user_id == user_id)
+    ).one()
     
     return {
-        "sessions_this_week": len(this_week_shares),
-        "total_sessions": len(all_shares),
-        "volume_this_week": round(volume_this_week, 1),
+        "sessions_this_week": sessions_this_week,
+        "total_sessions": total_sessions,
+        "volume_this_week": round(sum(row.volume for row in this_week_rows), 1),
         "weekly_goal": 3,
-        "goal_progress_percent": min(100, round((len(this_week_shares) / 3) * 100)),
+        "goal_progress_percent": min(100, round((sessions_this_week / 3) * 100)),
     }
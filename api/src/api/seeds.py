@@ -7,9 +7,15 @@ from sqlmodel import Session
 from sqlmodel import delete
 from sqlmodel import select
 
+from .cache import invalidate_on_commit
 from .db import get_engine
 from .db import init_db
-from .models import Exercise, Share, User, Workout, WorkoutExercise, Set, Story
+from .models import Exercise, FeedEntry, Share, User, Workout, WorkoutExercise, Set, Story
+from .services.counters import adjust_user_stats, recompute_user_stats
+from .services.leaderboard import rebuild_leaderboards, record_share
+from .services.timeline import fan_out_share
+from .services.trending import rebuild_trending, score_shares
+from .services.volume import rebuild_daily_volume
 from .utils.slug import make_exercise_slug
 
 
@@ -132,6 +138,7 @@ def seed_exercises(force: bool = False) -> int:
     with Session(engine) as session:
         if force:
             session.exec(delete(Exercise))
+            invalidate_on_commit(session, "exercises")
             session.commit()
 
         existing_count = session.exec(select(func.count()).select_from(Exercise)).one()
@@ -148,6 +155,7 @@ def seed_exercises(force: bool = False) -> int:
             data.pop("source_type", None)
             data.pop("source_value", None)
             session.add(Exercise(**data))
+        invalidate_on_commit(session, "exercises")
         session.commit()
         return len(SEED_EXERCISES)
 
@@ -160,10 +168,15 @@ def seed_virtual_user_feed(force: bool = False) -> None:
 
     with Session(engine) as session:
         if force:
+            session.exec(delete(FeedEntry))
             session.exec(delete(Share))
             session.exec(delete(Set))
             session.exec(delete(WorkoutExercise))
             session.exec(delete(Workout))
+            rebuild_daily_volume(session)
+            rebuild_leaderboards(session)
+            rebuild_trending(session)
+            recompute_user_stats(session)
             session.commit()
 
         user = session.get(User, "virtual-bot")
@@ -282,6 +295,10 @@ def seed_virtual_user_feed(force: bool = False) -> None:
                 created_at=now,
             )
             session.add(share)
+            fan_out_share(session, share)
+            record_share(session, share)
+            adjust_user_stats(session, user.id, posts=1)
+            score_shares(session, share.share_id)
             session.commit()
 
         create_shared_workout("Full body virtuel", full_body_exos, "sh_virtual_fullbody")
@@ -0,0 +1,177 @@
+"""Autocomplétion en mémoire des noms d'utilisateur et des exercices.
+
+Chaque type (`user`, `exercise`) a son tableau trié de clés `(clé, id)` :
+une saisie se résout par `bisect` sur le préfixe normalisé (sans accents, en
+minuscules, `utils.slug.normalize`), puis par un parcours borné des clés
+suivantes. Les exercices sont indexés sur leur nom, chaque mot du nom
+(« couché » trouve « Développé couché ») et leur slug.
+
+L'index se charge à la première saisie puis suit les écritures par les tags
+d'invalidation de `cache` (`user:{id}`, `exercises`), y compris ceux des
+autres workers (`cache_sync`) : seuls les utilisateurs touchés sont relus,
+le catalogue d'exercices (quelques centaines de lignes) est rechargé en
+entier. Mémoire bornée : une entrée par clé, tronquée à `MAX_KEY_LENGTH`.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from ..cache import on_invalidate
+from ..models import Exercise, User
+from ..utils.slug import normalize
+
+MAX_KEY_LENGTH = 48
+# Entrées parcourues au plus par saisie (doublons d'un même exercice compris)
+_SCAN_FACTOR = 8
+
+
+def normalize_key(value: str) -> str:
+    return " ".join(normalize(value).lower().split())[:MAX_KEY_LENGTH]
+
+
+def exercise_keys(name: str, slug: Optional[str]) -> set[str]:
+    key = normalize_key(name)
+    words = key.split()
+    keys = {" ".join(words[start:]) for start in range(len(words))}
+    if slug:
+        keys.add(slug[:MAX_KEY_LENGTH])
+    keys.add(key)
+    return keys
+
+
+class PrefixIndex:
+    """Clés triées `(clé, id)` et libellé de chaque id."""
+
+    def __init__(self) -> None:
+        self._keys: list[tuple[str, str]] = []
+        self._items: dict[str, tuple[str, Optional[str], tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def put(self, item_id: str, label: str, keys: set[str], slug: Optional[str] = None) -> None:
+        self.remove(item_id)
+        for key in keys:
+            bisect.insort(self._keys, (key, item_id))
+        self._items[item_id] = (label, slug, tuple(keys))
+
+    def remove(self, item_id: str) -> None:
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        for key in item[2]:
+            index = bisect.bisect_left(self._keys, (key, item_id))
+            if index < len(self._keys) and self._keys[index] == (key, item_id):
+                del self._keys[index]
+
+    def load(self, items: Iterable[tuple[str, str, set[str], Optional[str]]]) -> None:
+        """Remplace le contenu par `(id, libellé, clés, slug)` ; un seul tri."""
+        self._items = {item_id: (label, slug, tuple(keys)) for item_id, label, keys, slug in items}
+        self._keys = sorted(
+            (key, item_id) for item_id, (_, _, keys) in self._items.items() for key in keys
+        )
+
+    def complete(self, prefix: str, limit: int) -> list[tuple[str, str, str, Optional[str]]]:
+        """`(clé, id, libellé, slug)` des `limit` premiers ids ayant une clé en `prefix`…"""
+        found: dict[str, str] = {}
+        start = bisect.bisect_left(self._keys, (prefix, ""))
+        for key, item_id in self._keys[start:start + limit * _SCAN_FACTOR]:
+            if not key.startswith(prefix):
+                break
+            found.setdefault(item_id, key)
+            if len(found) == limit:
+                break
+        return [
+            (key, item_id, *self._items[item_id][:2]) for item_id, key in found.items()
+        ]
+
+
+class Autocomplete:
+    """Index des deux types, tenu à jour par les invalidations de cache."""
+
+    def __init__(self) -> None:
+        self.users = PrefixIndex()
+        self.exercises = PrefixIndex()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stale_users: set[str] = set()
+        self._stale_exercises = False
+
+    @property
+    def needs_refresh(self) -> bool:
+        return not self._loaded or bool(self._stale_users) or self._stale_exercises
+
+    def invalidated(self, tags: Optional[tuple[str, ...]]) -> None:
+        # Sous le verrou : `refresh` échange les ensembles, un signalement ne doit pas s'y perdre
+        with self._lock:
+            if tags is None:
+                self._loaded = False
+                return
+            for tag in tags:
+                if tag.startswith("user:"):
+                    self._stale_users.add(tag.removeprefix("user:"))
+                elif tag == "exercises":
+                    self._stale_exercises = True
+
+    def refresh(self, session: Session) -> None:
+        """Applique les écritures signalées depuis le dernier appel (tout au premier appel)."""
+        with self._lock:
+            if not self._loaded:
+                # Signalements antérieurs couverts par le chargement complet
+                self._loaded = True
+                self._stale_users = set()
+                self._stale_exercises = False
+                self.users.load(
+                    (user_id, username, {normalize_key(username)}, None)
+                    for user_id, username in session.exec(select(User.id, User.username))
+                )
+                self._load_exercises(session)
+                return
+            stale, self._stale_users = self._stale_users, set()
+            if stale:
+                rows = dict(session.exec(
+                    select(User.id, User.username).where(User.id.in_(stale))
+                ).all())
+                for user_id in stale:
+                    if user_id in rows:
+                        self.users.put(user_id, rows[user_id], {normalize_key(rows[user_id])})
+                    else:
+                        self.users.remove(user_id)
+            if self._stale_exercises:
+                self._stale_exercises = False
+                self._load_exercises(session)
+
+    def _load_exercises(self, session: Session) -> None:
+        self.exercises.load(
+            (exercise_id, name, exercise_keys(name, slug), slug)
+            for exercise_id, name, slug in session.exec(
+                select(Exercise.id, Exercise.name, Exercise.slug)
+            )
+        )
+
+    def complete(
+        self, q: str, limit: int, kind: Optional[str] = None
+    ) -> list[tuple[str, str, str, Optional[str]]]:
+        """`(type, id, libellé, slug)` des meilleures complétions de `q`, par ordre de clé."""
+        prefix = normalize_key(q)
+        if not prefix:
+            return []
+        candidates = []
+        with self._lock:
+            for name, index in (("user", self.users), ("exercise", self.exercises)):
+                if kind in (None, name):
+                    candidates += [
+                        (key, name, item_id, label, slug)
+                        for key, item_id, label, slug in index.complete(prefix, limit)
+                    ]
+        candidates.sort()
+        return [candidate[1:] for candidate in candidates[:limit]]
+
+
+AUTOCOMPLETE = Autocomplete()
+on_invalidate(AUTOCOMPLETE.invalidated)
@@ -0,0 +1,102 @@
+"""Compteurs dénormalisés des partages (likes, commentaires) et des utilisateurs."""
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, select
+
+from ..db import insert_for
+from ..models import Comment, Follower, Like, Share, User, UserStats
+
+_USER_COUNTERS = ("posts_count", "followers_count", "following_count", "likes_received")
+
+
+def adjust_share_counters(
+    session: Session, share_id: str, likes: int = 0, comments: int = 0
+) -> None:
+    """Incrémente / décrémente les compteurs d'un partage dans la transaction courante."""
+    values = {}
+    if likes:
+        values["like_count"] = Share.like_count + likes
+    if comments:
+        values["comment_count"] = Share.comment_count + comments
+    if not values:
+        return
+    session.execute(
+        update(Share)
+        .where(Share.share_id == share_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recompute_share_counters(session: Session) -> int:
+    """Recalcule tous les compteurs depuis `Like` et `Comment`. Retourne le nombre de partages."""
+    like_count = (
+        select(func.count(Like.id)).where(Like.share_id == Share.share_id).scalar_subquery()
+    )
+    comment_count = (
+        select(func.count(Comment.id)).where(Comment.share_id == Share.share_id).scalar_subquery()
+    )
+    result = session.execute(
+        update(Share)
+        .values(like_count=like_count, comment_count=comment_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def adjust_user_stats(
+    session: Session,
+    user_id: str,
+    posts: int = 0,
+    followers: int = 0,
+    following: int = 0,
+    likes: int = 0,
+) -> None:
+    """Incrémente / décrémente les compteurs d'un utilisateur (ligne créée au besoin)."""
+    deltas = {
+        name: delta
+        for name, delta in zip(_USER_COUNTERS, (posts, followers, following, likes), strict=True)
+        if delta
+    }
+    if not deltas:
+        return
+    statement = insert_for(session, UserStats).values(user_id=user_id, **deltas)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={name: getattr(UserStats, name) + delta for name, delta in deltas.items()},
+        )
+    )
+
+
+def adjust_follow_counters(
+    session: Session, follower_id: str, followed_id: str, delta: int
+) -> None:
+    """Un suivi (`delta=1`) ou un désabonnement (`-1`) compte des deux côtés."""
+    adjust_user_stats(session, followed_id, followers=delta)
+    adjust_user_stats(session, follower_id, following=delta)
+
+
+def recompute_user_stats(session: Session) -> int:
+    """Recalcule les compteurs de tous les utilisateurs. Retourne le nombre de lignes."""
+    posts = select(func.count(Share.share_id)).where(Share.owner_id == User.id)
+    followers = select(func.count(Follower.id)).where(Follower.followed_id == User.id)
+    following = select(func.count(Follower.id)).where(Follower.follower_id == User.id)
+    likes = (
+        select(func.count(Like.id))
+        .join(Share, Share.share_id == Like.share_id)
+        .where(Share.owner_id == User.id)
+    )
+    session.execute(delete(UserStats))
+    result = session.execute(
+        insert_for(session, UserStats).from_select(
+            ["user_id", *_USER_COUNTERS],
+            select(
+                User.id,
+                posts.scalar_subquery(),
+                followers.scalar_subquery(),
+                following.scalar_subquery(),
+                likes.scalar_subquery(),
+            ),
+        )
+    )
+    return result.rowcount
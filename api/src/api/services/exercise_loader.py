@@ -7,6 +7,7 @@ from typing import Optional
 import httpx
 from sqlmodel import Session, select
 
+from ..cache import invalidate_on_commit
 from ..models import Exercise
 from ..utils.slug import make_exercise_slug
 
@@ -158,6 +159,7 @@ def import_exercises_from_url(
     
     if force:
         session.exec(delete(Exercise))
+        invalidate_on_commit(session, "exercises")
         session.commit()
     
     # Charger les exercices depuis l'URL
@@ -189,6 +191,7 @@ def import_exercises_from_url(
         session.add(exercise)
         imported += 1
     
+    invalidate_on_commit(session, "exercises")
     session.commit()
     
     return {
@@ -0,0 +1,211 @@
+"""Graphe des abonnements en mémoire (suggestions « amis d'amis »).
+
+Chaque utilisateur présent dans `Follower` reçoit un indice entier ; ses
+abonnements sont rangés au format CSR : `_offsets[i]:_offsets[i + 1]`
+délimite dans `_targets` (tableau `array` d'entiers non signés) les indices
+suivis par `i`. Le nombre de followers de chaque indice est tenu à part.
+Quelques octets par relation, sans objet Python par arête.
+
+Le graphe se charge au démarrage puis suit les écritures par les tags
+d'invalidation de `cache`, y compris ceux des autres workers (`cache_sync`) :
+un suivi ou un désabonnement émet `following:{id}` et seuls les abonnements
+de cet utilisateur sont relus. Les listes relues remplacent leur tranche CSR
+jusqu'au prochain compactage.
+
+Une suggestion compte, pour chaque candidat, les abonnements de l'utilisateur
+qui le suivent (« suivi par N de tes abonnements »), puis départage par
+nombre de followers. Le parcours est borné à `_MAX_EDGES` arêtes.
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from ..cache import on_invalidate
+from ..models import Follower
+
+# Arêtes « ami → ami d'ami » parcourues au plus par suggestion
+_MAX_EDGES = 2_048
+# Tranche minimale lue par abonnement quand l'utilisateur en a beaucoup
+_MIN_EDGES_PER_FOLLOW = 16
+# Utilisateurs les plus suivis gardés pour compléter les suggestions
+_POPULAR = 256
+
+
+class FollowGraph:
+    """Abonnements (CSR) et nombre de followers par indice ; sûr entre threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stale: set[str] = set()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._offsets = array("I", [0])
+        self._targets = array("I")
+        # Listes relues depuis le dernier compactage, prioritaires sur le CSR
+        self._patched: dict[int, array] = {}
+        self._followers = array("I")
+        self._popular: Optional[list[int]] = None
+
+    @property
+    def needs_refresh(self) -> bool:
+        return not self._loaded or bool(self._stale)
+
+    def invalidated(self, tags: Optional[tuple[str, ...]]) -> None:
+        # Sous le verrou : `refresh` échange l'ensemble, un signalement ne doit pas s'y perdre
+        with self._lock:
+            if tags is None:
+                self._loaded = False
+                return
+            for tag in tags:
+                if tag.startswith("following:"):
+                    self._stale.add(tag.removeprefix("following:"))
+
+    def refresh(self, session: Session) -> None:
+        """Applique les suivis signalés depuis le dernier appel (tout au premier appel)."""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._stale = set()
+                self._load(session.exec(select(Follower.follower_id, Follower.followed_id)))
+                return
+            stale, self._stale = self._stale, set()
+            if not stale:
+                return
+            following: dict[str, list[str]] = {user_id: [] for user_id in stale}
+            for follower_id, followed_id in session.exec(
+                select(Follower.follower_id, Follower.followed_id)
+                .where(Follower.follower_id.in_(stale))
+            ):
+                following[follower_id].append(followed_id)
+            for user_id, followed_ids in following.items():
+                self._replace(self._node(user_id), array("I", map(self._node, followed_ids)))
+            if len(self._patched) > max(1024, len(self._ids) // 8):
+                self._compact()
+
+    def _load(self, edges: Iterable[tuple[str, str]]) -> None:
+        self._clear()
+        following: dict[int, list[int]] = {}
+        for follower_id, followed_id in edges:
+            following.setdefault(self._node(follower_id), []).append(self._node(followed_id))
+        for targets in following.values():
+            for target in targets:
+                self._followers[target] += 1
+        self._build(following)
+
+    def _build(self, following: dict[int, Iterable[int]]) -> None:
+        offsets = array("I", [0])
+        targets = array("I")
+        for node in range(len(self._ids)):
+            targets.extend(sorted(following.get(node, ())))
+            offsets.append(len(targets))
+        self._offsets, self._targets, self._patched = offsets, targets, {}
+
+    def _compact(self) -> None:
+        self._build({node: self._following(node) for node in range(len(self._ids))})
+
+    def _node(self, user_id: str) -> int:
+        node = self._index.get(user_id)
+        if node is None:
+            node = self._index[user_id] = len(self._ids)
+            self._ids.append(user_id)
+            self._followers.append(0)
+        return node
+
+    def _following(self, node: int) -> array:
+        patched = self._patched.get(node)
+        if patched is not None:
+            return patched
+        if node + 1 >= len(self._offsets):  # ajouté depuis le dernier compactage
+            return array("I")
+        return self._targets[self._offsets[node]:self._offsets[node + 1]]
+
+    def _replace(self, node: int, targets: array) -> None:
+        for target in self._following(node):
+            self._followers[target] -= 1
+        for target in targets:
+            self._followers[target] += 1
+        self._patched[node] = targets
+        self._popular = None
+
+    def following(self, user_id: str) -> set[str]:
+        with self._lock:
+            node = self._index.get(user_id)
+            if node is None:
+                return set()
+            return {self._ids[target] for target in self._following(node)}
+
+    def followers_count(self, user_id: str) -> int:
+        node = self._index.get(user_id)
+        return self._followers[node] if node is not None else 0
+
+    def suggest(self, user_id: Optional[str], limit: int) -> list[tuple[str, int, int]]:
+        """`(id, abonnements communs, followers)` des meilleurs candidats pour `user_id`.
+
+        Amis d'amis d'abord, complétés par les comptes les plus suivis.
+        """
+        with self._lock:
+            node = self._index.get(user_id) if user_id is not None else None
+            excluded: set[int] = set()
+            mutual: Counter[int] = Counter()
+            if node is not None:
+                follows = self._following(node)
+                excluded.update(follows)
+                excluded.add(node)
+                per_follow = max(_MIN_EDGES_PER_FOLLOW, _MAX_EDGES // max(1, len(follows)))
+                # Tranches CSR concaténées puis comptées en une passe (en C)
+                reached = array("I")
+                for follow in follows:
+                    if len(reached) >= _MAX_EDGES:
+                        break
+                    reached.extend(self._following(follow)[:per_follow])
+                mutual = Counter(reached)
+                for excluded_node in excluded.intersection(mutual):
+                    del mutual[excluded_node]
+            followers = self._followers
+            # Seuil : le plus petit nombre d'abonnements communs qui entre dans le top `limit`
+            # (histogramme en C) ; seuls les candidats au-dessus passent par le tri Python
+            threshold, kept = 1, 0
+            for count, candidates in sorted(Counter(mutual.values()).items(), reverse=True):
+                threshold, kept = count, kept + candidates
+                if kept >= limit:
+                    break
+            ranked = sorted(
+                (candidate for candidate, count in mutual.items() if count >= threshold),
+                key=lambda candidate: (-mutual[candidate], -followers[candidate], candidate),
+            )[:limit]
+            if len(ranked) < limit:
+                chosen = excluded.union(ranked)
+                ranked += [
+                    candidate for candidate in self._popular_nodes() if candidate not in chosen
+                ][:limit - len(ranked)]
+            return [
+                (self._ids[candidate], mutual.get(candidate, 0), followers[candidate])
+                for candidate in ranked
+            ]
+
+    def _popular_nodes(self) -> list[int]:
+        if self._popular is None:
+            followers = self._followers
+            self._popular = [
+                node
+                for node in heapq.nlargest(
+                    _POPULAR, range(len(followers)), key=followers.__getitem__
+                )
+                if followers[node]
+            ]
+        return self._popular
+
+
+FOLLOW_GRAPH = FollowGraph()
+on_invalidate(FOLLOW_GRAPH.invalidated)
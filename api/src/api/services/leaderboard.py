@@ -0,0 +1,308 @@
+"""Classements matérialisés (projection mise à jour à l'écriture).
+
+Chaque ligne `LeaderboardScore` porte le score d'un utilisateur pour un
+classement (`volume`, `sessions`, `likes`, `followers`) et une période :
+semaine calendaire (clé = date du lundi), mois calendaire (`YYYY-MM`) ou
+`all`. Les écritures (partages, séances terminées, likes, follows)
+incrémentent les lignes concernées ; les endpoints n'ont plus qu'à lire un
+`ORDER BY score DESC`.
+
+Le rang suit l'ordre d'affichage (`score DESC, user_id DESC`). La variation
+`change` compare au rang figé dans `LeaderboardSnapshot` : classement final de
+la période précédente pour `week` / `month`, classement du début de semaine
+pour `all`. Les photos sont prises sur le chemin d'écriture (première écriture
+de la période, reconstruction) ; les endpoints ne font que les lire.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Integer, String, and_, delete, func, literal, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from ..db import insert_for
+from ..models import DailyVolume, Follower, LeaderboardScore, LeaderboardSnapshot, Like, Share, User
+from ..utils.queries import supports_window_functions
+
+PERIODS = ("week", "month", "all")
+# Périodes affichées par classement (likes et followers n'existent qu'en global)
+BOARD_PERIODS = {
+    "volume": PERIODS,
+    "sessions": PERIODS,
+    "likes": ("all",),
+    "followers": ("all",),
+}
+
+_COLUMNS = ["board", "period_key", "user_id", "score"]
+
+
+def period_keys(moment: Optional[datetime] = None) -> dict[str, str]:
+    """Clés de période (semaine, mois, all) contenant `moment` (UTC)."""
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    elif moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    day = moment.date()
+    monday = day - timedelta(days=day.weekday())
+    return {"week": monday.isoformat(), "month": f"{day:%Y-%m}", "all": "all"}
+
+
+def snapshot_key(period: str, moment: Optional[datetime] = None) -> str:
+    """Période de référence pour `change` : la précédente, ou la semaine en cours pour `all`."""
+    keys = period_keys(moment)
+    if period == "all":
+        return keys["week"]
+    monday = date.fromisoformat(keys["week"])
+    if period == "week":
+        return (monday - timedelta(days=7)).isoformat()
+    first_of_month = date.fromisoformat(f"{keys['month']}-01")
+    return f"{first_of_month - timedelta(days=1):%Y-%m}"
+
+
+def _increment(session: Session, board: str, period_key: str, user_id: str, delta: int) -> None:
+    # La photo de référence précède la première écriture de la période
+    ensure_snapshots(session, board)
+    statement = insert_for(session, LeaderboardScore).values(
+        board=board, period_key=period_key, user_id=user_id, score=delta
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["board", "period_key", "user_id"],
+            set_={"score": LeaderboardScore.score + delta},
+        )
+    )
+
+
+def record_share(session: Session, share: Share) -> None:
+    """Un nouveau partage compte comme une séance sur chaque période."""
+    for period_key in period_keys(share.created_at).values():
+        _increment(session, "sessions", period_key, share.owner_id, 1)
+
+
+def record_volume(session: Session, user_id: str, moment: datetime, delta: int) -> None:
+    """Reporte une variation de volume (kg) d'une journée sur chaque période."""
+    for period_key in period_keys(moment).values():
+        _increment(session, "volume", period_key, user_id, delta)
+
+
+def record_like(session: Session, owner_id: str, delta: int) -> None:
+    _increment(session, "likes", "all", owner_id, delta)
+
+
+def record_follow(session: Session, followed_id: str, delta: int) -> None:
+    _increment(session, "followers", "all", followed_id, delta)
+
+
+def _period_expressions(session: Session, column):
+    """Clés semaine et mois calculées en SQL, identiques à `period_keys` (SQLite ou PostgreSQL)."""
+    if session.get_bind().dialect.name == "postgresql":
+        # date_trunc('week') renvoie le lundi (ISO)
+        return (
+            func.to_char(func.date_trunc("week", column), "YYYY-MM-DD"),
+            func.to_char(column, "YYYY-MM"),
+        )
+    return (
+        # Lundi de la semaine : le lundi compris dans [date - 6 jours, date]
+        func.date(column, "-6 days", "weekday 1"),
+        func.strftime("%Y-%m", column),
+    )
+
+
+def rebuild_leaderboards(session: Session) -> None:
+    """Recalcule tous les classements depuis `Share`, `DailyVolume`, `Like` et `Follower`."""
+    session.execute(delete(LeaderboardScore))
+    insert = insert_for(session, LeaderboardScore)
+
+    for board, column, owner, score in (
+        ("sessions", Share.created_at, Share.owner_id, func.count()),
+        # Arrondi par jour, comme les incréments de `record_volume`
+        (
+            "volume",
+            DailyVolume.day,
+            DailyVolume.user_id,
+            func.sum(func.round(DailyVolume.volume).cast(Integer)),
+        ),
+    ):
+        for period_key in _period_expressions(session, column):
+            period_key = period_key.label("period_key")
+            session.execute(
+                insert.from_select(
+                    _COLUMNS,
+                    select(literal(board, String()), period_key, owner, score)
+                    .group_by(period_key, owner),
+                )
+            )
+        # PostgreSQL refuse une constante dans GROUP BY : `all` ne groupe que par utilisateur
+        session.execute(
+            insert.from_select(
+                _COLUMNS,
+                select(literal(board, String()), literal("all", String()), owner, score)
+                .group_by(owner),
+            )
+        )
+
+    session.execute(
+        insert.from_select(
+            _COLUMNS,
+            select(
+                literal("likes", String()),
+                literal("all", String()),
+                Share.owner_id,
+                func.count(Like.id),
+            )
+            .join(Like, Like.share_id == Share.share_id)
+            .group_by(Share.owner_id),
+        )
+    )
+    session.execute(
+        insert.from_select(
+            _COLUMNS,
+            select(
+                literal("followers", String()),
+                literal("all", String()),
+                Follower.followed_id,
+                func.count(),
+            ).group_by(Follower.followed_id),
+        )
+    )
+    take_snapshots(session)
+
+
+
+def rank_of(session: Session, board: str, period_key: str, user_id: str) -> Optional[int]:
+    """Rang exact de `user_id` sur toute la population (comptage sur l'index du classement).
+
+    Comme l'affichage, ne compte que les scores rattachés à un `User` existant.
+    """
+    score = session.exec(
+        select(LeaderboardScore.score)
+        .join(User, User.id == LeaderboardScore.user_id)
+        .where(LeaderboardScore.board == board)
+        .where(LeaderboardScore.period_key == period_key)
+        .where(LeaderboardScore.user_id == user_id)
+    ).first()
+    if not score or score <= 0:
+        return None
+    ahead = session.exec(
+        select(func.count())
+        .select_from(LeaderboardScore)
+        .join(User, User.id == LeaderboardScore.user_id)
+        .where(LeaderboardScore.board == board)
+        .where(LeaderboardScore.period_key == period_key)
+        .where(
+            or_(
+                LeaderboardScore.score > score,
+                and_(LeaderboardScore.score == score, LeaderboardScore.user_id > user_id),
+            )
+        )
+    ).one()
+    return ahead + 1
+
+
+def _ranked_scores(session: Session, board: str, period_key: str):
+    """`(user_id, rank)` de tous les scores positifs d'utilisateurs existants, calculés en SQL."""
+    if supports_window_functions(session):
+        rank = func.row_number().over(
+            order_by=(LeaderboardScore.score.desc(), LeaderboardScore.user_id.desc())
+        )
+    else:
+        other = aliased(LeaderboardScore)
+        other_user = aliased(User)
+        rank = (
+            select(func.count() + 1)
+            .select_from(other)
+            .join(other_user, other_user.id == other.user_id)
+            .where(other.board == LeaderboardScore.board)
+            .where(other.period_key == LeaderboardScore.period_key)
+            .where(
+                or_(
+                    other.score > LeaderboardScore.score,
+                    and_(
+                        other.score == LeaderboardScore.score,
+                        other.user_id > LeaderboardScore.user_id,
+                    ),
+                )
+            )
+            .scalar_subquery()
+        )
+    return (
+        select(LeaderboardScore.user_id, rank.label("rank"))
+        .join(User, User.id == LeaderboardScore.user_id)
+        .where(LeaderboardScore.board == board)
+        .where(LeaderboardScore.period_key == period_key)
+        .where(LeaderboardScore.score > 0)
+    )
+
+
+def take_snapshot(
+    session: Session, board: str, period: str, moment: Optional[datetime] = None
+) -> None:
+    """Fige les rangs de référence de `(board, period)` s'ils ne l'ont pas encore été."""
+    key = snapshot_key(period, moment)
+    exists = session.exec(
+        select(LeaderboardSnapshot.user_id)
+        .where(LeaderboardSnapshot.board == board)
+        .where(LeaderboardSnapshot.period == period)
+        .where(LeaderboardSnapshot.period_key == key)
+        .limit(1)
+    ).first()
+    if exists is not None:
+        return
+    source_key = "all" if period == "all" else key
+    ranked = _ranked_scores(session, board, source_key).subquery()
+    session.execute(
+        insert_for(session, LeaderboardSnapshot)
+        .from_select(
+            ["board", "period", "period_key", "user_id", "rank"],
+            select(
+                literal(board, String()),
+                literal(period, String()),
+                literal(key, String()),
+                ranked.c.user_id,
+                ranked.c.rank,
+            )
+            # SQLite exige un WHERE avant ON CONFLICT dans un INSERT ... SELECT
+            .where(ranked.c.rank > 0),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def previous_ranks(
+    session: Session,
+    board: str,
+    period: str,
+    user_ids: list[str],
+    moment: Optional[datetime] = None,
+) -> dict[str, int]:
+    """Rangs de référence des `user_ids` (absents s'ils n'étaient pas classés)."""
+    if not user_ids:
+        return {}
+    key = snapshot_key(period, moment)
+    rows = session.exec(
+        select(LeaderboardSnapshot.user_id, LeaderboardSnapshot.rank)
+        .where(LeaderboardSnapshot.board == board)
+        .where(LeaderboardSnapshot.period == period)
+        .where(LeaderboardSnapshot.period_key == key)
+        .where(LeaderboardSnapshot.user_id.in_(user_ids))
+    ).all()
+    return dict(rows)
+
+
+def ensure_snapshots(session: Session, board: str) -> None:
+    """Prend les photos manquantes de la période courante.
+
+    Appelée sur le chemin d'écriture (`_increment`) : la photo `all` fige ainsi
+    le classement juste avant la première écriture de la semaine. Aucune mémoire
+    par processus : `take_snapshot` vérifie la base (lecture d'index), et une
+    photo annulée avec sa transaction est reprise à l'écriture suivante.
+    """
+    for period in BOARD_PERIODS[board]:
+        take_snapshot(session, board, period)
+
+
+def take_snapshots(session: Session) -> None:
+    """Prend toutes les photos manquantes de la période courante (reconstruction, script)."""
+    for board, periods in BOARD_PERIODS.items():
+        for period in periods:
+            take_snapshot(session, board, period)
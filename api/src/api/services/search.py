@@ -0,0 +1,181 @@
+"""Recherche plein texte des utilisateurs et des partages (SQLite FTS5).
+
+Deux index FTS5 à contenu externe, `user_search` (username, bio) et
+`share_search` (workout_title, owner_username), sont tenus à jour par des
+triggers sur `user` et `share`. Le tokenizer `unicode61 remove_diacritics 2`
+rend la recherche insensible à la casse et aux accents (« eleve » trouve
+« élève »). Chaque mot saisi est cherché en préfixe (recherche au fil de la
+frappe). Les résultats sont classés par BM25, le nom pesant plus que le texte
+libre, et paginés par curseur `(rang, rowid)`.
+
+Le rowid FTS n'est pas le rowid implicite de la table indexée : `user` et
+`share` ont une clé primaire texte, et un `VACUUM` peut renuméroter leurs
+rowids, ce qui désynchroniserait l'index. Chaque table reçoit une colonne
+`search_id` (entier unique, attribué par le trigger d'insertion et jamais
+modifié ensuite), qui sert de `content_rowid`.
+
+Hors SQLite (PostgreSQL), `ILIKE '%q%'` reste le repli, sans pagination.
+"""
+import re
+from typing import Any, Optional
+
+from sqlalchemy import column, literal_column, or_, table
+from sqlalchemy.engine import Connection, Row
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..models import Share, User
+from ..utils.pagination import decode_rank_cursor, encode_rank_cursor
+
+# Index : (table indexée, colonnes, poids BM25 des colonnes)
+SEARCH_INDEXES = {
+    "user_search": ("user", ("username", "bio"), (10.0, 1.0)),
+    "share_search": ("share", ("workout_title", "owner_username"), (2.0, 1.0)),
+}
+
+# Colonne entière stable ajoutée aux tables indexées (rowid des index FTS)
+SEARCH_KEY = "search_id"
+
+_WORD = re.compile(r"\w+")
+
+
+def _is_current(connection: Connection, index: str, source: str) -> bool:
+    row = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (index,)
+    ).first()
+    if row is None or f"content_rowid='{SEARCH_KEY}'" not in row[0]:
+        return False
+    triggers = {
+        name
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (source,)
+        )
+    }
+    return {f"{index}_ai", f"{index}_ad", f"{index}_au"} <= triggers
+
+
+def ensure_search_indexes(connection: Connection) -> None:
+    """Crée les index FTS5 et leurs triggers ; réindexe si la synchronisation manquait."""
+    for index, (source, columns, weights) in SEARCH_INDEXES.items():
+        if _is_current(connection, index, source):
+            continue
+        # Index absent, incomplet ou encore indexé sur le rowid implicite : on repart de zéro
+        for suffix in ("ai", "ad", "au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index}_{suffix}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index}")
+        existing = {
+            row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{source}")')
+        }
+        if SEARCH_KEY not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE "{source}" ADD COLUMN {SEARCH_KEY} INTEGER')
+        connection.exec_driver_sql(
+            f'UPDATE "{source}" SET {SEARCH_KEY} = rowid WHERE {SEARCH_KEY} IS NULL'
+        )
+        connection.exec_driver_sql(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{source}_{SEARCH_KEY} "
+            f'ON "{source}" ({SEARCH_KEY})'
+        )
+
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{name}" for name in columns)
+        old = ", ".join(f"old.{name}" for name in columns)
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {index} USING fts5({names}, "
+            f"content='{source}', content_rowid='{SEARCH_KEY}', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        # `ORDER BY rank` applique ces poids
+        connection.exec_driver_sql(
+            f"INSERT INTO {index}({index}, rank) "
+            f"VALUES ('rank', 'bm25({', '.join(map(str, weights))})')"
+        )
+        # Clé suivante lue sur l'index unique ; le rowid n'est lu qu'au sein du trigger
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER {index}_ai AFTER INSERT ON "{source}" BEGIN '
+            f'UPDATE "{source}" SET {SEARCH_KEY} = '
+            f'(SELECT COALESCE(MAX({SEARCH_KEY}), 0) + 1 FROM "{source}") '
+            f"WHERE rowid = new.rowid; "
+            f"INSERT INTO {index}(rowid, {names}) "
+            f'SELECT {SEARCH_KEY}, {names} FROM "{source}" WHERE rowid = new.rowid; END'
+        )
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER {index}_ad AFTER DELETE ON "{source}" BEGIN '
+            f"INSERT INTO {index}({index}, rowid, {names}) "
+            f"VALUES ('delete', old.{SEARCH_KEY}, {old}); END"
+        )
+        # Seules les colonnes indexées déclenchent la mise à jour (pas les compteurs)
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON "{source}" '
+            f"BEGIN INSERT INTO {index}({index}, rowid, {names}) "
+            f"VALUES ('delete', old.{SEARCH_KEY}, {old}); "
+            f"INSERT INTO {index}(rowid, {names}) VALUES (new.{SEARCH_KEY}, {new}); END"
+        )
+        connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def match_expression(q: str) -> Optional[str]:
+    """Requête FTS5 : chaque mot en préfixe, tous requis (`"squat"* "bulg"*`)."""
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _fts_statement(model: Any, index: str, q: str, limit: int, cursor: Optional[str]):
+    expression = match_expression(q)
+    if expression is None:
+        return None
+    fts = table(index, column("rowid"), column("rank"))
+    source = model.__table__.name
+    statement = (
+        select(model, fts.c.rank, fts.c.rowid)
+        .select_from(fts)
+        .join(model, literal_column(f'"{source}".{SEARCH_KEY}') == fts.c.rowid)
+        .where(literal_column(index).op("MATCH")(expression))
+    )
+    if cursor:
+        rank, rowid = decode_rank_cursor(cursor)
+        statement = statement.where(
+            or_(fts.c.rank > rank, (fts.c.rank == rank) & (fts.c.rowid > rowid))
+        )
+    return statement.order_by(fts.c.rank, fts.c.rowid).limit(limit + 1)
+
+
+def _page(rows: list[Row], limit: int) -> tuple[list[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return [row[0] for row in rows], None
+    _, rank, rowid = rows[limit - 1]
+    return [row[0] for row in rows[:limit]], encode_rank_cursor(rank, rowid)
+
+
+def _like_statement(model: Any, columns: tuple[str, ...], q: str, limit: int):
+    pattern = f"%{q.lower().strip()}%"
+    return select(model).where(
+        or_(*(getattr(model, name).ilike(pattern) for name in columns))
+    ).limit(limit)
+
+
+async def search(
+    session: AsyncSession,
+    model: Any,
+    index: str,
+    q: str,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> tuple[list[Any], Optional[str]]:
+    """Page de `model` correspondant à `q` (BM25) et curseur de la page suivante."""
+    if session.bind.dialect.name != "sqlite":
+        _, columns, _ = SEARCH_INDEXES[index]
+        return list((await session.exec(_like_statement(model, columns, q, limit))).all()), None
+    statement = _fts_statement(model, index, q, limit, cursor)
+    if statement is None:
+        return [], None
+    return _page(list((await session.exec(statement)).all()), limit)
+
+
+async def search_users(session, q: str, limit: int, cursor: Optional[str] = None):
+    return await search(session, User, "user_search", q, limit, cursor)
+
+
+async def search_shares(session, q: str, limit: int, cursor: Optional[str] = None):
+    return await search(session, Share, "share_search", q, limit, cursor)
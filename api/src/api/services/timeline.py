@@ -0,0 +1,79 @@
+"""Timelines par utilisateur (fan-out à l'écriture) pour le feed.
+
+Chaque partage est recopié dans la timeline de son auteur et de ses followers
+au moment de sa création. La lecture du feed devient alors un simple parcours
+d'index sur `(user_id, created_at, share_id)`, quel que soit le volume global.
+"""
+from sqlalchemy import DateTime, String, delete, literal
+from sqlmodel import Session, select
+
+from ..db import insert_for
+from ..models import FeedEntry, Follower, Share
+
+_COLUMNS = ["user_id", "created_at", "share_id", "owner_id"]
+
+
+def fan_out_share(session: Session, share: Share) -> None:
+    """Pousse un nouveau partage dans la timeline de l'auteur et de ses followers."""
+    followers = (
+        select(
+            Follower.follower_id,
+            literal(share.created_at, DateTime()),
+            literal(share.share_id, String()),
+            literal(share.owner_id, String()),
+        )
+        .where(Follower.followed_id == share.owner_id)
+        .distinct()
+    )
+    session.execute(
+        insert_for(session, FeedEntry).from_select(_COLUMNS, followers).on_conflict_do_nothing()
+    )
+    session.execute(
+        insert_for(session, FeedEntry)
+        .values(
+            user_id=share.owner_id,
+            created_at=share.created_at,
+            share_id=share.share_id,
+            owner_id=share.owner_id,
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def backfill_timeline(session: Session, follower_id: str, followed_id: str) -> None:
+    """Ajoute les partages existants de `followed_id` à la timeline de `follower_id`."""
+    shares = select(
+        literal(follower_id, String()),
+        Share.created_at,
+        Share.share_id,
+        Share.owner_id,
+    ).where(Share.owner_id == followed_id)
+    session.execute(
+        insert_for(session, FeedEntry).from_select(_COLUMNS, shares).on_conflict_do_nothing()
+    )
+
+
+def prune_timeline(session: Session, follower_id: str, followed_id: str) -> None:
+    """Retire les partages de `followed_id` de la timeline de `follower_id`."""
+    session.execute(
+        delete(FeedEntry)
+        .where(FeedEntry.user_id == follower_id)
+        .where(FeedEntry.owner_id == followed_id)
+    )
+
+
+def rebuild_timelines(session: Session) -> None:
+    """Reconstruit toutes les timelines à partir de `Share` et `Follower`."""
+    session.execute(delete(FeedEntry))
+    own_shares = select(Share.owner_id, Share.created_at, Share.share_id, Share.owner_id)
+    session.execute(insert_for(session, FeedEntry).from_select(_COLUMNS, own_shares))
+    followed_shares = (
+        select(Follower.follower_id, Share.created_at, Share.share_id, Share.owner_id)
+        .join(Share, Share.owner_id == Follower.followed_id)
+        .distinct()
+    )
+    session.execute(
+        insert_for(session, FeedEntry)
+        .from_select(_COLUMNS, followed_shares)
+        .on_conflict_do_nothing()
+    )
@@ -0,0 +1,141 @@
+"""Classement « tendance » des partages (projection `TrendingScore`).
+
+Score à la Reddit (« hot ») : `log10(1 + likes + 2 × commentaires)` plus la
+date du partage comptée en unités de `DECAY_SECONDS` (12,5 h) : dix fois plus
+d'interactions valent 12,5 h d'ancienneté. L'ordre obtenu est celui d'une
+décroissance exponentielle avec l'âge, mais le score d'un partage ne change
+que lorsque ses compteurs changent : des scores calculés à des moments
+différents restent comparables. Une écriture (partage, like, commentaire)
+ne recalcule donc que la ligne de son partage, dans sa transaction.
+
+Seuls les partages de la fenêtre `WINDOW` (7 jours) ont une ligne. Un job de
+fond reconstruit la table toutes les `TRENDING_REFRESH_SECONDS` (300 s par
+défaut, 0 le désactive) via le writer : il retire les partages sortis de la
+fenêtre et rattrape les compteurs modifiés hors des routes (seed, recalcul).
+L'endpoint se résume à un `ORDER BY score DESC` sur l'index.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from ..cache import invalidate_on_commit
+from ..db import insert_for
+from ..models import Share, TrendingScore
+from ..writer import run_write
+
+WINDOW = timedelta(days=7)
+COMMENT_WEIGHT = 2
+DECAY_SECONDS = 45_000
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+_REFRESHER: Optional[TrendingRefresher] = None
+_REFRESHER_LOCK = threading.Lock()
+
+
+def _interval() -> float:
+    return max(0, int(os.getenv("TRENDING_REFRESH_SECONDS", "300")))
+
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite rend des dates naïves, stockées en UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def hot_score(likes: int, comments: int, created_at: datetime) -> float:
+    engagement = max(0, likes + COMMENT_WEIGHT * comments)
+    age = (_utc(created_at) - _EPOCH).total_seconds()
+    return math.log10(1 + engagement) + age / DECAY_SECONDS
+
+
+def window_start(now: Optional[datetime] = None) -> datetime:
+    """Date (UTC naïve, comme en base) du plus ancien partage classé."""
+    now = _utc(now) if now is not None else datetime.now(timezone.utc)
+    return now.astimezone(timezone.utc).replace(tzinfo=None) - WINDOW
+
+
+def _score_rows(session: Session, *where: Any, now: Optional[datetime] = None) -> list[dict]:
+    rows = session.exec(
+        select(Share.share_id, Share.like_count, Share.comment_count, Share.created_at)
+        .where(Share.created_at >= window_start(now), *where)
+    ).all()
+    return [
+        {
+            "share_id": share_id,
+            "score": hot_score(likes, comments, created_at),
+            "created_at": created_at,
+        }
+        for share_id, likes, comments, created_at in rows
+    ]
+
+
+def score_shares(session: Session, *share_ids: str) -> None:
+    """Recalcule le score des partages touchés, dans la transaction courante."""
+    rows = _score_rows(session, Share.share_id.in_(share_ids))
+    if not rows:
+        return
+    statement = insert_for(session, TrendingScore).values(rows)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["share_id"], set_={"score": statement.excluded.score}
+        )
+    )
+    invalidate_on_commit(session, "trending")
+
+
+def rebuild_trending(session: Session, now: Optional[datetime] = None) -> int:
+    """Recalcule toute la fenêtre depuis les compteurs de `Share`. Retourne le nombre de lignes."""
+    session.execute(delete(TrendingScore))
+    rows = _score_rows(session, now=now)
+    if rows:
+        session.execute(insert(TrendingScore), rows)
+    invalidate_on_commit(session, "trending")
+    return len(rows)
+
+
+class TrendingRefresher:
+    """Thread de reconstruction périodique du classement."""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="trending", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                run_write(rebuild_trending)
+            except Exception:  # base momentanément indisponible : nouvel essai au tour suivant
+                continue
+
+
+def start_trending_refresh() -> Optional[TrendingRefresher]:
+    """Démarre la reconstruction périodique (démarrage de l'application)."""
+    global _REFRESHER
+    interval = _interval()
+    if not interval:
+        return None
+    with _REFRESHER_LOCK:
+        if _REFRESHER is None:
+            _REFRESHER = TrendingRefresher(interval)
+        return _REFRESHER
+
+
+def stop_trending_refresh() -> None:
+    """Arrête le job (arrêt de l'app, changement de base), avant le writer qu'il utilise."""
+    global _REFRESHER
+    with _REFRESHER_LOCK:
+        refresher, _REFRESHER = _REFRESHER, None
+    if refresher is not None:
+        refresher.stop()
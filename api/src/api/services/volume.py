@@ -0,0 +1,94 @@
+"""Agrégat quotidien du volume d'entraînement (`DailyVolume`).
+
+Le volume d'une séance est `SUM(reps × poids)` sur ses séries ; seules les
+séances terminées et non supprimées comptent. Une séance est rattachée au jour
+de sa fin (`ended_at`, à défaut `started_at` puis `created_at`, en UTC). Le
+jour concerné est recalculé depuis les séries à chaque séance terminée ou
+supprimée : statistiques et classement ne lisent plus que quelques lignes.
+"""
+import math
+from datetime import date, datetime, time
+
+from sqlalchemy import delete, distinct, func
+from sqlmodel import Session, select
+
+from ..db import insert_for
+from ..models import DailyVolume, Set, Workout, WorkoutExercise
+from .leaderboard import record_volume
+
+_COLUMNS = ["user_id", "day", "volume", "sessions", "best_lift"]
+
+
+def workout_day(workout: Workout) -> date:
+    """Jour (UTC) auquel la séance est comptabilisée."""
+    moment = workout.ended_at or workout.started_at or workout.created_at
+    return moment.date()
+
+
+def _day_column():
+    return func.date(func.coalesce(Workout.ended_at, Workout.started_at, Workout.created_at))
+
+
+def _aggregates():
+    return (
+        func.coalesce(func.sum(func.coalesce(Set.reps, 0) * func.coalesce(Set.weight, 0)), 0),
+        func.count(distinct(Workout.id)),
+        func.coalesce(func.max(Set.weight), 0),
+    )
+
+
+def _completed_workouts(statement):
+    return (
+        statement.select_from(Workout)
+        .outerjoin(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .outerjoin(Set, Set.workout_exercise_id == WorkoutExercise.id)
+        .where(Workout.status == "completed")
+        .where(Workout.deleted_at.is_(None))
+    )
+
+
+def _kg(volume: float) -> int:
+    """Arrondi au kg le plus proche (demi vers le haut, comme `round()` en SQL)."""
+    return math.floor(volume + 0.5)
+
+
+def refresh_daily_volume(session: Session, user_id: str, day: date) -> None:
+    """Recalcule la ligne `(user_id, day)` depuis les séries et reporte l'écart au classement."""
+    volume, sessions, best_lift = session.exec(
+        _completed_workouts(select(*_aggregates()))
+        .where(Workout.user_id == user_id)
+        .where(_day_column() == day.isoformat())
+    ).one()
+
+    previous_volume = session.exec(
+        select(DailyVolume.volume).where(DailyVolume.user_id == user_id).where(DailyVolume.day == day)
+    ).first() or 0.0
+
+    if sessions == 0:
+        session.execute(
+            delete(DailyVolume).where(DailyVolume.user_id == user_id).where(DailyVolume.day == day)
+        )
+    else:
+        values = {"volume": volume, "sessions": sessions, "best_lift": best_lift}
+        session.execute(
+            insert_for(session, DailyVolume)
+            .values(user_id=user_id, day=day, **values)
+            .on_conflict_do_update(index_elements=["user_id", "day"], set_=values)
+        )
+
+    delta = _kg(volume) - _kg(previous_volume)
+    if delta:
+        record_volume(session, user_id, datetime.combine(day, time()), delta)
+
+
+def rebuild_daily_volume(session: Session) -> None:
+    """Recalcule tout l'agrégat depuis `Workout`, `WorkoutExercise` et `Set`."""
+    session.execute(delete(DailyVolume))
+    day = _day_column()
+    session.execute(
+        insert_for(session, DailyVolume).from_select(
+            _COLUMNS,
+            _completed_workouts(select(Workout.user_id, day, *_aggregates()))
+            .group_by(Workout.user_id, day),
+        )
+    )
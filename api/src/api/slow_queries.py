@@ -0,0 +1,120 @@
+"""Journal des requêtes SQL lentes (JSONL avec rotation), activé à la demande.
+
+`SLOW_QUERY_LOG=chemin.jsonl` active le journal ; toute instruction plus longue
+que `SLOW_QUERY_MS` (100 ms par défaut) y est écrite sur une ligne JSON : SQL
+normalisé, forme des paramètres (types, jamais les valeurs), durée, route
+appelante. Sous SQLite, le plan (`EXPLAIN QUERY PLAN`) est capturé une fois
+par empreinte et les parcours complets de table (`SCAN <table>`) sont signalés.
+Le fichier tourne à `SLOW_QUERY_LOG_MAX_BYTES` (10 Mo), 5 fichiers conservés.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .query_stats import current_route, fingerprint
+from .utils.jsonl import attach_jsonl_file
+
+logger = logging.getLogger(__name__)
+
+# `SCAN share` ou `SCAN share AS s` : sans index ; `SCAN share USING INDEX …` n'en est pas un
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+_EXPLAINABLE = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+
+# Plans déjà capturés : empreinte -> (lignes du plan, tables parcourues en entier)
+_PLANS: dict[str, tuple[list[str], list[str]]] = {}
+
+
+def _log_path() -> Optional[str]:
+    return os.getenv("SLOW_QUERY_LOG") or None
+
+
+def _threshold() -> float:
+    return float(os.getenv("SLOW_QUERY_MS", "100")) / 1000
+
+
+def _configure_logger(path: str) -> None:
+    max_bytes = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    attach_jsonl_file(logger, path, max_bytes)
+
+
+def parameters_shape(parameters: Any, executemany: bool) -> Any:
+    """Types des paramètres liés, sans leurs valeurs."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameters_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def _query_plan(
+    dbapi_connection: Any, statement: str, parameters: Any
+) -> tuple[list[str], list[str]]:
+    """`EXPLAIN QUERY PLAN` sur un curseur DBAPI neuf (hors événements SQLAlchemy)."""
+    explain = dbapi_connection.cursor()
+    try:
+        explain.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        plan = [row[-1] for row in explain.fetchall()]
+        explain.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in explain.fetchall()}
+    finally:
+        explain.close()
+    scans = []
+    for line in plan:
+        match = _FULL_SCAN.match(line.strip())
+        # Les sous-requêtes matérialisées (`SCAN anon_1`) ne sont pas des tables
+        if match and match.group(1) in tables:
+            scans.append(match.group(1))
+    return plan, scans
+
+
+def install(engine: Engine) -> None:
+    """Branche le journal sur `engine` si `SLOW_QUERY_LOG` est défini."""
+    path = _log_path()
+    if path is None:
+        return
+    _configure_logger(path)
+    threshold = _threshold()
+    is_sqlite = engine.dialect.name == "sqlite"
+
+    # Début porté par le contexte d'exécution (une requête en échec n'a pas d'`after`)
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        if duration < threshold:
+            return
+        key = fingerprint(statement)
+        entry: dict[str, Any] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "route": current_route(),
+            "sql": key,
+            "parameters": parameters_shape(parameters, executemany),
+        }
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if is_sqlite and not executemany and verb in _EXPLAINABLE:
+            if key not in _PLANS:
+                try:
+                    _PLANS[key] = _query_plan(conn.connection, statement, parameters)
+                except Exception as exc:  # le journal ne doit jamais casser la requête
+                    _PLANS[key] = ([f"explain_failed: {exc}"], [])
+            entry["plan"], entry["full_scans"] = _PLANS[key]
+        logger.info(json.dumps(entry, ensure_ascii=False))
@@ -1,5 +1,6 @@
 import os
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 from fastapi.testclient import TestClient
@@ -7,6 +8,7 @@ from fastapi.testclient import TestClient
 from api.db import init_db
 from api.db import reset_engine
 from api.main import app
+from api.query_stats import QueryStats, track_queries
 
 
 @pytest.fixture(autouse=True)
@@ -25,3 +27,19 @@ def _test_database(tmp_path) -> Iterator[None]:
 def client() -> Iterator[TestClient]:
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture()
+def query_budget() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """`with query_budget(3): client.get(...)` échoue au-delà de 3 requêtes SQL dans le bloc."""
+
+    @contextmanager
+    def budget(max_queries: int) -> Iterator[QueryStats]:
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"{stats.count} requêtes SQL pour un budget de {max_queries} : "
+            f"{stats.statements.most_common(3)}"
+        )
+
+    return budget
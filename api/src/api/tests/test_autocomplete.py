@@ -0,0 +1,62 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Exercise, User
+from api.services.autocomplete import PrefixIndex
+
+
+def add_user(user_id: str, username: str) -> None:
+    with Session(get_engine()) as session:
+        session.add(User(id=user_id, username=username, email=f'{user_id}@test.local',
+                         password_hash='x'))
+        session.commit()
+
+
+def labels(response) -> list[str]:
+    return [item['label'] for item in response.json()]
+
+
+def test_prefix_index_keeps_keys_sorted_across_updates():
+    index = PrefixIndex()
+    index.load([('1', 'Marc', {'marc'}, None), ('2', 'Marie', {'marie'}, None)])
+    index.put('3', 'Mario', {'mario'})
+    index.put('1', 'Zoé', {'zoe'})
+
+    assert [item_id for _, item_id, _, _ in index.complete('mar', 10)] == ['2', '3']
+    assert [label for _, _, label, _ in index.complete('z', 10)] == ['Zoé']
+    index.remove('3')
+    assert len(index) == 2
+
+
+def test_autocomplete_matches_users_and_exercise_words(client):
+    add_user('u1', 'Benoît')
+    with Session(get_engine()) as session:
+        session.add(Exercise(name='Développé couché', slug='developpe-couche-chest',
+                             muscle_group='chest'))
+        session.add(Exercise(name='Benoît curl', slug='benoit-curl-arms', muscle_group='arms'))
+        session.commit()
+
+    assert labels(client.get('/explore/autocomplete?q=beno')) == ['Benoît', 'Benoît curl']
+    assert labels(client.get('/explore/autocomplete?q=beno&type=user')) == ['Benoît']
+    assert labels(client.get('/explore/autocomplete?q=COUCH')) == ['Développé couché']
+    item = client.get('/explore/autocomplete?q=developpe-c').json()[0]
+    assert item == {'type': 'exercise', 'id': item['id'], 'label': 'Développé couché',
+                    'slug': 'developpe-couche-chest'}
+
+
+def test_autocomplete_follows_user_writes(client, query_budget):
+    add_user('u1', 'alice')
+    assert labels(client.get('/explore/autocomplete?q=al')) == ['alice']
+
+    with query_budget(0):
+        assert labels(client.get('/explore/autocomplete?q=ali')) == ['alice']
+
+    response = client.put('/users/profile/u1', json={'username': 'aline'})
+    assert response.status_code == 200
+    response = client.post(
+        '/users/profile', json={'id': 'u2', 'username': 'albert', 'consent_to_public_share': True}
+    )
+    assert response.status_code == 200
+
+    assert labels(client.get('/explore/autocomplete?q=al')) == ['albert', 'aline']
+    assert labels(client.get('/explore/autocomplete?q=alic')) == []
@@ -0,0 +1,108 @@
+import re
+import time
+
+from sqlmodel import Session
+
+from api.cache import Cache, cached, invalidate_on_commit
+from api.db import get_engine
+from api.models import Share, User
+from api.services.trending import rebuild_trending
+
+
+def add_user(user_id: str) -> None:
+    with Session(get_engine()) as session:
+        session.add(User(id=user_id, username=user_id, email=f'{user_id}@test.local',
+                         password_hash='x'))
+        session.commit()
+
+
+def metric(text: str, name: str, cache: str) -> float:
+    match = re.search(rf'^{name}\{{cache="{cache}"\}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_lru_eviction_ttl_and_tags(monkeypatch):
+    cache = Cache('test_lru', max_entries=2, ttl=10)
+    cache.set('a', 1, tags=['user:1'])
+    cache.set('b', 2, tags=['user:2'])
+    assert cache.get('a') == 1  # `b` devient le moins récemment lu
+    cache.set('c', 3, tags=['user:1'])
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    assert cache.invalidate('user:1') == 2
+    assert len(cache) == 0
+
+    cache.set('d', 4)
+    now = time.monotonic()
+    monkeypatch.setattr('api.cache.time.monotonic', lambda: now + 11)
+    assert cache.get('d') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_result_computed_before_an_invalidation_is_not_stored():
+    cache = Cache('test_stale', ttl=10)
+    calls = []
+
+    @cached(cache, tags=('user:{user_id}',))
+    def load(user_id, session=None):
+        calls.append(user_id)
+        # Écriture concurrente pendant le calcul
+        cache.invalidate(f'user:{user_id}')
+        return len(calls)
+
+    assert load('u1') == 1
+    assert load('u1') == 2
+    assert len(cache) == 0
+
+
+def test_invalidation_waits_for_the_outer_commit():
+    cache = Cache('test_commit', ttl=10)
+    cache.set('kept', 1, tags=['user:kept'])
+    cache.set('dropped', 2, tags=['user:dropped'])
+
+    with Session(get_engine()) as session:
+        with session.begin_nested():
+            invalidate_on_commit(session, 'user:dropped')
+        assert cache.get('dropped') == 2  # SAVEPOINT libéré, transaction toujours ouverte
+        session.commit()
+    assert cache.get('dropped') is None
+
+    with Session(get_engine()) as session:
+        session.add(User(id='ghost', username='ghost', email='g@test.local', password_hash='x'))
+        session.flush()
+        invalidate_on_commit(session, 'user:kept')
+        session.rollback()
+        session.commit()
+    assert cache.get('kept') == 1
+
+
+def test_profile_is_cached_until_a_follow(client):
+    add_user('alice')
+    add_user('bob')
+
+    first = client.get('/profile/alice?current_user_id=bob').json()
+    assert first['followers_count'] == 0
+    before = metric(client.get('/metrics').text, 'cache_hits_total', 'profiles')
+    assert client.get('/profile/alice?current_user_id=bob').json() == first
+    assert metric(client.get('/metrics').text, 'cache_hits_total', 'profiles') == before + 1
+
+    assert client.post('/profile/alice/follow?follower_id=bob').status_code == 204
+    profile = client.get('/profile/alice?current_user_id=bob').json()
+    assert profile['followers_count'] == 1
+    assert profile['is_following'] is True
+
+
+def test_trending_is_invalidated_by_likes(client):
+    add_user('alice')
+    with Session(get_engine()) as session:
+        session.add(Share(share_id='sh_cached', owner_id='alice', owner_username='alice',
+                          workout_title='Legs'))
+        session.flush()
+        rebuild_trending(session)
+        session.commit()
+
+    assert client.get('/explore/trending').json()[0]['like_count'] == 0
+    client.post('/likes/sh_cached', json={'user_id': 'alice'})
+    assert client.get('/explore/trending').json()[0]['like_count'] == 1
+    assert client.get('/profile/alice').json()['total_likes'] == 1
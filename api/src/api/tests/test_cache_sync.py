@@ -0,0 +1,52 @@
+from sqlmodel import Session, select
+
+from api.cache import Cache, invalidate_on_commit
+from api.cache_sync import ORIGIN, start_cache_sync
+from api.db import get_engine
+from api.models import CacheInvalidation, Follower, User
+from api.services.counters import adjust_follow_counters
+
+
+def test_committed_tags_are_published_for_other_processes():
+    with Session(get_engine()) as session:
+        with session.begin_nested():
+            invalidate_on_commit(session, 'user:u1', 'follows')
+        session.commit()
+
+    with Session(get_engine()) as session:
+        rows = session.exec(select(CacheInvalidation.tag, CacheInvalidation.origin)).all()
+    assert sorted(rows) == [('follows', ORIGIN), ('user:u1', ORIGIN)]
+
+
+def test_writes_from_another_worker_invalidate_local_entries(client):
+    cache = Cache('test_sync', ttl=60)
+    cache.set('own', 1, tags=['user:own'])
+    cache.set('remote', 2, tags=['user:remote'])
+    with Session(get_engine()) as session:
+        session.add(CacheInvalidation(tag='user:own', origin=ORIGIN))
+        session.add(CacheInvalidation(tag='user:remote', origin='other-worker'))
+        session.commit()
+
+    start_cache_sync().poll()
+
+    assert cache.get('remote') is None
+    assert cache.get('own') == 1  # ses propres tags sont invalidés au COMMIT, pas relus
+
+
+def test_profile_follows_a_follow_made_by_another_worker(client):
+    with Session(get_engine()) as session:
+        for user_id in ('alice', 'bob'):
+            session.add(User(id=user_id, username=user_id, email=f'{user_id}@test.local',
+                             password_hash='x'))
+        session.commit()
+    assert client.get('/profile/alice').json()['followers_count'] == 0
+
+    # Écriture d'un autre processus : données et tags dans la même transaction
+    with Session(get_engine()) as session:
+        session.add(Follower(follower_id='bob', followed_id='alice'))
+        adjust_follow_counters(session, 'bob', 'alice', 1)
+        session.add(CacheInvalidation(tag='user:alice', origin='other-worker'))
+        session.commit()
+
+    start_cache_sync().poll()
+    assert client.get('/profile/alice').json()['followers_count'] == 1
@@ -1,6 +1,20 @@
 
+import asyncio
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from api.db import get_async_engine
+from api.db import get_async_session
 from api.db import get_engine
+from api.db import get_read_engine
 from api.db import reset_engine
+from api.db import sqlite_pragmas
+from api.db import sqlite_settings
+from api.models import User
+from api.writer import run_write
 
 
 def test_default_database_url(monkeypatch):
@@ -8,3 +22,81 @@ def test_default_database_url(monkeypatch):
     reset_engine()
     engine = get_engine()
     assert engine.url.database.endswith("gorillax.db")
+
+
+def test_sqlite_pragmas_applied_on_connect():
+    settings = sqlite_settings(get_engine())
+    assert settings['journal_mode'] == 'wal'
+    assert settings['synchronous'] == '1'  # NORMAL
+    assert settings['busy_timeout'] == '5000'
+    assert settings['temp_store'] == '2'  # MEMORY
+    assert settings['foreign_keys'] == '1'
+
+
+def test_sqlite_pragmas_from_environment(monkeypatch):
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "full")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "250")
+    reset_engine()
+    settings = sqlite_settings(get_engine())
+    assert settings['synchronous'] == '2'
+    assert settings['busy_timeout'] == '250'
+
+
+def test_invalid_sqlite_pragma_is_rejected(monkeypatch):
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "wal; DROP TABLE user")
+    with pytest.raises(ValueError):
+        sqlite_pragmas()
+
+
+def test_read_engine_is_read_only():
+    engine = get_read_engine()
+    assert "mode=ro" in str(engine.url)
+    with Session(engine) as session:
+        with pytest.raises(OperationalError, match="readonly"):
+            session.execute(text("DELETE FROM user"))
+
+
+def test_read_engine_sees_committed_writes():
+    def write(session):
+        session.add(User(id="reader-1", username="reader", email="reader@example.com",
+                         password_hash="x"))
+
+    run_write(write)
+    with Session(get_read_engine()) as session:
+        assert session.exec(select(User.username).where(User.id == "reader-1")).one() == "reader"
+
+
+def test_async_session_reads_through_aiosqlite():
+    run_write(lambda session: session.add(
+        User(id="async-1", username="async", email="async@example.com", password_hash="x")
+    ))
+
+    async def read() -> tuple[str, str]:
+        async for session in get_async_session():
+            username = (await session.exec(select(User.username).where(User.id == "async-1"))).one()
+            return session.get_bind().url.drivername, username
+
+    assert asyncio.run(read()) == ("sqlite+aiosqlite", "async")
+
+
+def test_reset_engine_inside_event_loop_closes_async_connections():
+    closed: list[object] = []
+
+    async def read_then_reset() -> None:
+        engine = get_async_engine().sync_engine
+        event.listen(engine, "close", lambda connection, record: closed.append(connection))
+        async for session in get_async_session():
+            await session.exec(select(User.id))
+        reset_engine()
+        # La fermeture est planifiée sur la boucle courante
+        await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}))
+
+    asyncio.run(read_then_reset())
+    assert closed
+
+
+def test_async_engine_rejects_in_memory_sqlite(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    reset_engine()
+    with pytest.raises(ValueError, match="mémoire"):
+        get_async_engine()
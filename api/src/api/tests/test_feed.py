@@ -5,6 +5,8 @@ from sqlmodel import Session
 
 from api.db import get_engine
 from api.models import Share, User, Follower
+from api.services.timeline import fan_out_share
+from api.utils.pagination import paginate
 
 
 def setup_users_and_shares(session: Session):
@@ -72,3 +74,115 @@ def test_feed_requires_user(client):
     response = client.get('/feed?user_id=unknown')
     assert response.status_code == 404
     assert response.json()['detail'] == 'user_not_found'
+
+
+def create_timeline_users(session: Session):
+    owner = User(id=str(uuid.uuid4()), username='tl-owner', email='tl-owner@test.local', password_hash='x')
+    reader = User(id=str(uuid.uuid4()), username='tl-reader', email='tl-reader@test.local', password_hash='x')
+    stranger = User(id=str(uuid.uuid4()), username='tl-stranger', email='tl-stranger@test.local', password_hash='x')
+    session.add_all([owner, reader, stranger])
+    session.commit()
+    for i in range(3):
+        share = Share(
+            share_id=f'sh_tl_{i}',
+            owner_id=owner.id,
+            owner_username=owner.username,
+            workout_title=f'Séance {i}',
+            created_at=datetime.now() - timedelta(minutes=i),
+        )
+        session.add(share)
+        fan_out_share(session, share)
+    session.commit()
+    return owner.id, reader.id, stranger.id
+
+
+def test_feed_follow_backfills_and_unfollow_prunes_timeline(client):
+    with Session(get_engine()) as session:
+        owner_id, reader_id, stranger_id = create_timeline_users(session)
+
+    assert client.get(f"/feed?user_id={reader_id}").json()['items'] == []
+
+    client.post(f"/feed/follow/{owner_id}", json={'follower_id': reader_id})
+    items = client.get(f"/feed?user_id={reader_id}").json()['items']
+    assert [item['share_id'] for item in items] == ['sh_tl_0', 'sh_tl_1', 'sh_tl_2']
+    assert client.get(f"/feed?user_id={stranger_id}").json()['items'] == []
+
+    client.request("DELETE", f"/feed/follow/{owner_id}", json={'follower_id': reader_id})
+    assert client.get(f"/feed?user_id={reader_id}").json()['items'] == []
+
+
+def test_new_share_is_pushed_to_followers(client):
+    with Session(get_engine()) as session:
+        owner_id, reader_id, _ = create_timeline_users(session)
+
+    client.post(f"/profile/{owner_id}/follow", params={'follower_id': reader_id})
+    with Session(get_engine()) as session:
+        share = Share(share_id='sh_tl_new', owner_id=owner_id, owner_username='tl-owner', workout_title='Nouvelle')
+        session.add(share)
+        fan_out_share(session, share)
+        session.commit()
+
+    reader_items = client.get(f"/feed?user_id={reader_id}").json()['items']
+    owner_items = client.get(f"/feed?user_id={owner_id}").json()['items']
+    assert reader_items[0]['share_id'] == 'sh_tl_new'
+    assert owner_items[0]['share_id'] == 'sh_tl_new'
+
+
+def test_feed_cursor_has_no_duplicates_within_same_timestamp(client):
+    with Session(get_engine()) as session:
+        owner = User(id=str(uuid.uuid4()), username='burst', email='burst@test.local', password_hash='x')
+        session.add(owner)
+        burst_at = datetime(2025, 1, 1, 12, 0, 0)
+        for i in range(7):
+            share = Share(
+                share_id=f'sh_burst_{i}',
+                owner_id=owner.id,
+                owner_username='burst',
+                workout_title='Burst',
+                created_at=burst_at,
+            )
+            session.add(share)
+            fan_out_share(session, share)
+        session.commit()
+        owner_id = owner.id
+
+    seen = []
+    cursor = None
+    while True:
+        params = {'user_id': owner_id, 'limit': 3}
+        if cursor:
+            params['cursor'] = cursor
+        payload = client.get('/feed', params=params).json()
+        seen.extend(item['share_id'] for item in payload['items'])
+        cursor = payload['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [f'sh_burst_{i}' for i in reversed(range(7))]
+
+    posts = client.get(f'/profile/{owner_id}/posts', params={'limit': 4}).json()
+    more = client.get(
+        f'/profile/{owner_id}/posts', params={'limit': 4, 'cursor': posts['next_cursor']}
+    ).json()
+    assert len(posts['posts']) + len(more['posts']) == 7
+    assert more['next_cursor'] is None
+
+
+def test_feed_rejects_invalid_cursor(client):
+    with Session(get_engine()) as session:
+        _, reader_id, _ = create_timeline_users(session)
+    response = client.get('/feed', params={'user_id': reader_id, 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'invalid_cursor'
+
+
+def test_paginated_routes_reject_non_positive_limit(client):
+    with Session(get_engine()) as session:
+        author_id, _, _ = create_timeline_users(session)
+    for limit in (0, -1):
+        assert client.get(f'/profile/{author_id}/posts', params={'limit': limit}).status_code == 422
+        assert client.get('/likes/sh_missing/comments', params={'limit': limit}).status_code == 422
+
+
+def test_paginate_empty_page_has_no_cursor():
+    assert paginate(['a', 'b'], 0, key=lambda item: (datetime(2025, 1, 1), item)) == ([], None)
@@ -0,0 +1,69 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Follower, User
+from api.services.follow_graph import FollowGraph
+
+
+def graph_of(*edges: tuple[str, str]) -> FollowGraph:
+    graph = FollowGraph()
+    graph._load(edges)
+    graph._loaded = True
+    return graph
+
+
+def test_suggestions_rank_by_mutual_follows_then_followers():
+    graph = graph_of(
+        ('me', 'a'), ('me', 'b'), ('me', 'c'),
+        ('a', 'x'), ('b', 'x'), ('c', 'x'),  # x : 3 abonnements communs
+        ('a', 'y'), ('b', 'y'),              # y : 2
+        ('a', 'star'), ('b', 'star'), ('fan', 'star'), ('fan2', 'star'), ('fan3', 'star'),
+        ('a', 'z'), ('fan', 'w'),            # z : 1 ; w : suivi par un inconnu
+        ('a', 'me'), ('b', 'c'),             # soi-même ou déjà suivi : exclus
+    )
+    assert graph.suggest('me', 3) == [('x', 3, 3), ('star', 2, 5), ('y', 2, 2)]
+    # Complété par les comptes les plus suivis
+    assert [user_id for user_id, _, _ in graph.suggest('me', 10)] == [
+        'x', 'star', 'y', 'z', 'w'
+    ]
+    assert graph.suggest(None, 2) == [('star', 0, 5), ('x', 0, 3)]
+
+
+def test_refresh_replaces_only_the_followers_list():
+    graph = graph_of(('me', 'a'), ('a', 'x'))
+    graph.invalidated(('follows', 'following:a'))
+    assert graph.needs_refresh
+    with Session(get_engine()) as session:
+        session.add(Follower(follower_id='a', followed_id='y'))
+        session.add(Follower(follower_id='me', followed_id='ignored'))  # non signalé
+        session.commit()
+        graph.refresh(session)
+    assert graph.suggest('me', 5) == [('y', 1, 1)]
+    assert graph.followers_count('x') == 0
+    assert graph.following('me') == {'a'}
+
+    graph._compact()
+    assert graph.suggest('me', 5) == [('y', 1, 1)]
+
+
+def test_suggested_users_follow_the_api_writes(client):
+    with Session(get_engine()) as session:
+        for user_id in ('me', 'friend', 'target', 'other'):
+            session.add(User(id=user_id, username=user_id, email=f'{user_id}@test.local',
+                             password_hash='x'))
+        session.commit()
+
+    def suggested() -> list[tuple[str, int]]:
+        response = client.get('/explore/suggested-users?current_user_id=me&limit=2')
+        return [(user['id'], user['mutual_count']) for user in response.json()]
+
+    assert client.post('/feed/follow/friend', json={'follower_id': 'me'}).status_code == 204
+    assert client.post('/profile/target/follow?follower_id=friend').status_code == 204
+    assert suggested()[0] == ('target', 1)
+
+    assert client.post('/profile/target/follow?follower_id=me').status_code == 204
+    assert 'target' not in dict(suggested())
+    assert client.request('DELETE', '/feed/follow/friend',
+                          json={'follower_id': 'me'}).status_code == 204
+    assert client.delete('/profile/target/follow?follower_id=me').status_code == 204
+    assert ('target', 0) in suggested()
@@ -0,0 +1,63 @@
+from datetime import date
+
+from sqlmodel import Session, func, select
+
+from api.db import get_engine
+from api.models import Comment, Follower, Like, Set, Share, User, Workout
+from generate_dataset import DatasetSize, generate
+
+SIZE = DatasetSize(
+    users=200, follows=2_000, workouts=150, exercises_per_workout=3, sets=1_000,
+    likes=600, comments=300, exercises=20,
+)
+
+
+def snapshot() -> tuple[list, list]:
+    with Session(get_engine()) as session:
+        follows = session.exec(
+            select(Follower.follower_id, Follower.followed_id).order_by(Follower.id)
+        ).all()
+        likes = session.exec(select(Like.share_id, Like.user_id).order_by(Like.id)).all()
+    return follows, likes
+
+
+def test_generates_requested_volumes_with_consistent_projections():
+    counts = generate(SIZE, seed=7, until=date(2026, 1, 1))
+
+    assert counts['user'] == 200
+    assert counts['follower'] == 2_000
+    assert counts['workout'] == 150
+    assert counts['workoutexercise'] == 450
+    assert counts['set'] == 1_000
+    assert counts['like'] == 600
+    assert counts['comment'] == 300
+    with Session(get_engine()) as session:
+        assert session.exec(select(func.count()).select_from(Set)).one() == 1_000
+        assert session.exec(select(func.count()).select_from(Workout)).one() == 150
+        assert session.exec(select(func.sum(Share.like_count))).one() == 600
+        assert session.exec(select(func.sum(Share.comment_count))).one() == 300
+        assert session.exec(
+            select(func.count()).select_from(Follower).where(
+                Follower.follower_id == Follower.followed_id
+            )
+        ).one() == 0
+        # Loi de puissance : les 2 comptes les plus suivis (1 %) captent bien plus de 1 %
+        top = session.exec(
+            select(func.count()).select_from(Follower)
+            .group_by(Follower.followed_id).order_by(func.count().desc()).limit(2)
+        ).all()
+        assert sum(top) > 0.1 * 2_000
+        assert session.exec(select(func.max(Comment.created_at))).one().year <= 2026
+
+
+def test_same_seed_gives_same_dataset():
+    generate(SIZE, seed=7, until=date(2026, 1, 1))
+    first = snapshot()
+
+    generate(SIZE, seed=7, until=date(2026, 1, 1), reset=True)
+    assert snapshot() == first
+
+    generate(SIZE, seed=8, until=date(2026, 1, 1), reset=True)
+    assert snapshot() != first
+    with Session(get_engine()) as session:
+        assert session.exec(select(func.count()).select_from(User)).one() == 200
@@ -2,3 +2,11 @@ def test_health_returns_ok(client):
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_db_health_reports_sqlite_settings(client):
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    body = response.json()
+    assert body['backend'] == 'sqlite'
+    assert body['settings']['journal_mode'] == 'wal'
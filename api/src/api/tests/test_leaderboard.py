@@ -0,0 +1,198 @@
+import math
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from api.db import get_engine
+from api.models import DailyVolume, LeaderboardScore, LeaderboardSnapshot, Share, User
+from api.services import leaderboard
+from api.services.leaderboard import period_keys, rebuild_leaderboards, record_share, record_volume, snapshot_key
+
+
+def create_users(session: Session, *names: str) -> list[str]:
+    users = [
+        User(id=str(uuid.uuid4()), username=name, email=f'{name}@test.local', password_hash='x')
+        for name in names
+    ]
+    session.add_all(users)
+    session.commit()
+    return [user.id for user in users]
+
+
+def add_share(session: Session, owner_id: str, share_id: str, created_at: datetime) -> Share:
+    share = Share(
+        share_id=share_id,
+        owner_id=owner_id,
+        owner_username='owner',
+        workout_title='Séance',
+        created_at=created_at,
+    )
+    session.add(share)
+    record_share(session, share)
+    session.commit()
+    return share
+
+
+def add_volume(session: Session, user_id: str, volume: float, moment: datetime) -> None:
+    session.add(DailyVolume(user_id=user_id, day=moment.date(), volume=volume, sessions=1))
+    record_volume(session, user_id, moment, math.floor(volume + 0.5))
+    session.commit()
+
+
+def snapshot_count(session: Session) -> int:
+    return len(session.exec(select(LeaderboardSnapshot)).all())
+
+
+def scores(session: Session) -> set[tuple[str, str, str, int]]:
+    rows = session.exec(select(LeaderboardScore)).all()
+    return {(row.board, row.period_key, row.user_id, row.score) for row in rows if row.score}
+
+
+def test_period_keys_use_calendar_buckets():
+    keys = period_keys(datetime(2024, 3, 3, 22, 0))  # dimanche
+    assert keys == {'week': '2024-02-26', 'month': '2024-03', 'all': 'all'}
+    assert snapshot_key('week', datetime(2024, 3, 3)) == '2024-02-19'
+    assert snapshot_key('month', datetime(2024, 1, 15)) == '2023-12'
+    assert snapshot_key('all', datetime(2024, 3, 3)) == '2024-02-26'
+
+
+def test_shares_follows_and_likes_update_leaderboards(client):
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        alice, bob = create_users(session, 'alice', 'bob')
+        add_share(session, alice, 'sh_lb_1', now)
+        add_share(session, alice, 'sh_lb_2', now)
+        add_share(session, bob, 'sh_lb_3', now)
+        add_volume(session, alice, 300, now)
+        add_volume(session, bob, 500, now)
+
+    client.post(f"/feed/follow/{alice}", json={'follower_id': bob})
+    client.post("/likes/sh_lb_3", json={'user_id': alice})
+
+    volume = client.get("/leaderboard/volume", params={'period': 'week', 'current_user_id': alice}).json()
+    assert [(entry['username'], entry['score']) for entry in volume['entries']] == [('bob', 500), ('alice', 300)]
+    assert volume['my_rank'] == 2
+
+    sessions = client.get("/leaderboard/sessions", params={'period': 'month'}).json()
+    assert [(entry['username'], entry['score']) for entry in sessions['entries']] == [('alice', 2), ('bob', 1)]
+
+    followers = client.get("/leaderboard/followers").json()
+    assert [(entry['username'], entry['score']) for entry in followers['entries']] == [('alice', 1)]
+    likes = client.get("/leaderboard/likes").json()
+    assert [(entry['username'], entry['score']) for entry in likes['entries']] == [('bob', 1)]
+
+    client.request("DELETE", f"/feed/follow/{alice}", json={'follower_id': bob})
+    client.post("/likes/sh_lb_3", json={'user_id': alice})
+    assert client.get("/leaderboard/followers").json()['entries'] == []
+    assert client.get("/leaderboard/likes").json()['entries'] == []
+
+
+def test_rebuild_matches_incremental_updates(client):
+    with Session(get_engine()) as session:
+        alice, bob = create_users(session, 'alice', 'bob')
+        add_share(session, alice, 'sh_lb_old', datetime(2024, 1, 7, 23, 30))  # dimanche
+        add_share(session, alice, 'sh_lb_new', datetime(2024, 1, 8, 8, 0))  # lundi
+        add_share(session, bob, 'sh_lb_bob', datetime(2024, 2, 1, 12, 0))
+        add_volume(session, alice, 150.5, datetime(2024, 1, 7, 23, 30))
+        add_volume(session, alice, 250, datetime(2024, 1, 8, 8, 0))
+
+    client.post(f"/feed/follow/{bob}", json={'follower_id': alice})
+    client.post("/likes/sh_lb_bob", json={'user_id': alice})
+
+    with Session(get_engine()) as session:
+        incremental = scores(session)
+        assert ('sessions', '2024-01-01', alice, 1) in incremental
+        assert ('sessions', '2024-01-08', alice, 1) in incremental
+        assert ('volume', '2024-01', alice, 401) in incremental
+
+        rebuild_leaderboards(session)
+        session.commit()
+        assert scores(session) == incremental
+
+
+def test_my_rank_is_exact_outside_the_returned_page(client):
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        ids = create_users(session, 'u1', 'u2', 'u3', 'u4')
+        for index, user_id in enumerate(ids):
+            add_volume(session, user_id, (index + 1) * 100, now)
+
+    response = client.get("/leaderboard/volume", params={'limit': 2, 'current_user_id': ids[0]}).json()
+    assert [entry['username'] for entry in response['entries']] == ['u4', 'u3']
+    assert response['my_rank'] == 4
+
+    unranked = client.get("/leaderboard/likes", params={'current_user_id': ids[0]}).json()
+    assert unranked['my_rank'] is None
+
+
+@pytest.mark.parametrize('window_functions', [True, False])
+def test_change_compares_with_previous_period_snapshot(client, monkeypatch, window_functions):
+    monkeypatch.setattr(leaderboard, 'supports_window_functions', lambda session: window_functions)
+    now = datetime.utcnow()
+    last_week = now - timedelta(days=7)
+    with Session(get_engine()) as session:
+        alice, bob, carol = create_users(session, 'alice', 'bob', 'carol')
+        # État existant, matérialisé par une reconstruction (qui prend les photos)
+        for user_id, volume, moment in (
+            (alice, 500, last_week), (bob, 100, last_week),
+            (bob, 600, now), (alice, 200, now), (carol, 400, now),
+        ):
+            session.add(DailyVolume(user_id=user_id, day=moment.date(), volume=volume, sessions=1))
+        for user_id, share_id, moment in (
+            (alice, 'sh_prev_a', last_week), (bob, 'sh_prev_b', last_week),
+            (alice, 'sh_now_a', now), (bob, 'sh_now_b', now), (carol, 'sh_now_c', now),
+        ):
+            session.add(Share(share_id=share_id, owner_id=user_id, owner_username='owner',
+                              workout_title='Séance', created_at=moment))
+        session.commit()
+        rebuild_leaderboards(session)
+        session.commit()
+        snapshot_rows = snapshot_count(session)
+
+    week = client.get("/leaderboard/volume").json()
+    assert [(entry['username'], entry['change']) for entry in week['entries']] == [
+        ('bob', 1), ('carol', 0), ('alice', -2),
+    ]
+
+    # `all` : référence figée avant les écritures de la semaine
+    everyone = client.get("/leaderboard/sessions", params={'period': 'all'}).json()
+    assert all(entry['change'] == 0 for entry in everyone['entries'])
+    with Session(get_engine()) as session:
+        # Les lectures n'écrivent rien
+        assert snapshot_count(session) == snapshot_rows
+        add_share(session, carol, 'sh_now_c2', now)
+        add_share(session, carol, 'sh_now_c3', now)
+    everyone = client.get("/leaderboard/sessions", params={'period': 'all'}).json()
+    assert everyone['entries'][0]['username'] == 'carol'
+    assert everyone['entries'][0]['change'] == 2
+
+
+def test_ranks_ignore_scores_without_user(client):
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        (alice,) = create_users(session, 'alice')
+        add_volume(session, alice, 100, now)
+        add_volume(session, 'guest-user', 900, now)
+
+    response = client.get("/leaderboard/volume", params={'current_user_id': alice}).json()
+    assert [(entry['rank'], entry['username']) for entry in response['entries']] == [(1, 'alice')]
+    assert response['my_rank'] == 1
+
+
+def test_snapshot_rolled_back_with_its_transaction_is_taken_again():
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        (alice,) = create_users(session, 'alice')
+        session.add(LeaderboardScore(board='sessions', period_key='all', user_id=alice, score=3))
+        session.commit()
+
+        record_share(session, Share(share_id='sh_lost', owner_id=alice, owner_username='alice',
+                                    workout_title='Séance', created_at=now))
+        assert snapshot_count(session) > 0
+        session.rollback()
+        assert snapshot_count(session) == 0
+
+        add_share(session, alice, 'sh_kept', now)
+        assert snapshot_count(session) > 0
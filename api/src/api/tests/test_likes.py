@@ -0,0 +1,74 @@
+import uuid
+
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Like, Share, User
+from api.services.counters import recompute_share_counters
+
+
+def create_share(session: Session) -> tuple[str, str, str]:
+    owner = User(id=str(uuid.uuid4()), username='owner', email='owner@test.local', password_hash='x')
+    fan = User(id=str(uuid.uuid4()), username='fan', email='fan@test.local', password_hash='x')
+    share = Share(share_id='sh_likes', owner_id=owner.id, owner_username='owner', workout_title='Legs')
+    session.add_all([owner, fan, share])
+    session.commit()
+    return owner.id, fan.id, share.share_id
+
+
+def test_toggle_like_maintains_counter(client):
+    with Session(get_engine()) as session:
+        _, fan_id, share_id = create_share(session)
+
+    liked = client.post(f"/likes/{share_id}", json={'user_id': fan_id}).json()
+    assert liked == {'liked': True, 'like_count': 1}
+    assert client.get(f"/likes/{share_id}/count").json()['like_count'] == 1
+
+    unliked = client.post(f"/likes/{share_id}", json={'user_id': fan_id}).json()
+    assert unliked == {'liked': False, 'like_count': 0}
+    with Session(get_engine()) as session:
+        assert session.get(Share, share_id).like_count == 0
+
+
+def test_comments_maintain_counter(client):
+    with Session(get_engine()) as session:
+        _, fan_id, share_id = create_share(session)
+
+    comment = client.post(f"/likes/{share_id}/comments", json={'user_id': fan_id, 'content': 'Bravo'}).json()
+    client.post(f"/likes/{share_id}/comments", json={'user_id': fan_id, 'content': 'Encore'})
+    assert client.get(f"/likes/{share_id}/comments").json()['total'] == 2
+
+    client.delete(f"/likes/{share_id}/comments/{comment['id']}", params={'user_id': fan_id})
+    with Session(get_engine()) as session:
+        assert session.get(Share, share_id).comment_count == 1
+
+
+def test_recompute_share_counters_repairs_drift(client):
+    with Session(get_engine()) as session:
+        owner_id, fan_id, share_id = create_share(session)
+        session.add(Like(share_id=share_id, user_id=fan_id))
+        session.add(Like(share_id=share_id, user_id=owner_id))
+        session.commit()
+        assert session.get(Share, share_id).like_count == 0
+
+        recompute_share_counters(session)
+        session.commit()
+        session.expire_all()
+        assert session.get(Share, share_id).like_count == 2
+
+
+def test_comment_like_toggle_and_delete_permissions(client):
+    with Session(get_engine()) as session:
+        owner_id, fan_id, share_id = create_share(session)
+
+    comment = client.post(f"/likes/{share_id}/comments", json={'user_id': fan_id, 'content': 'Bravo'}).json()
+    liked = client.post(f"/likes/comment/{comment['id']}/like", json={'user_id': owner_id}).json()
+    assert liked == {'liked': True, 'like_count': 1}
+    unliked = client.post(f"/likes/comment/{comment['id']}/like", json={'user_id': owner_id}).json()
+    assert unliked == {'liked': False, 'like_count': 0}
+    assert client.post("/likes/comment/missing/like", json={'user_id': owner_id}).status_code == 404
+
+    forbidden = client.delete(f"/likes/{share_id}/comments/{comment['id']}", params={'user_id': owner_id})
+    assert forbidden.status_code == 403
+    with Session(get_engine()) as session:
+        assert session.get(Share, share_id).comment_count == 1
@@ -0,0 +1,55 @@
+import re
+
+from api import metrics
+from api.metrics import Histogram, register_collector
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}\{{{re.escape(rendered)}\}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    buckets = {labels['le']: value for name, labels, value in histogram.samples('h', {})
+               if name == 'h_bucket'}
+    assert buckets == {'0.1': 2, '1': 3, '+Inf': 4}
+
+
+def test_requests_are_counted_per_route_template(client):
+    labels = {'method': 'GET', 'route': '/profile/{user_id}', 'status': '404'}
+    before = sample(client.get('/metrics').text, 'http_requests_total', **labels)
+
+    client.get('/profile/unknown-1')
+    client.get('/profile/unknown-2')
+
+    response = client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = response.text
+    assert sample(text, 'http_requests_total', **labels) == before + 2
+    assert sample(
+        text, 'http_request_duration_seconds_bucket',
+        method='GET', route='/profile/{user_id}', le='+Inf',
+    ) >= 2
+    assert 'route="/profile/unknown-1"' not in text
+    assert sample(text, 'db_pool_size', pool='read') == 8
+    # Une seule déclaration (et un seul bloc) par famille
+    types = re.findall(r'^# TYPE (\S+)', text, re.MULTILINE)
+    assert len(types) == len(set(types))
+
+
+def test_registered_collectors_are_exported(client, monkeypatch):
+    monkeypatch.setattr(metrics, '_COLLECTORS', [])
+    monkeypatch.setattr(metrics, '_METRIC_TYPES', dict(metrics._METRIC_TYPES))
+    register_collector(
+        lambda: [('test_cache_hits_total', {'cache': 'demo'}, 3)],
+        {'test_cache_hits_total': 'counter'},
+    )
+
+    text = client.get('/metrics').text
+    assert '# TYPE test_cache_hits_total counter' in text
+    assert sample(text, 'test_cache_hits_total', cache='demo') == 3
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Comment
+from api.utils import queries
+from api.utils.queries import latest_per_group
+
+
+@pytest.mark.parametrize('window_functions', [True, False])
+def test_latest_per_group_keeps_n_most_recent(monkeypatch, window_functions):
+    monkeypatch.setattr(queries, 'supports_window_functions', lambda session: window_functions)
+    base = datetime(2025, 1, 1)
+    with Session(get_engine()) as session:
+        for share_id, count in (('sh_a', 5), ('sh_b', 1), ('sh_c', 3)):
+            for i in range(count):
+                session.add(Comment(
+                    id=f'{share_id}-{i}',
+                    share_id=share_id,
+                    user_id='u',
+                    username='u',
+                    content='c',
+                    created_at=base + timedelta(minutes=i),
+                ))
+        # Même horodatage : départagé par l'id
+        session.add(Comment(id='sh_c-9', share_id='sh_c', user_id='u', username='u', content='c',
+                            created_at=base + timedelta(minutes=2)))
+        session.commit()
+
+        rows = session.exec(
+            latest_per_group(session, Comment, Comment.share_id, [Comment.created_at, Comment.id],
+                             ['sh_a', 'sh_b', 'sh_c'], n=2)
+        ).all()
+
+    assert [row.id for row in rows] == ['sh_a-4', 'sh_a-3', 'sh_b-0', 'sh_c-9', 'sh_c-2']
@@ -0,0 +1,139 @@
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from api.db import get_async_engine, get_engine, get_read_engine
+from api.models import (
+    Comment, CommentLike, FeedEntry, Follower, Like, Notification, Set, Share, WorkoutExercise,
+)
+from api.slow_queries import _query_plan
+from api.tests.test_query_stats import seed_social_graph
+
+# Parcours complets assumés : requêtes sans prédicat sélectif
+KNOWN_SCANS = {
+    # suggestions : complément à froid (graphe trop petit), `LIMIT` hors des comptes suivis
+    ('GET', '/explore', 'user'),
+    ('GET', '/explore/suggested-users?current_user_id=reader', 'user'),
+}
+
+
+@pytest.fixture
+def captured():
+    """Instructions (SQL, paramètres) exécutées sur tous les engines pendant le test."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if not executemany:
+            statements.append((statement, parameters))
+
+    engines = [get_engine(), get_read_engine(), get_async_engine().sync_engine]
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    yield statements
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+
+def explain(statement: str, parameters=()) -> tuple[list[str], list[str]]:
+    raw = get_engine().raw_connection()
+    try:
+        return _query_plan(raw.driver_connection, statement, parameters)
+    finally:
+        raw.close()
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'json'),
+    [
+        ('GET', '/feed?user_id=reader', None),
+        ('GET', '/explore', None),
+        ('GET', '/explore/trending', None),
+        ('GET', '/explore/search?q=owner', None),
+        ('GET', '/explore/suggested-users?current_user_id=reader', None),
+        ('GET', '/leaderboard/sessions?period=all&current_user_id=reader', None),
+        ('GET', '/profile/owner-0?current_user_id=reader', None),
+        ('GET', '/profile/owner-0/posts', None),
+        ('GET', '/profile/owner-0/followers', None),
+        ('GET', '/profile/reader/following', None),
+        ('GET', '/notifications/reader', None),
+        ('GET', '/likes/sh-0-0/comments', None),
+        ('GET', '/likes/sh-0-0/status?user_id=reader', None),
+        ('POST', '/likes/sh-0-0', {'user_id': 'reader'}),
+        ('POST', '/feed/follow/owner-0', {'follower_id': 'reader'}),
+        ('POST', '/notifications/reader/read-all', None),
+    ],
+)
+def test_hot_queries_use_indexes(client, captured, method, path, json):
+    with Session(get_engine()) as session:
+        seed_social_graph(session)
+    captured.clear()
+
+    response = client.request(method, path, json=json)
+    assert response.status_code < 400
+
+    scans = {}
+    for statement, parameters in captured:
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb not in {'SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'}:
+            continue
+        for table in explain(statement, parameters)[1]:
+            if (method, path, table) not in KNOWN_SCANS:
+                scans[table] = ' '.join(statement.split())
+    assert scans == {}
+
+
+def compiled(query) -> tuple[str, tuple]:
+    statement = query.compile(get_engine())
+    return str(statement), tuple(statement.params[name] for name in statement.positiontup)
+
+
+@pytest.mark.parametrize(
+    ('query', 'index'),
+    [
+        (
+            select(Share).where(Share.owner_id == 'u').order_by(Share.created_at.desc()).limit(20),
+            'ix_share_owner_created',
+        ),
+        (select(Share).order_by(Share.created_at.desc()).limit(20), 'ix_share_created'),
+        (
+            select(Comment).where(Comment.share_id == 's').order_by(Comment.created_at.desc()),
+            'ix_comment_share_created',
+        ),
+        (
+            select(FeedEntry).where(FeedEntry.user_id == 'u', FeedEntry.owner_id == 'o'),
+            'ix_feedentry_user_owner',
+        ),
+        (select(Like).where(Like.share_id == 's', Like.user_id == 'u'), 'ux_like_share_user'),
+        (
+            select(CommentLike).where(CommentLike.comment_id == 'c', CommentLike.user_id == 'u'),
+            'ux_commentlike_comment_user',
+        ),
+        (
+            select(Follower).where(Follower.follower_id == 'a', Follower.followed_id == 'b'),
+            'ux_follower_pair',
+        ),
+        (
+            select(Notification)
+            .where(Notification.user_id == 'u', Notification.read == False)  # noqa: E712
+            .order_by(Notification.created_at.desc()),
+            'ix_notification_user_read_created',
+        ),
+        (
+            select(WorkoutExercise)
+            .where(WorkoutExercise.workout_id == 'w')
+            .order_by(WorkoutExercise.order_index),
+            'ix_workoutexercise_workout_order',
+        ),
+        (
+            select(Set).where(Set.workout_exercise_id == 'we').order_by(Set.order),
+            'ix_set_exercise_order',
+        ),
+    ],
+)
+def test_composite_indexes_serve_their_query(query, index):
+    plan, scans = explain(*compiled(query))
+
+    assert scans == []
+    assert any(f'INDEX {index} ' in f'{line} ' for line in plan), plan
+    # L'ordre est fourni par l'index : pas de tri temporaire
+    assert not any('USE TEMP B-TREE' in line for line in plan), plan
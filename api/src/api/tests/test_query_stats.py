@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Comment, Follower, Notification, Share, User
+from api.query_stats import fingerprint, track_queries
+from api.services.counters import recompute_user_stats
+from api.services.leaderboard import rebuild_leaderboards
+from api.services.timeline import fan_out_share
+from api.services.trending import rebuild_trending
+
+
+def seed_social_graph(session: Session) -> None:
+    """Un lecteur qui suit 3 comptes, 3 partages chacun, 3 commentaires par partage."""
+    now = datetime.now()
+    session.add(User(id='reader', username='reader', email='reader@test.local', password_hash='x'))
+    for i in range(3):
+        owner_id = f'owner-{i}'
+        session.add(
+            User(id=owner_id, username=owner_id, email=f'{owner_id}@test.local', password_hash='x')
+        )
+        session.add(Follower(follower_id='reader', followed_id=owner_id))
+        session.add(Notification(
+            user_id='reader', type='follow', actor_id=owner_id, actor_username=owner_id, message='',
+        ))
+        for j in range(3):
+            share = Share(
+                share_id=f'sh-{i}-{j}',
+                owner_id=owner_id,
+                owner_username=owner_id,
+                workout_title=f'Séance {j}',
+                created_at=now - timedelta(minutes=10 * i + j),
+            )
+            session.add(share)
+            session.flush()
+            fan_out_share(session, share)
+            session.add_all(
+                Comment(share_id=share.share_id, user_id='reader', username='reader', content='!')
+                for _ in range(3)
+            )
+    rebuild_leaderboards(session)
+    rebuild_trending(session)
+    recompute_user_stats(session)
+    session.commit()
+
+
+def test_fingerprint_collapses_parameters():
+    assert fingerprint('SELECT * FROM share WHERE id IN (?, ?, ?)\n  LIMIT 21') == (
+        'SELECT * FROM share WHERE id IN (?) LIMIT ?'
+    )
+    assert fingerprint('SELECT * FROM share WHERE id = %(id_1)s') == fingerprint(
+        'SELECT * FROM share WHERE id = $1'
+    )
+
+
+def test_repeated_statements_are_flagged():
+    with track_queries() as outer:
+        with Session(get_engine()) as session, track_queries() as stats:
+            for user_id in range(6):
+                session.execute(text('SELECT id FROM user WHERE id = :id'), {'id': str(user_id)})
+            session.execute(text('SELECT count(*) FROM share'))
+
+    assert stats.count == 7
+    assert stats.duration > 0
+    assert stats.repeated() == {'SELECT id FROM user WHERE id = ?': 6}
+    assert outer.count == stats.count
+
+
+def test_failed_statements_leave_no_timing_behind():
+    with get_engine().connect() as connection, track_queries() as stats:
+        connection.exec_driver_sql('SELECT 1')
+        before = repr(connection.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.exec_driver_sql('SELECT * FROM missing_table')
+        connection.exec_driver_sql('SELECT 1')
+        after = repr(connection.info)
+
+    # Pas de `after_cursor_execute` pour une requête en échec : rien ne reste sur la connexion
+    assert after == before
+    assert stats.count == 2
+
+
+def test_db_headers_only_in_dev(client, monkeypatch):
+    assert 'X-DB-Queries' not in client.get('/health/db').headers
+
+    monkeypatch.setenv('DB_QUERY_STATS', 'on')
+    response = client.get('/notifications/someone')
+    assert response.headers['X-DB-Queries'] == '1'
+    assert float(response.headers['X-DB-Time']) >= 0
+
+
+@pytest.mark.parametrize(
+    ('path', 'max_queries'),
+    [
+        ('/feed?user_id=reader', 3),
+        ('/explore', 4),
+        ('/explore/search?q=owner', 4),
+        ('/leaderboard/sessions?period=all&current_user_id=reader', 3),
+        ('/profile/owner-0?current_user_id=reader', 1),
+        ('/profile/owner-0/posts', 2),
+        ('/notifications/reader', 1),
+    ],
+)
+def test_read_endpoints_stay_within_query_budget(client, query_budget, path, max_queries):
+    with Session(get_engine()) as session:
+        seed_social_graph(session)
+
+    with query_budget(max_queries):
+        response = client.get(path)
+    assert response.status_code == 200
@@ -0,0 +1,84 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Share, User
+
+
+def add_users(*users: tuple[str, str, str]) -> None:
+    with Session(get_engine()) as session:
+        for user_id, username, bio in users:
+            session.add(User(id=user_id, username=username, bio=bio,
+                             email=f'{user_id}@test.local', password_hash='x'))
+        session.commit()
+
+
+def usernames(response) -> list[str]:
+    return [user['username'] for user in response.json()['users']]
+
+
+def test_search_ignores_accents_and_matches_prefixes(client):
+    add_users(('u1', 'Élodie', 'Coach de course'), ('u2', 'marc', 'Élève en STAPS'))
+
+    assert usernames(client.get('/explore/search?q=elod')) == ['Élodie']
+    assert usernames(client.get('/explore/search?q=ELEVE')) == ['marc']
+    assert usernames(client.get('/explore/search?q=%C3%A9l')) == ['Élodie', 'marc']
+    assert usernames(client.get('/explore/search?q=%25%25')) == []
+
+
+def test_username_matches_rank_above_bio_matches(client):
+    add_users(('u1', 'alex', 'fan de squat'), ('u2', 'squat_queen', None))
+
+    assert usernames(client.get('/explore/search?q=squat')) == ['squat_queen', 'alex']
+
+
+def test_search_pages_with_a_keyset_cursor(client):
+    add_users(*((f'u{i}', f'runner{i}', None) for i in range(7)))
+
+    seen = []
+    cursor = None
+    while True:
+        suffix = f'&cursor={cursor}' if cursor else ''
+        page = client.get(f'/explore/search?q=runner&scope=users&limit=3{suffix}').json()
+        assert page['posts'] == []
+        seen += [user['username'] for user in page['users']]
+        cursor = page['users_next_cursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == [f'runner{i}' for i in range(7)]
+    assert len(seen) == 7
+
+    response = client.get(f'/explore/search?q=runner&limit=3&cursor={cursor or "x"}')
+    assert response.json()['detail'] == 'cursor_requires_scope'
+
+
+def test_index_follows_updates_and_deletes(client):
+    add_users(('u1', 'lea', None))
+    with Session(get_engine()) as session:
+        session.add(Share(share_id='sh1', owner_id='u1', owner_username='lea',
+                          workout_title='Jambes lourdes'))
+        session.commit()
+    assert [post['share_id'] for post in client.get('/explore/search?q=jambe').json()['posts']] == [
+        'sh1'
+    ]
+
+    with Session(get_engine()) as session:
+        share = session.get(Share, 'sh1')
+        share.workout_title = 'Dos'
+        session.add(share)
+        session.delete(session.get(User, 'u1'))
+        session.commit()
+    result = client.get('/explore/search?q=jambe').json()
+    assert result['posts'] == []
+    assert client.get('/explore/search?q=dos').json()['posts'][0]['share_id'] == 'sh1'
+    assert usernames(client.get('/explore/search?q=lea')) == []
+
+
+def test_index_survives_rowid_renumbering(client):
+    add_users(('u1', 'lea', None), ('u2', 'marc', None))
+    with get_engine().begin() as connection:
+        # Ce qu'un VACUUM peut faire aux rowids d'une table à clé primaire texte
+        connection.exec_driver_sql('UPDATE "user" SET rowid = rowid + 1000')
+    add_users(('u3', 'leon', None))
+
+    assert usernames(client.get('/explore/search?q=le')) == ['lea', 'leon']
+    assert usernames(client.get('/explore/search?q=marc')) == ['marc']
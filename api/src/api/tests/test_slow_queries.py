@@ -0,0 +1,58 @@
+import json
+from sqlmodel import Session
+
+from api.db import get_engine, reset_engine
+from api.models import User
+from api.slow_queries import parameters_shape
+
+
+def enable_slow_query_log(monkeypatch, tmp_path, threshold_ms: str):
+    log_path = tmp_path / 'slow.jsonl'
+    monkeypatch.setenv('SLOW_QUERY_LOG', str(log_path))
+    monkeypatch.setenv('SLOW_QUERY_MS', threshold_ms)
+    reset_engine()
+    return log_path
+
+
+def read_entries(log_path):
+    return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+
+def test_slow_queries_are_logged_with_route_and_plan(client, monkeypatch, tmp_path):
+    log_path = enable_slow_query_log(monkeypatch, tmp_path, '0')
+    # Les deux appels doivent atteindre la base
+    monkeypatch.setenv('READ_CACHE', 'off')
+    with Session(get_engine()) as session:
+        session.add(User(id='u1', username='u1', email='u1@test.local', password_hash='x'))
+        session.commit()
+
+    client.get('/explore/suggested-users')
+    client.get('/explore/suggested-users')
+
+    entries = [
+        entry for entry in read_entries(log_path)
+        if entry['route'] == 'GET /explore/suggested-users'
+        and entry['sql'].startswith('SELECT user.')
+    ]
+    assert len(entries) == 2
+    entry = entries[0]
+    assert entry['parameters'] == ['int', 'int']
+    assert entry['duration_ms'] >= 0
+    # `SELECT … FROM user LIMIT ?` sans filtre : parcours complet signalé
+    assert entry['full_scans'] == ['user']
+    assert 'SCAN user' in entry['plan']
+    assert entries[1]['plan'] == entry['plan']
+
+
+def test_fast_queries_are_not_logged(client, monkeypatch, tmp_path):
+    log_path = enable_slow_query_log(monkeypatch, tmp_path, '60000')
+
+    client.get('/explore/suggested-users')
+
+    assert read_entries(log_path) == []
+
+
+def test_parameters_shape_hides_values():
+    assert parameters_shape(('secret', 3), False) == ['str', 'int']
+    assert parameters_shape({'email': 'a@b.c'}, False) == {'email': 'str'}
+    assert parameters_shape([('a',), ('b',)], True) == {'rows': 2, 'row': ['str']}
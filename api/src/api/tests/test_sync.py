@@ -1,9 +1,10 @@
+import uuid
 from datetime import datetime, timezone
 
 from sqlmodel import Session, select
 
 from api.db import get_engine
-from api.models import SyncEvent, Workout
+from api.models import DailyVolume, Set, SyncEvent, User, Workout, WorkoutExercise
 
 
 def test_push_creates_workout(client):
@@ -93,3 +94,63 @@ def test_pull_returns_workout_events(client):
     assert response.status_code == 200
     body = response.json()
     assert any(event["action"] == "workout-upsert" for event in body["events"])
+
+
+def push(client, action: str, payload: dict) -> None:
+    now = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+    response = client.post(
+        "/sync/push",
+        json={"mutations": [{"queue_id": 1, "action": action, "payload": payload, "created_at": now}]},
+    )
+    assert response.status_code == 200
+
+
+def test_completing_workout_rolls_up_daily_volume(client):
+    with Session(get_engine()) as session:
+        user = User(id=str(uuid.uuid4()), username='lifter', email='lifter@test.local', password_hash='x')
+        workout = Workout(user_id=user.id, title='Legs', status='draft')
+        session.add_all([user, workout])
+        session.flush()
+        exercise = WorkoutExercise(workout_id=workout.id, exercise_id='squat')
+        session.add(exercise)
+        session.flush()
+        session.add_all([
+            Set(workout_exercise_id=exercise.id, reps=5, weight=100.0),
+            Set(workout_exercise_id=exercise.id, reps=8, weight=82.5),
+            Set(workout_exercise_id=exercise.id, reps=None, weight=60.0),
+        ])
+        session.commit()
+        user_id, workout_id = user.id, workout.id
+
+    push(client, "complete-workout", {"server_id": workout_id})
+
+    with Session(get_engine()) as session:
+        (row,) = session.exec(select(DailyVolume)).all()
+        assert (row.user_id, row.volume, row.sessions, row.best_lift) == (user_id, 1160.0, 1, 100.0)
+
+    board = client.get("/leaderboard/volume").json()
+    assert [(entry['user_id'], entry['score']) for entry in board['entries']] == [(user_id, 1160)]
+    stats = client.get(f"/users/{user_id}/stats").json()
+    assert (stats['total_volume'], stats['volume_this_week'], stats['total_sessions']) == (1160.0, 1160.0, 1)
+
+    push(client, "delete-workout", {"server_id": workout_id})
+
+    with Session(get_engine()) as session:
+        assert session.exec(select(DailyVolume)).all() == []
+    assert client.get("/leaderboard/volume").json()['entries'] == []
+
+
+def test_workout_created_completed_is_rolled_up(client):
+    created_at = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+    push(client, "create-workout", {
+        "client_id": "cid-done",
+        "user_id": "lifter-1",
+        "title": "Déjà terminée",
+        "status": "completed",
+        "created_at": created_at,
+        "updated_at": created_at,
+    })
+
+    with Session(get_engine()) as session:
+        (row,) = session.exec(select(DailyVolume)).all()
+        assert (row.user_id, row.sessions, row.volume) == ("lifter-1", 1, 0.0)
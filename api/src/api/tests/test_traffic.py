@@ -0,0 +1,41 @@
+import json
+
+from api.traffic import body_shape, sanitize
+
+
+def read_traces(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_body_shape_keeps_structure_not_values():
+    assert body_shape({'user_id': 'u1', 'sets': [{'reps': 8, 'weight': 42.5}], 'note': None}) == {
+        'user_id': 'str', 'sets': [{'reps': 'int', 'weight': 'float'}], 'note': 'null',
+    }
+    assert sanitize({'user_id': 'u1', 'refresh_token': 'abc', 'Email': 'a@b.c'}) == {
+        'user_id': 'u1', 'refresh_token': '***', 'Email': '***',
+    }
+
+
+def test_recorder_is_off_by_default(client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client.get('/health/db')
+    assert list(tmp_path.glob('*.jsonl')) == []
+
+
+def test_requests_are_recorded_with_route_template(client, tmp_path, monkeypatch):
+    log = tmp_path / 'traffic.jsonl'
+    monkeypatch.setenv('TRAFFIC_LOG', str(log))
+
+    client.get('/profile/unknown-1?current_user_id=reader')
+    client.post('/auth/login', json={'username': 'someone', 'password': 'hunter2'})
+
+    profile, login = read_traces(log)
+    assert profile['method'] == 'GET'
+    assert profile['route'] == '/profile/{user_id}'
+    assert profile['path_params'] == {'user_id': 'unknown-1'}
+    assert profile['query'] == {'current_user_id': 'reader'}
+    assert profile['status'] == 404
+    assert profile['duration_ms'] >= 0
+    assert login['route'] == '/auth/login'
+    assert login['body'] == {'username': 'str', 'password': 'str'}
+    assert 'hunter2' not in log.read_text()
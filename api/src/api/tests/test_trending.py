@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from api.db import get_engine
+from api.models import Share, TrendingScore, User
+from api.services.trending import DECAY_SECONDS, WINDOW, hot_score, rebuild_trending
+
+
+def add_shares(*shares: tuple[str, timedelta, int, int]) -> None:
+    """Partages `(id, âge, likes, commentaires)` d'un même auteur, puis reconstruction."""
+    now = datetime.utcnow()
+    with Session(get_engine()) as session:
+        session.add(User(id='owner', username='owner', email='owner@test.local', password_hash='x'))
+        for share_id, age, likes, comments in shares:
+            session.add(Share(share_id=share_id, owner_id='owner', owner_username='owner',
+                              workout_title=share_id, like_count=likes, comment_count=comments,
+                              created_at=now - age))
+        session.flush()
+        rebuild_trending(session)
+        session.commit()
+
+
+def trending(client) -> list[str]:
+    return [post['share_id'] for post in client.get('/explore/trending').json()]
+
+
+def test_hot_score_trades_engagement_for_freshness():
+    now = datetime(2026, 10, 17, 12)
+    # Dix fois plus d'interactions compensent `DECAY_SECONDS` d'ancienneté
+    older = now - timedelta(seconds=DECAY_SECONDS)
+    assert abs(hot_score(99, 0, older) - hot_score(9, 0, now)) < 1e-9
+    assert hot_score(0, 1, now) == hot_score(2, 0, now)
+    assert hot_score(5, 0, now) > hot_score(5, 0, now - timedelta(hours=1))
+
+
+def test_trending_ranks_the_whole_window_by_decayed_score(client):
+    add_shares(
+        ('fresh', timedelta(hours=1), 1, 0),
+        ('popular', timedelta(hours=12), 200, 20),
+        ('old_popular', timedelta(days=5), 40, 0),
+        ('stale', WINDOW + timedelta(hours=1), 1000, 0),
+    )
+    assert trending(client) == ['popular', 'fresh', 'old_popular']
+    with Session(get_engine()) as session:
+        assert 'stale' not in session.exec(select(TrendingScore.share_id)).all()
+
+
+def test_likes_and_comments_rescore_the_touched_share(client):
+    add_shares(('a', timedelta(hours=2), 0, 0), ('b', timedelta(hours=1), 0, 0))
+    client.post('/users/profile', json={'id': 'fan', 'username': 'fan',
+                                        'consent_to_public_share': True})
+    assert trending(client) == ['b', 'a']
+
+    assert client.post('/likes/a', json={'user_id': 'fan'}).json()['liked'] is True
+    assert trending(client) == ['a', 'b']
+
+    for _ in range(2):
+        response = client.post('/likes/b/comments', json={'user_id': 'fan', 'content': 'Bravo'})
+        assert response.status_code < 400
+    assert trending(client) == ['b', 'a']
@@ -0,0 +1,74 @@
+from sqlmodel import Session
+
+from api.db import get_engine
+from api.models import Like, Share, User, UserStats
+from api.services.counters import recompute_user_stats
+
+
+def add_users(*user_ids: str) -> None:
+    with Session(get_engine()) as session:
+        for user_id in user_ids:
+            session.add(User(id=user_id, username=user_id, email=f'{user_id}@test.local',
+                             password_hash='x'))
+        session.commit()
+
+
+def stats(client, user_id: str) -> tuple[int, int, int, int]:
+    profile = client.get(f'/profile/{user_id}').json()
+    return (profile['posts_count'], profile['followers_count'], profile['following_count'],
+            profile['total_likes'])
+
+
+def test_counters_follow_follow_and_like_writes(client):
+    add_users('alice', 'bob')
+    with Session(get_engine()) as session:
+        session.add(Share(share_id='sh_a', owner_id='alice', owner_username='alice',
+                          workout_title='Legs'))
+        session.commit()
+    assert stats(client, 'alice') == (0, 0, 0, 0)  # partage inséré hors des routes
+
+    assert client.post('/profile/alice/follow?follower_id=bob').status_code == 204
+    assert client.post('/likes/sh_a', json={'user_id': 'bob'}).json()['liked'] is True
+    assert stats(client, 'bob') == (0, 0, 1, 0)
+    profile = client.get('/profile/alice?current_user_id=bob').json()
+    assert profile['followers_count'] == 1
+    assert profile['total_likes'] == 1
+    assert profile['is_following'] is True
+
+    assert client.request('DELETE', '/feed/follow/alice',
+                          json={'follower_id': 'bob'}).status_code == 204
+    assert client.post('/likes/sh_a', json={'user_id': 'bob'}).json()['liked'] is False
+    assert stats(client, 'alice') == (0, 0, 0, 0)
+    assert client.get('/profile/alice?current_user_id=bob').json()['is_following'] is False
+
+
+def test_recompute_rebuilds_counters_from_source_tables(client):
+    add_users('alice', 'bob', 'carol')
+    with Session(get_engine()) as session:
+        for index in range(3):
+            session.add(Share(share_id=f'sh_{index}', owner_id='alice', owner_username='alice',
+                              workout_title='Séance'))
+        session.add(Like(share_id='sh_0', user_id='bob'))
+        session.add(Like(share_id='sh_2', user_id='carol'))
+        session.add(UserStats(user_id='alice', posts_count=99))  # compteur faux
+        session.commit()
+        assert recompute_user_stats(session) == 3
+        session.commit()
+
+    assert stats(client, 'alice') == (3, 0, 0, 2)
+    assert stats(client, 'carol') == (0, 0, 0, 0)
+
+
+def test_user_posts_total_comes_from_the_counter(client):
+    add_users('alice', 'bob')
+    with Session(get_engine()) as session:
+        for index in range(2):
+            session.add(Share(share_id=f'sh_{index}', owner_id='alice', owner_username='alice',
+                              workout_title='Séance'))
+        session.add(UserStats(user_id='alice', posts_count=2))
+        session.commit()
+
+    page = client.get('/profile/alice/posts?limit=1').json()
+    assert (len(page['posts']), page['total']) == (1, 2)
+    assert client.get('/profile/bob/posts').json()['total'] == 0  # pas encore de ligne
+    assert client.get('/profile/nobody/posts').status_code == 404
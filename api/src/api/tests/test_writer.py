@@ -0,0 +1,161 @@
+import contextvars
+import threading
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from api.db import get_engine, get_write_engine
+from api.models import User
+from api.writer import WriteQueue, run_write
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default='-')
+
+
+def add_user(name: str):
+    def write(session: Session) -> str:
+        user = User(id=str(uuid.uuid4()), username=name, email=f'{name}@test.local', password_hash='x')
+        session.add(user)
+        return user.id
+
+    return write
+
+
+def usernames() -> set[str]:
+    with Session(get_engine()) as session:
+        return set(session.exec(select(User.username)).all())
+
+
+def test_queued_units_share_one_transaction():
+    writer = WriteQueue(get_write_engine())
+    started = threading.Event()
+    gate = threading.Event()
+    sessions: list[int] = []
+
+    def blocking(session: Session) -> None:
+        started.set()
+        gate.wait(timeout=10)
+
+    def tracked(name: str):
+        def write(session: Session) -> None:
+            sessions.append(id(session))
+            add_user(name)(session)
+
+        return write
+
+    first = threading.Thread(target=writer.submit, args=(blocking,))
+    first.start()
+    # Le writer est occupé par `blocking` avant que les autres unités n'arrivent
+    assert started.wait(timeout=10)
+    waiting = [threading.Thread(target=writer.submit, args=(tracked(f'user{i}'),)) for i in range(5)]
+    for thread in waiting:
+        thread.start()
+    deadline = time.monotonic() + 10
+    while writer._queue.qsize() < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for thread in [first, *waiting]:
+        thread.join()
+    writer.stop()
+
+    assert len(set(sessions)) == 1
+    assert {f'user{i}' for i in range(5)} <= usernames()
+
+
+def test_failing_unit_is_rolled_back_alone():
+    writer = WriteQueue(get_write_engine())
+
+    def failing(session: Session) -> None:
+        add_user('ghost')(session)
+        session.flush()
+        raise HTTPException(status_code=404, detail='user_not_found')
+
+    results: dict[str, object] = {}
+
+    def submit(name, unit):
+        try:
+            results[name] = writer.submit(unit)
+        except HTTPException as exc:
+            results[name] = exc.detail
+
+    threads = [
+        threading.Thread(target=submit, args=('ok', add_user('kept'))),
+        threading.Thread(target=submit, args=('ko', failing)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.stop()
+
+    assert results['ko'] == 'user_not_found'
+    assert 'kept' in usernames()
+    assert 'ghost' not in usernames()
+
+
+@pytest.mark.parametrize('queue_mode', ['on', 'off'])
+def test_run_write_returns_result_and_keeps_context(monkeypatch, queue_mode):
+    monkeypatch.setenv('WRITE_QUEUE', queue_mode)
+    token = request_id.set('req-42')
+    try:
+        seen = run_write(lambda session: request_id.get())
+        user_id = run_write(add_user('alice'))
+    finally:
+        request_id.reset(token)
+
+    assert seen == 'req-42'
+    with Session(get_engine()) as session:
+        assert session.get(User, user_id).username == 'alice'
+
+
+class Abort(BaseException):
+    """Interruption qui n'hérite pas d'`Exception` (KeyboardInterrupt, SystemExit…)."""
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_interrupted_batch_fails_every_waiting_unit():
+    writer = WriteQueue(get_write_engine())
+    started = threading.Event()
+    gate = threading.Event()
+
+    def blocking(session: Session) -> None:
+        started.set()
+        gate.wait(timeout=10)
+
+    def aborting(session: Session) -> None:
+        raise Abort()
+
+    results: dict[str, object] = {}
+
+    def submit(name, unit):
+        try:
+            results[name] = writer.submit(unit)
+        except Abort as exc:
+            results[name] = exc
+
+    first = threading.Thread(target=writer.submit, args=(blocking,))
+    first.start()
+    assert started.wait(timeout=10)
+    # `lost` et `aborting` partent dans le même lot, derrière `blocking`
+    waiting = [
+        threading.Thread(target=submit, args=('lost', add_user('lost'))),
+        threading.Thread(target=submit, args=('abort', aborting)),
+    ]
+    for queued, thread in enumerate(waiting, start=1):
+        thread.start()
+        deadline = time.monotonic() + 10
+        while writer._queue.qsize() < queued and time.monotonic() < deadline:
+            time.sleep(0.01)
+    gate.set()
+    first.join()
+    for thread in waiting:
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+    assert isinstance(results['lost'], Abort)
+    assert isinstance(results['abort'], Abort)
+    assert 'lost' not in usernames()
+    writer._thread.join(timeout=10)
+    assert not writer.alive
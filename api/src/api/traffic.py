@@ -0,0 +1,123 @@
+"""Enregistrement du trafic HTTP réel (JSONL), activé à la demande.
+
+`TRAFFIC_LOG=chemin.jsonl` active l'enregistrement : une ligne par requête
+avec méthode, gabarit de route, paramètres de chemin et de requête, forme du
+corps JSON (types, jamais les valeurs), statut, taille et durée. Les
+paramètres sensibles (mots de passe, jetons, e-mails…) sont masqués. Le
+fichier tourne à `TRAFFIC_LOG_MAX_BYTES` (50 Mo). Les traces se rejouent avec
+`python -m benchmarks.replay`.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .utils.jsonl import attach_jsonl_file
+
+logger = logging.getLogger(__name__)
+
+MASK = "***"
+_SENSITIVE = re.compile(r"pass|token|secret|authorization|email|code", re.IGNORECASE)
+# Au-delà, le corps n'est pas analysé (imports en masse…)
+_MAX_BODY = 64 * 1024
+
+
+def _log_path() -> Optional[str]:
+    return os.getenv("TRAFFIC_LOG") or None
+
+
+def sanitize(params: dict[str, Any]) -> dict[str, Any]:
+    """Paramètres avec les valeurs sensibles masquées."""
+    return {key: MASK if _SENSITIVE.search(key) else value for key, value in params.items()}
+
+
+def body_shape(value: Any) -> Any:
+    """Structure d'un document JSON, feuilles remplacées par leur type."""
+    if isinstance(value, dict):
+        return {key: body_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [body_shape(value[0])] if value else []
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+def _parse_body(chunks: list[bytes], content_type: str) -> Any:
+    if not chunks or "json" not in content_type:
+        return None
+    body = b"".join(chunks)
+    if len(body) > _MAX_BODY:
+        return "too_large"
+    try:
+        return body_shape(json.loads(body))
+    except ValueError:
+        return "invalid_json"
+
+
+class TrafficRecorderMiddleware:
+    """Middleware ASGI écrivant une trace par requête si `TRAFFIC_LOG` est défini."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = _log_path()
+        if scope["type"] != "http" or path is None:
+            await self.app(scope, receive, send)
+            return
+        chunks: list[bytes] = []
+        received = 0
+        status = 500
+        size = 0
+
+        async def receive_and_keep() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request" and received <= _MAX_BODY:
+                body = message.get("body", b"")
+                received += len(body)
+                chunks.append(body)
+            return message
+
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_measure)
+        finally:
+            duration = time.perf_counter() - start
+            route = scope.get("route")
+            headers = dict(scope.get("headers") or ())
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            entry = {
+                "at": at.isoformat(),
+                "method": scope["method"],
+                # Gabarit (`/profile/{user_id}`) ; chemin brut si aucune route ne correspond
+                "route": getattr(route, "path", None),
+                "path": None if route is not None else scope["path"],
+                "path_params": sanitize(scope.get("path_params") or {}),
+                "query": sanitize(query),
+                "body": _parse_body(chunks, headers.get(b"content-type", b"").decode("latin-1")),
+                "status": status,
+                "bytes": size,
+                "duration_ms": round(duration * 1000, 3),
+            }
+            attach_jsonl_file(
+                logger, path, int(os.getenv("TRAFFIC_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+            )
+            logger.info(json.dumps(entry, ensure_ascii=False, default=str))
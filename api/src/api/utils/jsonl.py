@@ -0,0 +1,20 @@
+"""Journaux JSONL avec rotation (requêtes lentes, trafic enregistré)."""
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+
+
+def attach_jsonl_file(logger: logging.Logger, path: str, max_bytes: int, backups: int = 5) -> None:
+    """Dirige `logger` vers `path`, une ligne par message ; sans effet si c'est déjà le cas."""
+    path = os.path.abspath(path)
+    for handler in list(logger.handlers):
+        if getattr(handler, "baseFilename", None) == path:
+            return
+        # Nouveau chemin (tests, rechargement) : on ferme l'ancien fichier
+        logger.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -0,0 +1,78 @@
+"""Pagination keyset avec curseur opaque `(created_at, id)`.
+
+Le curseur encode la clé du dernier élément renvoyé ; la page suivante reprend
+strictement après cette clé. Les éléments créés dans la même seconde ne sont
+donc ni répétés ni sautés, et une page profonde coûte autant que la première
+(parcours d'un index composite `(..., created_at, id)`). Les classements par
+score (recherche plein texte) utilisent de même un curseur `(rang, rowid)`.
+"""
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+def _encode(values: list[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> Any:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    return json.loads(raw)
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    return _encode([created_at.isoformat(), item_id])
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_cursor")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, item_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), str(item_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise _invalid_cursor() from None
+
+
+def encode_rank_cursor(rank: float, rowid: int) -> str:
+    """Curseur d'un classement par score (`rank ASC, rowid ASC`), ex. BM25."""
+    return _encode([rank, rowid])
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, rowid = _decode(cursor)
+        return float(rank), int(rowid)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise _invalid_cursor() from None
+
+
+def keyset_before(created_column: Any, id_column: Any, cursor: str) -> Any:
+    """Condition `(created_at, id) < curseur` pour un tri `created_at DESC, id DESC`."""
+    created_at, item_id = decode_cursor(cursor)
+    return or_(
+        created_column < created_at,
+        and_(created_column == created_at, id_column < item_id),
+    )
+
+
+def paginate[T](
+    rows: Sequence[T],
+    limit: int,
+    key: Callable[[T], tuple[datetime, str]],
+) -> tuple[list[T], Optional[str]]:
+    """Découpe un résultat `limit + 1` en page et curseur suivant."""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    if not page:
+        return page, None
+    return page, encode_cursor(*key(page[-1]))
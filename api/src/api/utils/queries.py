@@ -0,0 +1,80 @@
+"""Requêtes SQL réutilisables."""
+import sqlite3
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+# ROW_NUMBER() OVER (...) n'existe qu'à partir de SQLite 3.25
+_SQLITE_WINDOW_FUNCTIONS = (3, 25, 0)
+
+
+def supports_window_functions(session: Session) -> bool:
+    if session.get_bind().dialect.name != "sqlite":
+        return True
+    return sqlite3.sqlite_version_info >= _SQLITE_WINDOW_FUNCTIONS
+
+
+def _ranks_before(other: Any, model: Any, columns: Sequence[Any]) -> Any:
+    """`other` précède `model` dans un tri DESC sur `columns` (ordre lexicographique)."""
+    first, rest = columns[0], columns[1:]
+    ahead = getattr(other, first.key) > getattr(model, first.key)
+    if not rest:
+        return ahead
+    return or_(
+        ahead,
+        and_(getattr(other, first.key) == getattr(model, first.key), _ranks_before(other, model, rest)),
+    )
+
+
+def latest_per_group(
+    session: Session,
+    model: Any,
+    group_column: Any,
+    order_columns: Sequence[Any],
+    group_ids: Iterable[Any],
+    n: int,
+) -> Any:
+    """Au plus `n` lignes par groupe, les plus récentes selon `order_columns` (DESC).
+
+    Utilise `ROW_NUMBER() OVER (PARTITION BY ...)` quand le moteur le permet,
+    sinon une sous-requête corrélée qui compte les lignes mieux classées.
+    Les lignes sont triées par groupe puis du plus récent au plus ancien.
+    """
+    group_ids = list(group_ids)
+    if supports_window_functions(session):
+        row_number = func.row_number().over(
+            partition_by=group_column,
+            order_by=[column.desc() for column in order_columns],
+        )
+        ranked = (
+            select(model, row_number.label("row_number"))
+            .where(group_column.in_(group_ids))
+            .subquery()
+        )
+        entity = aliased(model, ranked)
+        return (
+            select(entity)
+            .where(ranked.c.row_number <= n)
+            .order_by(
+                ranked.c[group_column.key],
+                *[ranked.c[column.key].desc() for column in order_columns],
+            )
+        )
+
+    other = aliased(model)
+    ahead = (
+        select(func.count())
+        .select_from(other)
+        .where(getattr(other, group_column.key) == group_column)
+        .where(_ranks_before(other, model, order_columns))
+        .scalar_subquery()
+    )
+    return (
+        select(model)
+        .where(group_column.in_(group_ids))
+        .where(ahead < n)
+        .order_by(group_column, *[column.desc() for column in order_columns])
+    )
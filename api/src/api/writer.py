@@ -0,0 +1,160 @@
+"""File d'écriture unique avec commit groupé.
+
+SQLite n'accepte qu'un écrivain à la fois : plutôt que de laisser chaque
+requête ouvrir sa transaction et se battre pour le verrou, les endpoints
+soumettent une *unité d'écriture* (une fonction qui reçoit une `Session`) et
+attendent son résultat. Un thread dédié possède la connexion d'écriture,
+regroupe les unités en attente dans une même transaction — un SAVEPOINT par
+unité, un seul COMMIT pour le lot — puis rend à chaque appelant son résultat
+ou son exception.
+
+Une unité ne commit pas elle-même et renvoie des données simples (réponse
+Pydantic, dict…), pas des objets ORM : la session est partagée par le lot.
+`WRITE_QUEUE=off` exécute les unités directement dans la requête appelante.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .db import get_engine, get_write_engine
+
+_Job = tuple[Callable[[Session], Any], contextvars.Context, Future]
+
+_WRITER: Optional[WriteQueue] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def _queue_enabled() -> bool:
+    return os.getenv("WRITE_QUEUE", "on").strip().lower() not in {"0", "off", "false", "no"}
+
+
+def _max_batch() -> int:
+    return max(1, int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64")))
+
+
+class WriteQueue:
+    """Thread écrivain : dépile les unités et les commit par lots."""
+
+    def __init__(self, engine: Engine, max_batch: int = 64) -> None:
+        self._engine = engine
+        self._max_batch = max_batch
+        self._queue: queue.SimpleQueue[Optional[_Job]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit[T](self, unit: Callable[[Session], T]) -> T:
+        """Met l'unité en file et bloque jusqu'au commit de son lot."""
+        future: Future = Future()
+        # Les contextvars de la requête (compteurs, traces…) suivent l'unité
+        self._queue.put((unit, contextvars.copy_context(), future))
+        return future.result()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        except BaseException as exc:
+            # Thread interrompu : les unités encore en file ne doivent pas attendre pour rien
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[2].set_exception(exc)
+            raise
+
+    def _drain(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            stopping = False
+            # Tout ce qui est arrivé pendant le lot précédent part dans celui-ci
+            while len(batch) < self._max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch: list[_Job]) -> None:
+        outcomes: list[tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            with Session(self._engine, expire_on_commit=False) as session:
+                for unit, context, future in batch:
+                    # Les mises à jour en SQL direct d'une unité doivent être vues par la suivante
+                    session.expire_all()
+                    try:
+                        with session.begin_nested():
+                            result = context.run(unit, session)
+                    except Exception as exc:  # l'unité seule est annulée (ROLLBACK TO SAVEPOINT)
+                        outcomes.append((future, None, exc))
+                    else:
+                        outcomes.append((future, result, None))
+                session.commit()
+        except BaseException as exc:
+            # COMMIT en échec ou thread interrompu (KeyboardInterrupt, SystemExit…) au milieu
+            # du lot : aucun appelant ne reste bloqué sur son future
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _run_inline[T](unit: Callable[[Session], T]) -> T:
+    with Session(get_engine()) as session:
+        result = unit(session)
+        session.commit()
+        return result
+
+
+def run_write[T](unit: Callable[[Session], T]) -> T:
+    """Exécute une unité d'écriture via le writer et renvoie son résultat (ou lève son erreur)."""
+    global _WRITER
+    if not _queue_enabled():
+        return _run_inline(unit)
+    with _WRITER_LOCK:
+        if _WRITER is None or not _WRITER.alive:
+            _WRITER = WriteQueue(get_write_engine(), _max_batch())
+        writer = _WRITER
+    return writer.submit(unit)
+
+
+def stop_writer() -> None:
+    """Arrête le thread écrivain après avoir vidé la file (arrêt de l'app, changement de base)."""
+    global _WRITER
+    with _WRITER_LOCK:
+        writer, _WRITER = _WRITER, None
+    if writer is not None:
+        writer.stop()